@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+import os
+import sys
+import io
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from itertools import islice
+from typing import (
+    Any, Callable, Optional, Iterable, Sequence, Mapping, MutableMapping, NamedTuple, List,
+)
+import sqlalchemy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from sqlfkpath import (
+    Key, ForeignKey, ForeignKeyGraph, reflect_foreign_keys, parse_ddl, iter_paths,
+)
+
+
+class Schema(NamedTuple):
+    tables: Sequence[Key]
+    foreign_keys: Sequence[ForeignKey]
+
+
+class StageResult(NamedTuple):
+    seconds: float
+    peak_bytes: Optional[int]
+
+
+# Approximate table counts for each scale, the multi-schema layout at the large
+# scale has more than 10k tables.
+SCALES = {"tiny": 50, "small": 500, "medium": 3000, "large": 12000}
+
+
+def table_key(schema: Optional[str], name: str) -> Key:
+    return Key(schema, name, ["id"])
+
+
+def link(generator: random.Random, source: Key, destination: Key) -> ForeignKey:
+    # column names are unique within the source table, so that parallel
+    # foreign keys get separate columns
+    column = f"{destination.table}_id_{generator.randrange(1 << 30)}"
+    return ForeignKey(
+        source=Key(source.database, source.table, [column]),
+        destination=destination,
+    )
+
+
+def generate_star(generator: random.Random, size: int) -> Schema:
+    """
+    Fact tables, each referencing a few of the dimension tables.
+
+    """
+    fact_count = max(1, size // 10)
+    dimensions = [table_key(None, f"dim_{i}") for i in range(size - fact_count)]
+    facts = [table_key(None, f"fact_{i}") for i in range(fact_count)]
+    foreign_keys = [
+        link(generator, fact, dimension)
+        for fact in facts
+        for dimension in generator.sample(dimensions, min(8, len(dimensions)))
+    ]
+    return Schema(dimensions + facts, foreign_keys)
+
+
+def generate_snowflake(generator: random.Random, size: int) -> Schema:
+    """
+    Star schema with normalized dimensions: each dimension table references
+    up to two tables of the next, smaller dimension level.
+
+    """
+    fact_count = max(1, size // 10)
+    levels: List[List[Key]] = []
+    remaining = size - fact_count
+    level_size = max(1, remaining // 2)
+    while remaining > 0:
+        level_size = min(level_size, remaining)
+        levels.append([table_key(None, f"dim_{len(levels)}_{i}") for i in range(level_size)])
+        remaining -= level_size
+        level_size = max(1, level_size // 2)
+    facts = [table_key(None, f"fact_{i}") for i in range(fact_count)]
+    foreign_keys = [
+        link(generator, fact, dimension)
+        for fact in facts
+        for dimension in generator.sample(levels[0], min(6, len(levels[0])))
+    ]
+    for level, next_level in zip(levels, levels[1:]):
+        foreign_keys += [
+            link(generator, dimension, parent)
+            for dimension in level
+            for parent in generator.sample(next_level, min(2, len(next_level)))
+        ]
+    return Schema([table for level in levels for table in level] + facts, foreign_keys)
+
+
+def generate_hierarchy(generator: random.Random, size: int) -> Schema:
+    """
+    Deep trees: each table references one of the few most recently created
+    tables, some tables also reference themselves.
+
+    """
+    tables = [table_key(None, f"node_{i}") for i in range(size)]
+    foreign_keys = [
+        link(generator, table, tables[max(0, index - generator.randint(1, 3))])
+        for index, table in enumerate(tables[1:], start=1)
+    ]
+    foreign_keys += [
+        link(generator, table, table) for table in generator.sample(tables, size // 20)
+    ]
+    return Schema(tables, foreign_keys)
+
+
+def generate_many_to_many(generator: random.Random, size: int) -> Schema:
+    """
+    Entity tables linked by many link tables, each referencing two entities,
+    giving a highly connected graph with many shortest paths.
+
+    """
+    entity_count = max(2, size // 3)
+    entities = [table_key(None, f"entity_{i}") for i in range(entity_count)]
+    links = [table_key(None, f"link_{i}") for i in range(size - entity_count)]
+    foreign_keys = [
+        link(generator, link_table, entity)
+        for link_table in links
+        for entity in generator.sample(entities, 2)
+    ]
+    return Schema(entities + links, foreign_keys)
+
+
+def generate_multi_schema(generator: random.Random, size: int) -> Schema:
+    """
+    Postgres-like layout: many schemas with their own snowflake-ish tables,
+    most of them also referencing a few tables of a shared core schema.
+
+    """
+    core = [table_key("core", name) for name in ("account", "organization", "member", "currency")]
+    foreign_keys = [link(generator, core[2], core[1]), link(generator, core[0], core[1])]
+    tables = list(core)
+    schema_size = 100
+    for index in range((size - len(core)) // schema_size):
+        schema = f"app_{index}"
+        local = [table_key(schema, f"table_{i}") for i in range(schema_size)]
+        for position, table in enumerate(local[1:], start=1):
+            foreign_keys.append(link(generator, table, local[generator.randrange(position)]))
+            if generator.random() < 0.3:
+                foreign_keys.append(link(generator, table, generator.choice(core)))
+        tables += local
+    return Schema(tables, foreign_keys)
+
+
+GENERATORS: Mapping[str, Callable[[random.Random, int], Schema]] = {
+    "star": generate_star,
+    "snowflake": generate_snowflake,
+    "hierarchy": generate_hierarchy,
+    "many_to_many": generate_many_to_many,
+    "multi_schema": generate_multi_schema,
+}
+
+
+def render_ddl(schema: Schema) -> str:
+    """
+    Render the schema as a pg_dump-like DDL dump.
+
+    """
+    columns: MutableMapping[str, List[str]] = {
+        table.get_fully_qualified_table(): ["id"] for table in schema.tables
+    }
+    for foreign_key in schema.foreign_keys:
+        columns[foreign_key.source.get_fully_qualified_table()] += list(foreign_key.source.columns)
+    statements = [
+        f"CREATE TABLE {table} (\n"
+        + ",\n".join(f"    {column} integer NOT NULL" for column in table_columns)
+        + "\n);\n"
+        for table, table_columns in columns.items()
+    ]
+    statements += [
+        f"ALTER TABLE ONLY {table.get_fully_qualified_table()}\n"
+        f"    ADD CONSTRAINT {table.table}_pkey PRIMARY KEY (id);\n"
+        for table in schema.tables
+    ]
+    statements += [
+        f"ALTER TABLE ONLY {foreign_key.source.get_fully_qualified_table()}\n"
+        f"    ADD CONSTRAINT fk_{index} FOREIGN KEY ({foreign_key.source.columns[0]})"
+        f" REFERENCES {foreign_key.destination.get_fully_qualified_table()}(id);\n"
+        for index, foreign_key in enumerate(schema.foreign_keys)
+    ]
+    return "\n".join(statements)
+
+
+def create_sqlite_database(schema: Schema, path: str) -> sqlalchemy.engine.Engine:
+    """
+    Create the schema in SQLite, which has no schemas: qualified table names
+    are flattened.
+
+    """
+
+    def flatten(key: Key) -> str:
+        return key.get_fully_qualified_table().replace(".", "__")
+
+    definitions: MutableMapping[str, List[str]] = {
+        flatten(table): ["id INTEGER PRIMARY KEY"] for table in schema.tables
+    }
+    for foreign_key in schema.foreign_keys:
+        definitions[flatten(foreign_key.source)].append(
+            f"{foreign_key.source.columns[0]} INTEGER"
+            f" REFERENCES {flatten(foreign_key.destination)}(id)"
+        )
+    engine = sqlalchemy.create_engine("sqlite:///" + path)
+    with engine.begin() as connection:
+        for table, table_definitions in definitions.items():
+            connection.execute(sqlalchemy.text(
+                f"CREATE TABLE {table} (" + ", ".join(table_definitions) + ")"
+            ))
+    return engine
+
+
+def measure(function: Callable[[], object], memory: bool) -> StageResult:
+    """
+    Time the function, then run it again with tracemalloc to get its peak
+    memory use, so that tracing doesn't distort the timing.
+
+    """
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    if not memory:
+        return StageResult(seconds, None)
+    tracemalloc.start()
+    try:
+        function()
+        return StageResult(seconds, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+
+def search(graph: ForeignKeyGraph, pairs: Iterable[Sequence[str]], limit: int) -> int:
+    return sum(len(list(islice(iter_paths(graph, begin, end), limit))) for begin, end in pairs)
+
+
+def run_benchmark(
+    shape: str,
+    size: int,
+    seed: int = 0,
+    queries: int = 20,
+    limit: int = 100,
+    reflect: bool = True,
+    memory: bool = True,
+) -> Mapping[str, Any]:
+    """
+    Generate a schema and measure reading its foreign keys (reflection from
+    SQLite and parsing a DDL dump), building the graph and searching for
+    paths between random pairs of tables, at most `limit` paths per pair.
+
+    """
+    generator = random.Random(seed)
+    schema = GENERATORS[shape](generator, size)
+    stages = {}
+    if reflect:
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_sqlite_database(schema, os.path.join(directory, "benchmark.sqlite"))
+            stages["reflect"] = measure(lambda: reflect_foreign_keys(engine), memory)
+            engine.dispose()
+    ddl = render_ddl(schema)
+    stages["parse_ddl"] = measure(lambda: list(parse_ddl(io.StringIO(ddl))), memory)
+    stages["build"] = measure(lambda: ForeignKeyGraph.build(schema.foreign_keys), memory)
+    graph = ForeignKeyGraph.build(schema.foreign_keys)
+    names = [table.get_fully_qualified_table() for table in schema.tables]
+    pairs = [generator.sample(names, 2) for _ in range(queries)]
+    found_paths = search(graph, pairs, limit)
+    stages["search"] = measure(lambda: search(graph, pairs, limit), memory)
+    return {
+        "shape": shape,
+        "tables": len(schema.tables),
+        "foreign_keys": len(schema.foreign_keys),
+        "queries": queries,
+        "found_paths": found_paths,
+        "stages": {name: result._asdict() for name, result in stages.items()},
+    }
+
+
+def find_regressions(
+    results: Sequence[Mapping[str, Any]],
+    baseline: Sequence[Mapping[str, Any]],
+    tolerance: float,
+    min_slowdown: float = 0.0,
+) -> List[str]:
+    """
+    List stages that are more than `tolerance` times and `min_slowdown`
+    seconds slower than in the baseline results.
+
+    """
+    baseline_stages = {
+        (result["shape"], result["tables"]): result["stages"] for result in baseline
+    }
+    regressions = []
+    for result in results:
+        old_stages = baseline_stages.get((result["shape"], result["tables"]), {})
+        for stage, stage_result in result["stages"].items():
+            if stage not in old_stages:
+                continue
+            old_seconds = old_stages[stage]["seconds"]
+            new_seconds = stage_result["seconds"]
+            if new_seconds > old_seconds * tolerance and new_seconds - old_seconds > min_slowdown:
+                regressions.append(
+                    f"{result['shape']}/{stage}: {old_seconds:.3f}s -> {new_seconds:.3f}s"
+                )
+    return regressions
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure reading foreign keys, building the graph and searching for paths"
+            " in generated schemas."
+        )
+    )
+    parser.add_argument(
+        "--shape",
+        action="append",
+        choices=sorted(GENERATORS),
+        help="schema shape to generate (repeatable, default: all)",
+    )
+    parser.add_argument(
+        "--scale",
+        choices=list(SCALES),
+        default="small",
+        help="approximate number of tables: %(choices)s (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=20,
+        help="number of random table pairs to search (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-reflect",
+        action="store_true",
+        help="skip reflection from SQLite, which is slow for large schemas",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="don't measure peak memory use",
+    )
+    parser.add_argument("--output", metavar="FILE", help="write JSON results to FILE")
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="compare with JSON results from FILE and exit with code 1 on regressions",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2.0,
+        help="with --baseline: allowed slowdown factor (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-slowdown",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help=(
+            "with --baseline: ignore stages slowed down by at most SECONDS, timings of very"
+            " short stages are noisy (default: %(default)s)"
+        ),
+    )
+    return parser
+
+
+def main() -> int:
+    args = create_argument_parser().parse_args()
+    results = [
+        run_benchmark(
+            shape,
+            SCALES[args.scale],
+            seed=args.seed,
+            queries=args.queries,
+            reflect=not args.no_reflect,
+            memory=not args.no_memory,
+        )
+        for shape in args.shape or sorted(GENERATORS)
+    ]
+    report = {
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "scale": args.scale,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = find_regressions(
+                results,
+                json.load(baseline_file)["results"],
+                args.tolerance,
+                args.min_slowdown,
+            )
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,74 @@
 #!/usr/bin/env python3
 
 from __future__ import annotations
+import os
 import sys
 import argparse
 import textwrap
-from typing import Optional, Iterable, Sequence, Mapping, MutableMapping, NamedTuple, List
-import sqlalchemy
+import json
+import gzip
+import mmap
+import hashlib
+import time
+import heapq
+import math
+import random
+import re
+import socket
+import socketserver
+import threading
+import tracemalloc
+import contextvars
+import stat
+import types
+import urllib.parse
+import importlib.util
+import concurrent.futures
+from array import array
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from operator import add
+from itertools import islice, product
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fnmatch import fnmatchcase
+from typing import (
+    Callable, Optional, Iterable, Iterator, Sequence, Mapping, MutableMapping, NamedTuple, List,
+    Tuple, Set, Pattern, TextIO, Type, TYPE_CHECKING,
+)
+
+
+def import_lazily(name: str) -> types.ModuleType:
+    """
+    Import a module on first use of its attributes.
+
+    Importing SQLAlchemy (with asyncio) takes most of the startup time, and
+    it's not needed when the foreign keys are read from the cache, a dump or
+    a snapshot file.
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+if TYPE_CHECKING:
+    import asyncio
+    import tempfile
+    import sqlalchemy
+    import sqlalchemy.ext.asyncio
+else:
+    asyncio = import_lazily("asyncio")
+    # only needed to write the cache, after connecting to the database anyway
+    tempfile = import_lazily("tempfile")
+    sqlalchemy = import_lazily("sqlalchemy")
 
 
 class Key(NamedTuple):
@@ -55,6 +118,14 @@ class ForeignKey(NamedTuple):
         ]
         return f"JOIN {self.destination.get_fully_qualified_table()} ON " + " AND ".join(conditions)
 
+    def reversed(self) -> ForeignKey:
+        """
+        The same foreign key walked the other way, for joining the table
+        that references the destination.
+
+        """
+        return ForeignKey(self.destination, self.source)
+
     def __str__(self) -> str:
         return f"{self.source} -> {self.destination}"
 
@@ -91,6 +162,226 @@ class Path:
         return len(self.edges)
 
 
+class JoinTree:
+    """
+    Foreign keys connecting a set of tables, without cycles.
+
+    The foreign keys are ordered so that each one links a table reached by
+    the previous ones, starting from the root table, with a new table.
+
+    """
+
+    def __init__(self, root: str, edges: Iterable[ForeignKey]):
+        linked_tables: MutableMapping[str, List[Tuple[str, ForeignKey]]] = {}
+        edge_count = 0
+        for edge in sorted(edges):
+            source = edge.source.get_fully_qualified_table()
+            destination = edge.destination.get_fully_qualified_table()
+            linked_tables.setdefault(source, []).append((destination, edge))
+            linked_tables.setdefault(destination, []).append((source, edge))
+            edge_count += 1
+        joined_tables = {root}
+        ordered_edges: List[ForeignKey] = []
+        queue = deque([root])
+        while queue:
+            for table, edge in linked_tables.get(queue.popleft(), ()):
+                if table not in joined_tables:
+                    joined_tables.add(table)
+                    ordered_edges.append(edge)
+                    queue.append(table)
+        if len(ordered_edges) != edge_count:
+            raise ValueError
+        self.root = root
+        self.edges = tuple(ordered_edges)
+
+    def joins(self) -> str:
+        joined_tables = {self.root}
+        joins = [self.root]
+        for edge in self.edges:
+            if edge.source.get_fully_qualified_table() not in joined_tables:
+                edge = edge.reversed()
+            joined_tables.add(edge.destination.get_fully_qualified_table())
+            joins.append(edge.join())
+        return "\n".join(joins)
+
+    def __str__(self) -> str:
+        return "\n".join(map(str, self.edges))
+
+    def length(self) -> int:
+        return len(self.edges)
+
+
+class JoinRenderer:
+    """
+    Render paths and join trees as SQL FROM clauses, with identifiers quoted
+    for a dialect.
+
+    Every joined table gets an alias, so a table can be joined more than once,
+    e.g. with a self-referencing foreign key. The quoted parts of each join
+    are rendered once per foreign key and direction and reused for other
+    paths.
+
+    """
+
+    def __init__(self, dialect: Optional[sqlalchemy.engine.Dialect] = None):
+        if dialect is None:
+            dialect = sqlalchemy.engine.default.DefaultDialect()
+        self.quote: Callable[[str], str] = dialect.identifier_preparer.quote
+        # oriented foreign key -> quoted joined table, format string for the
+        # join condition with the alias of the joined table as {0} and the
+        # alias of the table it's joined to as {1}
+        self.templates: MutableMapping[ForeignKeyIdentity, Tuple[str, str]] = {}
+
+    @classmethod
+    def for_dialect(cls, dialect_name: Optional[str]) -> JoinRenderer:
+        """
+        Create a renderer for a dialect name, like the first part of a database
+        URL, without importing the database driver.
+
+        """
+        if dialect_name is None:
+            return cls()
+        return cls(sqlalchemy.engine.url.make_url(f"{dialect_name}://").get_dialect()())
+
+    def render_path(self, path: Path) -> str:
+        return self.render(get_path_begin(path), path.edges)
+
+    def render_tree(self, tree: JoinTree) -> str:
+        return self.render(tree.root, tree.edges)
+
+    def render(self, root: str, edges: Iterable[ForeignKey]) -> str:
+        """
+        Render joins of the root table and the foreign keys. Each foreign key
+        has to link a table joined before (its most recent alias is used) with
+        a table joined by the foreign key.
+
+        """
+        used_aliases: Set[str] = set()
+        database, _, table = root.rpartition(".")
+        root_key = Key(database or None, table, ())
+        aliases = {root: self.create_alias(root_key, used_aliases)}
+        lines = ["FROM " + add_alias(self.format_table(root_key), aliases[root])]
+        for edge in edges:
+            if edge.source.get_fully_qualified_table() not in aliases:
+                edge = edge.reversed()
+            joined_alias = aliases.get(edge.source.get_fully_qualified_table())
+            if joined_alias is None:
+                raise ValueError
+            alias = self.create_alias(edge.destination, used_aliases)
+            aliases[edge.destination.get_fully_qualified_table()] = alias
+            table, condition = self.get_template(edge)
+            lines.append(
+                f"JOIN {add_alias(table, alias)} ON " + condition.format(alias, joined_alias)
+            )
+        return "\n".join(lines)
+
+    def write_paths(self, paths: Iterable[Path], stream: TextIO) -> int:
+        """
+        Write FROM clauses for the paths as they are generated, separated with
+        empty lines. Return the number of written paths.
+
+        """
+        count = 0
+        for path in paths:
+            if count:
+                stream.write("\n")
+            stream.write(self.render_path(path))
+            stream.write("\n")
+            count += 1
+        return count
+
+    def get_template(self, foreign_key: ForeignKey) -> Tuple[str, str]:
+        identity = get_foreign_key_identity(foreign_key)
+        template = self.templates.get(identity)
+        if template is None:
+            template = (
+                self.format_table(foreign_key.destination),
+                " AND ".join(
+                    "{1}." + escape_format(self.quote(source_column))
+                    + " = {0}." + escape_format(self.quote(destination_column))
+                    for source_column, destination_column in zip(
+                        foreign_key.source.columns,
+                        foreign_key.destination.columns,
+                    )
+                ),
+            )
+            self.templates[identity] = template
+        return template
+
+    def format_table(self, key: Key) -> str:
+        table = self.quote(key.table)
+        if key.database is None:
+            return table
+        return self.quote(key.database) + "." + table
+
+    def create_alias(self, key: Key, used_aliases: Set[str]) -> str:
+        alias = key.table
+        suffix = 1
+        while alias in used_aliases:
+            suffix += 1
+            alias = f"{key.table}_{suffix}"
+        used_aliases.add(alias)
+        return self.quote(alias)
+
+
+class PathBundle:
+    """
+    Paths joining the same tables in the same order, which differ only in
+    the parallel foreign keys linking consecutive tables. The paths are
+    created only when the bundle is iterated over.
+
+    """
+
+    def __init__(self, graph: ForeignKeyGraph, steps: Iterable[Sequence[int]]):
+        self.graph = graph
+        # edges linking each pair of consecutive tables
+        self.steps = tuple(tuple(edges) for edges in steps)
+
+    def __iter__(self) -> Iterator[Path]:
+        foreign_keys = [
+            [self.graph.get_foreign_key(edge >> 1) for edge in edges] for edges in self.steps
+        ]
+        return map(Path, product(*foreign_keys))
+
+    def __str__(self) -> str:
+        return "\n".join(
+            " | ".join(str(self.graph.get_foreign_key(edge >> 1)) for edge in edges)
+            for edges in self.steps
+        )
+
+    def length(self) -> int:
+        return len(self.steps)
+
+    def count(self) -> int:
+        return math.prod(len(edges) for edges in self.steps)
+
+
+def get_path_begin(path: Path) -> str:
+    """
+    Find the table that a path begins with: the end of the first foreign key
+    that is not linked to the second one.
+
+    """
+    first = path.edges[0]
+    begin = first.source.get_fully_qualified_table()
+    if len(path.edges) > 1:
+        second = path.edges[1]
+        if begin in (
+            second.source.get_fully_qualified_table(),
+            second.destination.get_fully_qualified_table(),
+        ):
+            return first.destination.get_fully_qualified_table()
+    return begin
+
+
+def add_alias(table: str, alias: str) -> str:
+    return table if alias == table else f"{table} AS {alias}"
+
+
+def escape_format(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
 class NoSchemaForUnqualifiedTableName(Exception):
 
     def __init__(self, dialect_name: str, table_name: str):
@@ -101,6 +392,343 @@ class NoSchemaForUnqualifiedTableName(Exception):
         return f"dialect={self.dialect_name}, table={self.table_name}"
 
 
+class UnknownTableName(Exception):
+
+    def __init__(self, table_name: str, suggestions: Sequence[str] = ()):
+        self.table_name = table_name
+        self.suggestions = suggestions
+
+    def __str__(self) -> str:
+        if not self.suggestions:
+            return f"unknown table: {self.table_name}"
+        return f"unknown table: {self.table_name}, did you mean: {', '.join(self.suggestions)}?"
+
+
+class AmbiguousTableName(Exception):
+
+    def __init__(self, table_name: str, candidates: Sequence[str]):
+        self.table_name = table_name
+        self.candidates = candidates
+
+    def __str__(self) -> str:
+        return f"ambiguous table name: {self.table_name}, matching: {', '.join(self.candidates)}"
+
+
+# Cost of a join using the foreign key, given the fully qualified name of the
+# table that the join adds.
+EdgeWeight = Callable[[ForeignKey, str], float]
+
+
+def hop_weight(foreign_key: ForeignKey, joined_table: str) -> float:
+    # pylint: disable=unused-argument
+    return 1.0
+
+
+class RowCountWeight:
+    """
+    Make joins with large tables expensive: the cost of a join is the
+    estimated number of rows in the joined table. Tables without an estimate
+    cost as much as the default.
+
+    """
+
+    def __init__(self, row_counts: Mapping[str, float], default: float = 1.0):
+        self.row_counts = row_counts
+        self.default = default
+
+    def __call__(self, foreign_key: ForeignKey, joined_table: str) -> float:
+        return max(1.0, self.row_counts.get(joined_table, self.default))
+
+
+class OutdatedDistanceIndex(Exception):
+
+    def __str__(self) -> str:
+        return "the distance index was built for different foreign keys"
+
+
+class InvalidTablePair(Exception):
+
+    def __init__(self, line_number: int, line: str):
+        self.line_number = line_number
+        self.line = line
+
+    def __str__(self) -> str:
+        return f"line {self.line_number}: expected two table names, got {self.line!r}"
+
+
+class SchemaFilter(NamedTuple):
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+
+    def matches(self, schema: Optional[str]) -> bool:
+        if schema is None:
+            return True
+        if self.include and not any(fnmatchcase(schema, pattern) for pattern in self.include):
+            return False
+        return not any(fnmatchcase(schema, pattern) for pattern in self.exclude)
+
+
+class TableFilter(NamedTuple):
+    """
+    Glob patterns of table names. Patterns containing a dot are matched
+    against fully qualified names, other patterns against names without the
+    schema.
+
+    """
+
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+
+    def matches(self, database: Optional[str], table: str) -> bool:
+        qualified_table = Key(database, table, ()).get_fully_qualified_table()
+
+        def matches_pattern(pattern: str) -> bool:
+            return fnmatchcase(qualified_table if "." in pattern else table, pattern)
+
+        if self.include and not any(map(matches_pattern, self.include)):
+            return False
+        return not any(map(matches_pattern, self.exclude))
+
+
+class SearchOptions(NamedTuple):
+    limit: Optional[int] = None
+    max_length: Optional[int] = None
+    # Find the k cheapest loopless paths according to the weight, instead of
+    # all the shortest ones.
+    k: Optional[int] = None
+    weight: EdgeWeight = hop_weight
+    # Constraints applied during the search, see SearchConstraints. The begin,
+    # end and via tables are never filtered out.
+    tables: TableFilter = TableFilter()
+    schemas: SchemaFilter = SchemaFilter()
+    parents_only: bool = False
+    via: Optional[str] = None
+
+    def is_constrained(self) -> bool:
+        # the filters can be built from lists, which never equal the default tuples
+        return bool(
+            self.tables.include or self.tables.exclude
+            or self.schemas.include or self.schemas.exclude
+            or self.parents_only
+        )
+
+
+class SearchConstraints:
+    """
+    Decide which joins a search may take: joins adding tables and schemas
+    that are not filtered out and, in the parents only mode, joins from the
+    source of a foreign key to its destination.
+
+    Tables are matched against the filters only when the search reaches
+    them, and only once per search.
+
+    """
+
+    def __init__(self, graph: ForeignKeyGraph, options: SearchOptions, terminals: Iterable[int]):
+        self.graph = graph
+        self.tables = options.tables
+        self.schemas = options.schemas
+        self.parents_only = options.parents_only
+        self.allowed_tables = {table: True for table in terminals}
+
+    @classmethod
+    def create(
+        cls,
+        graph: ForeignKeyGraph,
+        options: SearchOptions,
+        terminals: Iterable[str],
+    ) -> Optional[SearchConstraints]:
+        if not options.is_constrained():
+            return None
+        table_ids = [graph.get_table_id(table) for table in terminals]
+        return cls(graph, options, [table for table in table_ids if table is not None])
+
+    def allows(self, table: int, edge: int, backward: bool = False) -> bool:
+        """
+        Check a join adding the table with the edge. Searches going from the
+        end table add tables in the reversed direction of the path.
+
+        """
+        if self.parents_only and (edge & 1) != backward:
+            return False
+        allowed = self.allowed_tables.get(table)
+        if allowed is None:
+            database, table_name = self.graph.get_table(table)
+            allowed = self.schemas.matches(database) and self.tables.matches(database, table_name)
+            self.allowed_tables[table] = allowed
+        return allowed
+
+
+class StageStats:
+    """
+    Measurements of one stage of finding paths. Peak memory is the peak size
+    of memory blocks traced by tracemalloc, if memory is traced.
+
+    """
+
+    def __init__(self, name: str, depth: int):
+        self.name = name
+        self.depth = depth
+        self.seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.peak_memory: Optional[int] = None
+        self.counters: MutableMapping[str, int] = {}
+
+    def to_dict(self) -> Mapping[str, object]:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "seconds": self.seconds,
+            "queries": self.queries,
+            "rows": self.rows,
+            "peak_memory": self.peak_memory,
+            "counters": dict(self.counters),
+        }
+
+    def __str__(self) -> str:
+        details = [f"{self.seconds:.3f} s", f"{self.queries} queries", f"{self.rows} rows"]
+        if self.peak_memory is not None:
+            details.append(f"peak memory {self.peak_memory / 1048576:.1f} MiB")
+        details += [f"{name} {value}" for name, value in self.counters.items()]
+        return "  " * self.depth + f"{self.name}: " + ", ".join(details)
+
+
+class Stats:
+    """
+    Collect measurements of each stage of finding paths: wall time, catalog
+    queries issued on watched engines, rows fetched by them, peak memory and
+    stage specific counters (e.g. graph size or tables expanded during the
+    search). Stages can be nested, the measurements of a stage include the
+    ones of the stages nested in it, except for the counters.
+
+    Stages are measured while the stats are active:
+
+        with Stats(trace_memory=True) as stats:
+            stats.watch(engine)
+            find_paths(engine, "child", "parent")
+        print(stats.format_text())
+
+    The on_stage hook is called with each stage when it ends. Rows are counted
+    as reported by the driver, SQLite doesn't report them.
+
+    """
+
+    def __init__(
+        self,
+        trace_memory: bool = False,
+        on_stage: Optional[Callable[[StageStats], None]] = None,
+    ):
+        self.trace_memory = trace_memory
+        self.on_stage = on_stage
+        self.stages: List[StageStats] = []
+        self.stack: List[StageStats] = []
+        self.lock = threading.Lock()
+        self.engines: List[sqlalchemy.engine.Engine] = []
+        self.started_tracing = False
+        self.token: Optional[contextvars.Token[Optional[Stats]]] = None
+
+    def __enter__(self) -> Stats:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.token = CURRENT_STATS.set(self)
+        return self
+
+    def __exit__(self, *exception: object) -> None:
+        if self.token is not None:
+            CURRENT_STATS.reset(self.token)
+        for engine in self.engines:
+            sqlalchemy.event.remove(engine, "after_cursor_execute", self.count_query)
+        self.engines = []
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def watch(self, engine: sqlalchemy.engine.Engine) -> None:
+        sqlalchemy.event.listen(engine, "after_cursor_execute", self.count_query)
+        self.engines.append(engine)
+
+    def count_query(self, *arguments: object) -> None:
+        # connection, cursor, statement, parameters, context, executemany
+        rows = getattr(arguments[1], "rowcount", -1)
+        with self.lock:
+            for stage in self.stack:
+                stage.queries += 1
+                stage.rows += max(rows if isinstance(rows, int) else -1, 0)
+
+    def count(self, name: str, value: int) -> None:
+        with self.lock:
+            if self.stack:
+                counters = self.stack[-1].counters
+                counters[name] = counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        stage = StageStats(name, len(self.stack))
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # the peak is reset for each stage, keep the one reached so far
+            # by the enclosing stage
+            if self.stack:
+                self.record_peak_memory(self.stack[-1])
+            tracemalloc.reset_peak()
+        with self.lock:
+            self.stages.append(stage)
+            self.stack.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            with self.lock:
+                self.stack.pop()
+            if tracing:
+                self.record_peak_memory(stage)
+                if self.stack:
+                    self.record_peak_memory(self.stack[-1], stage.peak_memory)
+            if self.on_stage is not None:
+                self.on_stage(stage)
+
+    @staticmethod
+    def record_peak_memory(stage: StageStats, peak_memory: Optional[int] = None) -> None:
+        if peak_memory is None:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        stage.peak_memory = max(stage.peak_memory or 0, peak_memory)
+
+    def to_dict(self) -> Mapping[str, object]:
+        return {"stages": [stage.to_dict() for stage in self.stages]}
+
+    def format_text(self) -> str:
+        return "\n".join(map(str, self.stages))
+
+
+CURRENT_STATS: contextvars.ContextVar[Optional[Stats]] = contextvars.ContextVar(
+    "CURRENT_STATS",
+    default=None,
+)
+
+
+@contextmanager
+def measure_stage(name: str) -> Iterator[None]:
+    """
+    Measure a stage with the active stats, if any.
+
+    """
+    stats = CURRENT_STATS.get()
+    if stats is None:
+        yield
+        return
+    with stats.stage(name):
+        yield
+
+
+def count_stat(name: str, value: int) -> None:
+    stats = CURRENT_STATS.get()
+    if stats is not None:
+        stats.count(name, value)
+
+
 def reflect(engine: sqlalchemy.engine.Engine) -> sqlalchemy.MetaData:
     meta = sqlalchemy.MetaData()
     if engine_supports_schemas(engine):
@@ -138,10 +766,15 @@ def fix_reflected_table_schema(
     engine: sqlalchemy.engine.Engine,
     table: sqlalchemy.sql.schema.Table,
 ) -> sqlalchemy.sql.schema.Table:
-    if table.schema is not None:
-        return table
+    table.schema = fix_reflected_schema(engine, table.schema)
+    return table
+
+
+def fix_reflected_schema(engine: sqlalchemy.engine.Engine, schema: Optional[str]) -> Optional[str]:
+    if schema is not None:
+        return schema
     if not engine_supports_schemas(engine):
-        return table
+        return schema
 
     # https://docs.sqlalchemy.org/en/14/dialects/postgresql.html#postgresql-schema-reflection
     # When using a PostgreSQL dialect the schema for a reflected table could be set to None.
@@ -159,133 +792,4020 @@ def fix_reflected_table_schema(
     # Since we need the schema to be consistently set for all tables, attempt to restore it here.
     if engine.dialect.name == "postgresql":
         if hasattr(engine.dialect, "default_schema_name"):
-            table.schema = engine.dialect.default_schema_name
-            return table
+            return str(engine.dialect.default_schema_name)
         raise ValueError
 
     raise ValueError
 
 
-def create_table_foreign_key_map(
-    foreign_keys: Iterable[ForeignKey]
-) -> Mapping[str, Iterable[ForeignKey]]:
-    table_fk_map: MutableMapping[str, List[ForeignKey]] = {}
-    for foreign_key in foreign_keys:
-        table = foreign_key.source.get_fully_qualified_table()
-        if table not in table_fk_map:
-            table_fk_map[table] = []
-        table_fk_map[table].append(foreign_key)
-        table = foreign_key.destination.get_fully_qualified_table()
-        if table not in table_fk_map:
-            table_fk_map[table] = []
-        table_fk_map[table].append(foreign_key)
-    return table_fk_map
+# One row per column of each foreign key constraint, ordered by the position
+# of the column in the constraint:
+# schema, table, constraint name, column, referred schema, referred table, referred column
+POSTGRESQL_FOREIGN_KEYS_QUERY = """
+    SELECT
+        source_namespace.nspname,
+        source_table.relname,
+        con.conname,
+        source_column.attname,
+        destination_namespace.nspname,
+        destination_table.relname,
+        destination_column.attname
+    FROM pg_constraint con
+    JOIN pg_class source_table ON source_table.oid = con.conrelid
+    JOIN pg_namespace source_namespace ON source_namespace.oid = source_table.relnamespace
+    JOIN pg_class destination_table ON destination_table.oid = con.confrelid
+    JOIN pg_namespace destination_namespace
+        ON destination_namespace.oid = destination_table.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey)
+        WITH ORDINALITY AS k(source_attnum, destination_attnum, position)
+    JOIN pg_attribute source_column
+        ON source_column.attrelid = con.conrelid AND source_column.attnum = k.source_attnum
+    JOIN pg_attribute destination_column
+        ON destination_column.attrelid = con.confrelid
+        AND destination_column.attnum = k.destination_attnum
+    WHERE con.contype = 'f' AND source_namespace.nspname NOT LIKE 'pg\\_%'
+    ORDER BY source_namespace.nspname, source_table.relname, con.conname, k.position
+"""
 
+MYSQL_FOREIGN_KEYS_QUERY = """
+    SELECT
+        table_schema,
+        table_name,
+        constraint_name,
+        column_name,
+        referenced_table_schema,
+        referenced_table_name,
+        referenced_column_name
+    FROM information_schema.key_column_usage
+    WHERE referenced_table_name IS NOT NULL
+    ORDER BY table_schema, table_name, constraint_name, ordinal_position
+"""
 
-def gather_paths(
-    table_fk_map: Mapping[str, Iterable[ForeignKey]],
-    current_table: str,
-    end_table: str,
-    walked_tables: List[str],
-    walked_keys: List[ForeignKey],
-    found_paths: List[Path],
-) -> None:
-    if current_table in walked_tables:
-        return
-    if current_table == end_table:
-        found_paths.append(Path(walked_keys))
-        return
-    for foreign_key in table_fk_map[current_table]:
-        gather_paths(
-            table_fk_map,
-            foreign_key.destination.get_fully_qualified_table(),
-            end_table,
-            walked_tables + [current_table],
-            walked_keys + [foreign_key],
-            found_paths,
-        )
-        gather_paths(
-            table_fk_map,
-            foreign_key.source.get_fully_qualified_table(),
-            end_table,
-            walked_tables + [current_table],
-            walked_keys + [foreign_key],
-            found_paths,
-        )
 
+def reflect_foreign_keys(
+    engine: sqlalchemy.engine.Engine,
+    schema_filter: SchemaFilter = SchemaFilter(),
+) -> List[ForeignKey]:
+    """
+    Read only the foreign key constraints, without reflecting whole tables.
 
-def find_paths(engine: sqlalchemy.engine.Engine, begin: str, end: str) -> Iterable[Path]:
-    meta = reflect(engine)
-    foreign_keys = list(list_foreign_keys(engine, meta))
-    table_fk_map = create_table_foreign_key_map(foreign_keys)
-    # TODO: put the foreign keys in a graph: tables are nodes, foreign keys are edges
-    # TODO: traverse the graph to find paths
-    found_paths: List[Path] = []
-    if engine_supports_schemas(engine):
-        begin = get_fully_qualified_table_name(engine, begin)
-        end = get_fully_qualified_table_name(engine, end)
-    gather_paths(table_fk_map, begin, end, [], [], found_paths)
-    if found_paths:
-        minimum_length = min(path.length() for path in found_paths)
-        found_paths = list(filter(lambda path: path.length() == minimum_length, found_paths))
-    return found_paths
+    PostgreSQL and MySQL / MariaDB catalogs are read with a single query. For
+    other dialects the constraints are read table by table with the
+    SQLAlchemy inspector. The schema filter is applied to the schema a
+    constraint is defined in, the referred tables can be placed anywhere.
+
+    """
+    with measure_stage("reflect"):
+        query = get_foreign_keys_query(engine)
+        with engine.connect() as connection:
+            if query is not None:
+                return read_catalog_foreign_keys(connection, query, schema_filter)
+            schemas = list_inspected_schemas(connection, schema_filter)
+        return list(inspect_foreign_keys(engine, schemas))
 
 
-def engine_supports_schemas(engine: sqlalchemy.engine.Engine) -> bool:
+async def reflect_foreign_keys_async(
+    engine: sqlalchemy.ext.asyncio.AsyncEngine,
+    schema_filter: SchemaFilter = SchemaFilter(),
+) -> List[ForeignKey]:
     """
-    SQLite does not have a concept of a schema in the same sense as other DB
-    systems.
+    Same as reflect_foreign_keys, for asyncio engines. Schemas inspected table
+    by table are read concurrently, each on its own connection.
 
-    The sqlite dialect advertises schema support with the supports_schemas
-    property set to True. The pysqlite driver, however, when passed a schema
-    that is not None, crashes in get_table_names with an error caused by the
-    following SQL query:
+    """
+    query = get_foreign_keys_query(engine.sync_engine)
+    async with engine.connect() as connection:
+        if query is not None:
+            return list(
+                await connection.run_sync(read_catalog_foreign_keys, query, schema_filter)
+            )
+        schemas = await connection.run_sync(list_inspected_schemas, schema_filter)
+    schema_foreign_keys = await asyncio.gather(
+        *(read_schema_foreign_keys_async(engine, schema) for schema in schemas)
+    )
+    return [foreign_key for foreign_keys in schema_foreign_keys for foreign_key in foreign_keys]
 
-    SELECT name FROM "schema_name.sqlite".sqlite_master WHERE type='table' ORDER BY name
 
-    Not sure if this is a bug in the pysqlite driver.
+async def read_schema_foreign_keys_async(
+    engine: sqlalchemy.ext.asyncio.AsyncEngine,
+    schema: Optional[str],
+) -> List[ForeignKey]:
+    async with engine.connect() as connection:
+        return list(await connection.run_sync(read_schema_foreign_keys, schema))
+
+
+def get_foreign_keys_query(engine: sqlalchemy.engine.Engine) -> Optional[str]:
+    if engine.dialect.name == "postgresql":
+        return POSTGRESQL_FOREIGN_KEYS_QUERY
+    if engine.dialect.name in ("mysql", "mariadb"):
+        return MYSQL_FOREIGN_KEYS_QUERY
+    return None
+
+
+def read_catalog_foreign_keys(
+    connection: sqlalchemy.engine.Connection,
+    query: str,
+    schema_filter: SchemaFilter,
+) -> List[ForeignKey]:
+    rows = connection.execute(sqlalchemy.text(query)).fetchall()
+    return [
+        foreign_key for foreign_key in group_foreign_key_rows(rows)
+        if schema_filter.matches(foreign_key.source.database)
+    ]
+
+
+def list_inspected_schemas(
+    connection: sqlalchemy.engine.Connection,
+    schema_filter: SchemaFilter,
+) -> List[Optional[str]]:
+    if not engine_supports_schemas(connection.engine):
+        return [None]
+    return [
+        schema for schema in sqlalchemy.inspect(connection).get_schema_names()
+        if schema_filter.matches(schema)
+    ]
+
+
+def group_foreign_key_rows(rows: Iterable[Sequence[str]]) -> Iterable[ForeignKey]:
+    # The rows must be sorted by constraint, see the *_FOREIGN_KEYS_QUERY constants.
+    constraint: Optional[Tuple[str, str, str, str, str]] = None
+    source_columns: List[str] = []
+    destination_columns: List[str] = []
+    for row in rows:
+        (
+            schema, table, name, column, destination_schema, destination_table, destination_column
+        ) = row
+        row_constraint = (schema, table, name, destination_schema, destination_table)
+        if row_constraint != constraint:
+            if constraint is not None:
+                yield build_grouped_foreign_key(constraint, source_columns, destination_columns)
+            constraint = row_constraint
+            source_columns = []
+            destination_columns = []
+        source_columns.append(column)
+        destination_columns.append(destination_column)
+    if constraint is not None:
+        yield build_grouped_foreign_key(constraint, source_columns, destination_columns)
+
+
+def build_grouped_foreign_key(
+    constraint: Tuple[str, str, str, str, str],
+    source_columns: List[str],
+    destination_columns: List[str],
+) -> ForeignKey:
+    schema, table, _, destination_schema, destination_table = constraint
+    return ForeignKey.build(
+        source=Key(schema, table, source_columns),
+        destination=Key(destination_schema, destination_table, destination_columns),
+    )
+
 
+def inspect_foreign_keys(
+    engine: sqlalchemy.engine.Engine,
+    schemas: Iterable[Optional[str]],
+) -> Iterable[ForeignKey]:
     """
-    return not engine.driver == "pysqlite"
+    Read foreign keys table by table, using the SQLAlchemy inspector.
 
+    Schemas are inspected in parallel threads, as many as the size of the
+    engine's connection pool. The foreign keys are returned in the order of
+    the schemas, no matter which schema is inspected first.
 
-def get_fully_qualified_table_name(engine: sqlalchemy.engine.Engine, table_name: str) -> str:
+    """
+    schemas = list(schemas)
+    jobs = min(get_pool_size(engine), len(schemas))
+    if jobs > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            schema_foreign_keys = list(
+                executor.map(partial(inspect_schema_foreign_keys, engine), schemas)
+            )
+    else:
+        schema_foreign_keys = [inspect_schema_foreign_keys(engine, schema) for schema in schemas]
+    for foreign_keys in schema_foreign_keys:
+        yield from foreign_keys
 
-    def get_default_schema(engine: sqlalchemy.engine.Engine) -> Optional[str]:
-        if engine.dialect.name == "mysql":
-            return engine.url.database
-        if engine.dialect.name == "postgresql":
-            return "public"
-        return None
 
-    default_schema = get_default_schema(engine)
-    if "." in table_name:
-        return table_name
-    if default_schema is None:
-        raise NoSchemaForUnqualifiedTableName(
-            dialect_name=engine.dialect.name,
-            table_name=table_name,
-        )
-    return default_schema + "." + table_name
+def inspect_schema_foreign_keys(
+    engine: sqlalchemy.engine.Engine,
+    schema: Optional[str],
+) -> List[ForeignKey]:
+    with engine.connect() as connection:
+        return read_schema_foreign_keys(connection, schema)
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(
-        description=(
-            "Use foreign keys to find shortest join paths between two tables in a SQL database."
+def read_schema_foreign_keys(
+    connection: sqlalchemy.engine.Connection,
+    schema: Optional[str],
+) -> List[ForeignKey]:
+    inspector = sqlalchemy.inspect(connection)
+    return [
+        ForeignKey.build(
+            source=Key(schema, table, constraint["constrained_columns"]),
+            destination=Key(
+                fix_reflected_schema(connection.engine, constraint["referred_schema"]),
+                constraint["referred_table"],
+                constraint["referred_columns"],
+            ),
         )
-    )
-    parser.add_argument("url", help="database URL")
-    parser.add_argument("begin", help="begin with this table")
-    parser.add_argument("end", help="end with this table")
-    parser.add_argument("-j", "--join", action="store_true", help="print paths as SQL joins")
-    args = parser.parse_args()
-    found_paths = list(find_paths(sqlalchemy.create_engine(args.url), args.begin, args.end))
-    for index, found_path in enumerate(found_paths):
-        print(f"path {index + 1}, length {found_path.length()}")
-        print(textwrap.indent(found_path.joins() if args.join else str(found_path), "\t"))
-    path_exists = len(found_paths) > 0
-    return 0 if path_exists else 1
+        for table in inspector.get_table_names(schema=schema)
+        for constraint in inspector.get_foreign_keys(table, schema=schema)
+    ]
+
+
+def get_pool_size(engine: sqlalchemy.engine.Engine) -> int:
+    if isinstance(engine.pool, sqlalchemy.pool.QueuePool):
+        return int(engine.pool.size())
+    return 1
+
+
+def create_engine(url: str, jobs: Optional[int] = None) -> sqlalchemy.engine.Engine:
+    """
+    Create an engine, with a connection pool for `jobs` parallel connections
+    if the dialect uses a queue pool.
+
+    """
+    engine = sqlalchemy.create_engine(url)
+    if jobs is not None and isinstance(engine.pool, sqlalchemy.pool.QueuePool):
+        engine = sqlalchemy.create_engine(url, pool_size=jobs, max_overflow=0)
+    return engine
+
+
+POSTGRESQL_ROW_COUNTS_QUERY = """
+    SELECT n.nspname, c.relname, c.reltuples
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p') AND c.reltuples >= 0 AND n.nspname NOT LIKE 'pg\\_%'
+"""
+
+MYSQL_ROW_COUNTS_QUERY = """
+    SELECT table_schema, table_name, table_rows
+    FROM information_schema.tables
+    WHERE table_type = 'BASE TABLE' AND table_rows IS NOT NULL
+"""
+
+
+def reflect_row_counts(
+    engine: sqlalchemy.engine.Engine,
+    schema_filter: SchemaFilter = SchemaFilter(),
+) -> Mapping[str, float]:
+    """
+    Estimated number of rows in each table, by fully qualified table name.
+
+    PostgreSQL and MySQL / MariaDB statistics are read with a single query.
+    SQLite tables are counted. Other dialects give no estimates.
+
+    """
+    if engine.dialect.name == "postgresql":
+        query = POSTGRESQL_ROW_COUNTS_QUERY
+    elif engine.dialect.name in ("mysql", "mariadb"):
+        query = MYSQL_ROW_COUNTS_QUERY
+    elif engine.dialect.name == "sqlite":
+        return count_sqlite_rows(engine)
+    else:
+        return {}
+    with engine.connect() as connection:
+        rows = connection.execute(sqlalchemy.text(query)).fetchall()
+    return {
+        f"{schema}.{table}": float(row_count)
+        for schema, table, row_count in rows
+        if schema_filter.matches(schema)
+    }
+
+
+def count_sqlite_rows(engine: sqlalchemy.engine.Engine) -> Mapping[str, float]:
+    quote = engine.dialect.identifier_preparer.quote
+    row_counts = {}
+    with engine.connect() as connection:
+        for table in sqlalchemy.inspect(connection).get_table_names():
+            query = sqlalchemy.text(f"SELECT count(*) FROM {quote(table)}")
+            row_counts[table] = float(connection.execute(query).scalar())
+    return row_counts
+
+
+POSTGRESQL_TABLE_NAMES_QUERY = """
+    SELECT n.nspname, c.relname
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p') AND n.nspname NOT LIKE 'pg\\_%'
+        AND n.nspname <> 'information_schema'
+"""
+
+MYSQL_TABLE_NAMES_QUERY = """
+    SELECT table_schema, table_name
+    FROM information_schema.tables
+    WHERE table_type = 'BASE TABLE'
+"""
+
+
+def reflect_table_names(
+    engine: sqlalchemy.engine.Engine,
+    schema_filter: SchemaFilter = SchemaFilter(),
+) -> List[str]:
+    """
+    Fully qualified names of all tables, including the ones without foreign
+    keys, which are not a part of the graph.
+
+    PostgreSQL and MySQL / MariaDB catalogs are read with a single query,
+    other dialects with the SQLAlchemy inspector.
+
+    """
+    if engine.dialect.name == "postgresql":
+        query = POSTGRESQL_TABLE_NAMES_QUERY
+    elif engine.dialect.name in ("mysql", "mariadb"):
+        query = MYSQL_TABLE_NAMES_QUERY
+    else:
+        with engine.connect() as connection:
+            inspector = sqlalchemy.inspect(connection)
+            return [
+                Key(schema, table, ()).get_fully_qualified_table()
+                for schema in list_inspected_schemas(connection, schema_filter)
+                for table in inspector.get_table_names(schema=schema)
+            ]
+    with engine.connect() as connection:
+        rows = connection.execute(sqlalchemy.text(query)).fetchall()
+    return [f"{schema}.{table}" for schema, table in rows if schema_filter.matches(schema)]
+
+
+def reflect_url_table_names(url: str, schema_filter: SchemaFilter = SchemaFilter()) -> List[str]:
+    """
+    Same as reflect_table_names, connecting to the database only now, e.g.
+    when the foreign keys were read from the cache.
+
+    """
+    return reflect_table_names(create_engine(url), schema_filter)
+
+
+# Cheap queries that change their result whenever a foreign key constraint is
+# added, removed or altered. Used to validate cached foreign keys without
+# reading the whole catalog.
+POSTGRESQL_FINGERPRINT_QUERY = """
+    SELECT count(*), md5(coalesce(string_agg(
+        CAST(conrelid AS regclass) || ' ' || pg_get_constraintdef(oid), ';' ORDER BY oid
+    ), ''))
+    FROM pg_constraint
+    WHERE contype = 'f'
+"""
+
+MYSQL_FINGERPRINT_QUERY = """
+    SELECT count(*), coalesce(sum(crc32(concat_ws(' ',
+        table_schema, table_name, constraint_name, ordinal_position, column_name,
+        referenced_table_schema, referenced_table_name, referenced_column_name
+    ))), 0)
+    FROM information_schema.key_column_usage
+    WHERE referenced_table_name IS NOT NULL
+"""
+
+SQLITE_FINGERPRINT_QUERY = """
+    SELECT name, sql FROM sqlite_master WHERE type = 'table' ORDER BY name
+"""
+
+
+def get_foreign_keys_fingerprint(engine: sqlalchemy.engine.Engine) -> Optional[str]:
+    if engine.dialect.name == "postgresql":
+        query = POSTGRESQL_FINGERPRINT_QUERY
+    elif engine.dialect.name in ("mysql", "mariadb"):
+        query = MYSQL_FINGERPRINT_QUERY
+    elif engine.dialect.name == "sqlite":
+        query = SQLITE_FINGERPRINT_QUERY
+    else:
+        return None
+    with engine.connect() as connection:
+        rows = connection.execute(sqlalchemy.text(query)).fetchall()
+    return hashlib.sha256(repr([tuple(row) for row in rows]).encode()).hexdigest()
+
+
+def get_default_cache_directory() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "sqlfkpath")
+
+
+class CachedForeignKeys(NamedTuple):
+    created: float
+    fingerprint: Optional[str]
+    foreign_keys: List[ForeignKey]
+    # for qualifying table names without connecting to the database
+    dialect_name: str
+    default_schema: Optional[str]
+
+
+class ForeignKeyCache:
+    """
+    Store reflected foreign keys on disk, one gzipped JSON file per database URL
+    and schema filter.
+
+    A stored entry is used without asking the database as long as it is
+    younger than the TTL (if set). Older entries are validated by comparing a
+    fingerprint of the foreign key catalog, which is a single cheap query.
+    Entries for dialects without a fingerprint query are used only within the
+    TTL.
+
+    """
+
+    version = 2
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = None,
+        refresh: bool = False,
+    ):
+        self.directory = get_default_cache_directory() if directory is None else directory
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def refreshing(self) -> ForeignKeyCache:
+        """
+        Get a cache that reflects the foreign keys again and stores them in the
+        same directory, for explicit reloads.
+
+        """
+        return ForeignKeyCache(self.directory, self.ttl, refresh=True)
+
+    def get_foreign_keys(
+        self,
+        engine: sqlalchemy.engine.Engine,
+        schema_filter: SchemaFilter = SchemaFilter(),
+        url: Optional[str] = None,
+    ) -> List[ForeignKey]:
+        """
+        Get the foreign keys from the cache entry for the URL (the engine's URL
+        by default) if it's still valid, or reflect them and store them.
+
+        """
+        if url is None:
+            url = engine.url.render_as_string(hide_password=False)
+        path = self.get_path(url, schema_filter)
+        with measure_stage("read cache"):
+            cached = None if self.refresh else self.load(path)
+        if cached is not None and self.is_within_ttl(cached):
+            return cached.foreign_keys
+        with measure_stage("validate cache"):
+            fingerprint = get_foreign_keys_fingerprint(engine)
+        if cached is not None and fingerprint is not None and cached.fingerprint == fingerprint:
+            return cached.foreign_keys
+        foreign_keys = reflect_foreign_keys(engine, schema_filter)
+        self.store(path, CachedForeignKeys(
+            time.time(),
+            fingerprint,
+            foreign_keys,
+            engine.dialect.name,
+            get_default_schema(engine),
+        ))
+        return foreign_keys
+
+    def get_recent_entry(
+        self,
+        url: str,
+        schema_filter: SchemaFilter = SchemaFilter(),
+    ) -> Optional[CachedForeignKeys]:
+        """
+        Get the cache entry for the URL if it's within the TTL, without
+        connecting to the database.
+
+        """
+        if self.refresh or self.ttl is None:
+            return None
+        with measure_stage("read cache"):
+            cached = self.load(self.get_path(url, schema_filter))
+        if cached is not None and self.is_within_ttl(cached):
+            return cached
+        return None
+
+    def get_path(self, url: str, schema_filter: SchemaFilter) -> str:
+        key = json.dumps([url, sorted(schema_filter.include), sorted(schema_filter.exclude)])
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json.gz")
+
+    def is_within_ttl(self, cached: CachedForeignKeys) -> bool:
+        return self.ttl is not None and time.time() - cached.created < self.ttl
+
+    def load(self, path: str) -> Optional[CachedForeignKeys]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return None
+        return CachedForeignKeys(
+            created=data["created"],
+            fingerprint=data["fingerprint"],
+            foreign_keys=[
+                ForeignKey(
+                    source=Key(source_database, source_table, source_columns),
+                    destination=Key(destination_database, destination_table, destination_columns),
+                )
+                for (
+                    source_database, source_table, source_columns,
+                    destination_database, destination_table, destination_columns,
+                ) in data["foreign_keys"]
+            ],
+            dialect_name=data["dialect_name"],
+            default_schema=data["default_schema"],
+        )
+
+    def store(self, path: str, cached: CachedForeignKeys) -> None:
+        data = {
+            "version": self.version,
+            "created": cached.created,
+            "fingerprint": cached.fingerprint,
+            "dialect_name": cached.dialect_name,
+            "default_schema": cached.default_schema,
+            "foreign_keys": [
+                [
+                    foreign_key.source.database,
+                    foreign_key.source.table,
+                    list(foreign_key.source.columns),
+                    foreign_key.destination.database,
+                    foreign_key.destination.table,
+                    list(foreign_key.destination.columns),
+                ]
+                for foreign_key in cached.foreign_keys
+            ],
+        }
+        # write to a temporary file first, so that concurrent runs never see
+        # a partially written cache file; the cache is optional, so a failed
+        # write is ignored, like a failed read
+        temporary_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(
+                suffix=".tmp", dir=os.path.dirname(path)
+            )
+            with os.fdopen(descriptor, "wb") as raw_file:
+                with gzip.open(raw_file, "wt", encoding="utf-8") as cache_file:
+                    json.dump(data, cache_file, separators=(",", ":"))
+            os.replace(temporary_path, path)
+        except OSError:
+            if temporary_path is not None and os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+
+# (kind, value) - kind is one of: word, quoted (an unquoted identifier), string,
+# symbol, delimiter
+DdlToken = Tuple[str, str]
+
+
+@lru_cache(maxsize=None)
+def compile_ddl_token_pattern(
+    delimiter: str,
+    backslash_escapes: bool,
+    statement_start: bool,
+) -> Pattern[str]:
+    string = r"'(?:[^'\\]|''|\\.)*'?" if backslash_escapes else r"'(?:[^']|'')*'?"
+    # the mysql client DELIMITER command, only valid at the start of a statement
+    command = r"(?P<command>(?i:delimiter)[ \t]+(?P<new_delimiter>\S+))|" if statement_start else ""
+    return re.compile(
+        # leading whitespace is a part of the token, comments are separate tokens
+        r"\s*(?:" + command
+        + r"(?P<comment>--[^\n]*|\#[^\n]*|/\*.*?(?:\*/|\Z))"
+        + r"|(?P<delimiter>" + re.escape(delimiter) + ")"
+        + r"|(?P<string>[Ee]'(?:[^'\\]|''|\\.)*'?|" + string
+        + r"|\$(?P<tag>[^\W\d]\w*|)\$.*?(?:\$(?P=tag)\$|\Z))"
+        + r"|(?P<quoted>\"(?:[^\"]|\"\")*\"?|`(?:[^`]|``)*`?)"
+        + r"|(?P<word>[^\W\d][\w$]*)"
+        + r"|(?P<symbol>\S))",
+        re.DOTALL,
+    )
+
+
+class DdlTokenizer:
+    """
+    Split a stream of SQL statements into tokens, reading it in chunks.
+
+    Comments and whitespace are skipped. The mysql client DELIMITER command and
+    the standard_conforming_strings setting (backslashes are literal characters
+    in strings) are taken into account.
+
+    """
+
+    chunk_size = 1 << 16
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.delimiter = ";"
+        self.backslash_escapes = True
+
+    def iter_statements(self, keywords: Set[str]) -> Iterator[List[DdlToken]]:
+        """
+        Yield tokens of statements beginning with one of the keywords (in upper
+        case), without the delimiter. Tokens of other statements are not kept.
+
+        """
+        statement: List[DdlToken] = []
+        collect = True
+        collected_keywords = keywords | {"SET"}
+        for token in self.iter_tokens():
+            if token[0] == "delimiter":
+                if statement:
+                    self.apply_settings(statement)
+                    if statement[0][1].upper() in keywords:
+                        yield statement
+                statement = []
+                collect = True
+            elif collect:
+                if not statement and not is_ddl_keyword_in([token], 0, collected_keywords):
+                    collect = False
+                else:
+                    statement.append(token)
+        if statement and statement[0][1].upper() in keywords:
+            yield statement
+
+    def iter_tokens(self) -> Iterator[DdlToken]:
+        buffer = ""
+        position = 0
+        exhausted = False
+        statement_start = True
+        patterns = self.compile_patterns()
+        while True:
+            match = patterns[statement_start].match(buffer, position)
+            # a match reaching the end of the buffer may be a part of a longer
+            # token, read more before using it
+            if not exhausted and (match is None or match.end() == len(buffer)):
+                chunk = self.stream.read(max(self.chunk_size, len(buffer) - position))
+                exhausted = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            if match is None:
+                return
+            position = match.end()
+            kind = str(match.lastgroup)
+            if kind == "comment":
+                continue
+            if kind == "command":
+                self.delimiter = match.group("new_delimiter")
+                patterns = self.compile_patterns()
+                continue
+            value = match.group(kind)
+            statement_start = kind == "delimiter"
+            if kind == "quoted":
+                value = value[1:-1].replace(value[0] * 2, value[0])
+            yield kind, value
+            if statement_start:
+                # settings may have been changed by the statement
+                patterns = self.compile_patterns()
+
+    def compile_patterns(self) -> Tuple[Pattern[str], Pattern[str]]:
+        return (
+            compile_ddl_token_pattern(self.delimiter, self.backslash_escapes, False),
+            compile_ddl_token_pattern(self.delimiter, self.backslash_escapes, True),
+        )
+
+    def apply_settings(self, statement: Sequence[DdlToken]) -> None:
+        values = [value.upper() for _, value in statement]
+        if values[:2] == ["SET", "STANDARD_CONFORMING_STRINGS"]:
+            self.backslash_escapes = values[-1].strip("'") in ("OFF", "FALSE", "0")
+
+
+class DdlParser:
+    """
+    Read foreign keys from a schema dump, e.g. made with `pg_dump --schema-only`
+    or `mysqldump --no-data`, without connecting to a database.
+
+    Foreign keys are taken from CREATE TABLE and ALTER TABLE ... ADD statements,
+    everything else is skipped. Unqualified table names belong to the schema
+    set with USE or search_path, or to the default schema.
+
+    """
+
+    keywords = {"CREATE", "ALTER", "USE", "SET", "SELECT"}
+    create_table_modifiers = {"OR", "REPLACE", "GLOBAL", "LOCAL", "TEMPORARY", "TEMP", "UNLOGGED"}
+    constraint_keywords = {
+        "UNIQUE", "CHECK", "KEY", "INDEX", "EXCLUDE", "LIKE", "FULLTEXT", "SPATIAL", "PERIOD",
+    }
+    column_keywords = {"REFERENCES", "PRIMARY", "NOT", "NULL", "DEFAULT"}
+
+    def __init__(self, default_schema: Optional[str] = None):
+        self.default_schema = default_schema
+        self.schema = default_schema
+        self.primary_keys: MutableMapping[Tuple[Optional[str], str], List[str]] = {}
+        # foreign keys referencing a primary key without listing its columns
+        self.pending: List[Tuple[Key, Tuple[Optional[str], str]]] = []
+
+    def parse(self, stream: TextIO) -> Iterator[ForeignKey]:
+        for statement in DdlTokenizer(stream).iter_statements(self.keywords):
+            command = statement[0][1].upper()
+            if command == "CREATE":
+                yield from self.parse_create_table(statement)
+            elif command == "ALTER":
+                yield from self.parse_alter_table(statement)
+            else:
+                self.parse_schema_change(command, statement)
+        for source, (database, table) in self.pending:
+            if (database, table) in self.primary_keys:
+                yield from build_parsed_foreign_key(
+                    source,
+                    Key(database, table, self.primary_keys[(database, table)]),
+                )
+
+    def parse_create_table(self, tokens: Sequence[DdlToken]) -> Iterator[ForeignKey]:
+        index = skip_ddl_keywords(tokens, 1, self.create_table_modifiers)
+        if not is_ddl_keyword(tokens, index, "TABLE"):
+            return
+        index = skip_ddl_keywords(tokens, index + 1, {"IF", "NOT", "EXISTS"})
+        name, index = read_ddl_name(tokens, index)
+        if not name or index >= len(tokens) or tokens[index] != ("symbol", "("):
+            return
+        table = self.qualify(name)
+        end = find_closing_ddl_parenthesis(tokens, index)
+        for element in split_ddl_list(tokens[index + 1:end]):
+            yield from self.parse_table_element(table, element)
+
+    def parse_alter_table(self, tokens: Sequence[DdlToken]) -> Iterator[ForeignKey]:
+        if not is_ddl_keyword(tokens, 1, "TABLE"):
+            return
+        index = skip_ddl_keywords(tokens, 2, {"ONLY", "IF", "EXISTS"})
+        name, index = read_ddl_name(tokens, index)
+        if not name:
+            return
+        table = self.qualify(name)
+        for action in split_ddl_list(tokens[index:]):
+            if not is_ddl_keyword(action, 0, "ADD"):
+                continue
+            start = 2 if is_ddl_keyword(action, 1, "COLUMN") else 1
+            start = skip_ddl_keywords(action, start, {"IF", "NOT", "EXISTS"})
+            yield from self.parse_table_element(table, action[start:])
+
+    def parse_table_element(
+        self,
+        table: Tuple[Optional[str], str],
+        tokens: Sequence[DdlToken],
+    ) -> Iterator[ForeignKey]:
+        if is_ddl_keyword(tokens, 0, "CONSTRAINT"):
+            tokens = tokens[2:]
+        if not tokens:
+            return
+        if is_ddl_keyword(tokens, 0, "PRIMARY"):
+            self.primary_keys[table] = read_ddl_column_list(tokens, 2)[0]
+        elif is_ddl_keyword(tokens, 0, "FOREIGN"):
+            # mysql allows an index name after FOREIGN KEY
+            index = 2 if tokens[2:3] == [("symbol", "(")] else 3
+            columns, index = read_ddl_column_list(tokens, index)
+            if is_ddl_keyword(tokens, index, "REFERENCES"):
+                yield from self.parse_references(table, columns, tokens, index + 1)
+        elif self.is_constraint(tokens):
+            return
+        else:
+            # column definition
+            column = tokens[0][1]
+            for index, (kind, value) in enumerate(tokens[1:], start=1):
+                if kind != "word":
+                    continue
+                keyword = value.upper()
+                if keyword == "PRIMARY":
+                    self.primary_keys[table] = [column]
+                elif keyword == "REFERENCES":
+                    yield from self.parse_references(table, [column], tokens, index + 1)
+
+    def is_constraint(self, tokens: Sequence[DdlToken]) -> bool:
+        """
+        Tell constraint clauses from definitions of columns with the same
+        names, like key or period, which pg_dump leaves unquoted. Constraint
+        keywords are followed by names and a parenthesized list of columns or
+        an expression, column names by a type, whose parameters are numbers,
+        and column options.
+
+        """
+        if not is_ddl_keyword_in(tokens, 0, self.constraint_keywords):
+            return False
+        for index in range(1, len(tokens)):
+            kind, value = tokens[index]
+            if (kind, value) == ("symbol", "("):
+                return not tokens[index + 1:index + 2] or not tokens[index + 1][1].isdigit()
+            if kind not in ("word", "quoted") or is_ddl_keyword_in(
+                tokens, index, self.column_keywords
+            ):
+                return False
+        # LIKE other_table
+        return is_ddl_keyword(tokens, 0, "LIKE")
+
+    def parse_references(
+        self,
+        table: Tuple[Optional[str], str],
+        columns: List[str],
+        tokens: Sequence[DdlToken],
+        index: int,
+    ) -> Iterator[ForeignKey]:
+        name, index = read_ddl_name(tokens, index)
+        if not name:
+            return
+        referenced_table = self.qualify(name)
+        source = Key(table[0], table[1], columns)
+        if index < len(tokens) and tokens[index] == ("symbol", "("):
+            referenced_columns = read_ddl_column_list(tokens, index)[0]
+            destination = Key(referenced_table[0], referenced_table[1], referenced_columns)
+            yield from build_parsed_foreign_key(source, destination)
+        else:
+            self.pending.append((source, referenced_table))
+
+    def parse_schema_change(self, command: str, tokens: Sequence[DdlToken]) -> None:
+        values = [value for _, value in tokens]
+        upper_values = [value.upper() for value in values]
+        if command == "USE" and len(tokens) > 1:
+            self.schema = values[1]
+        elif command == "SET" and upper_values[1:2] in (["SEARCH_PATH"], ["SCHEMA"]):
+            schemas = [
+                value for kind, value in tokens[2:]
+                if kind != "symbol" and value.upper() not in ("TO", "FROM")
+            ]
+            self.set_search_path(", ".join(schemas))
+        elif command == "SELECT" and "SET_CONFIG" in upper_values and len(tokens) > 6:
+            # SELECT pg_catalog.set_config('search_path', '', false) from pg_dump
+            if tokens[5][0] == "string" and tokens[5][1].strip("'").lower() == "search_path":
+                self.set_search_path(tokens[7][1] if len(tokens) > 7 else "")
+
+    def set_search_path(self, search_path: str) -> None:
+        schemas = [
+            schema.strip(" '\"") for schema in search_path.strip("'").split(",")
+            if schema.strip(" '\"") and not schema.strip(" '\"").startswith("$")
+        ]
+        self.schema = schemas[0] if schemas else self.default_schema
+
+    def qualify(self, name: Sequence[str]) -> Tuple[Optional[str], str]:
+        if len(name) > 1:
+            return name[-2], name[-1]
+        return self.schema, name[0]
+
+
+def parse_ddl(stream: TextIO, default_schema: Optional[str] = None) -> Iterator[ForeignKey]:
+    return DdlParser(default_schema).parse(stream)
+
+
+def read_ddl_file(path: str, default_schema: Optional[str] = None) -> List[ForeignKey]:
+    """
+    Read foreign keys from a schema dump file, optionally gzipped, or from the
+    standard input if the path is -.
+
+    """
+    with measure_stage("parse dump"):
+        if path == "-":
+            return list(parse_ddl(sys.stdin, default_schema))
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as stream:
+            return list(parse_ddl(stream, default_schema))
+
+
+def build_parsed_foreign_key(source: Key, destination: Key) -> Iterator[ForeignKey]:
+    # constraints that the database would reject are skipped
+    try:
+        yield ForeignKey.build(source, destination)
+    except ValueError:
+        pass
+
+
+def is_ddl_keyword(tokens: Sequence[DdlToken], index: int, keyword: str) -> bool:
+    return is_ddl_keyword_in(tokens, index, {keyword})
+
+
+def is_ddl_keyword_in(tokens: Sequence[DdlToken], index: int, keywords: Set[str]) -> bool:
+    return (
+        index < len(tokens) and tokens[index][0] == "word" and tokens[index][1].upper() in keywords
+    )
+
+
+def skip_ddl_keywords(tokens: Sequence[DdlToken], index: int, keywords: Set[str]) -> int:
+    while is_ddl_keyword_in(tokens, index, keywords):
+        index += 1
+    return index
+
+
+def read_ddl_name(tokens: Sequence[DdlToken], index: int) -> Tuple[List[str], int]:
+    """
+    Read a possibly qualified name, return its parts and the index of the next token.
+
+    """
+    name: List[str] = []
+    while index < len(tokens) and tokens[index][0] in ("word", "quoted"):
+        name.append(tokens[index][1])
+        index += 1
+        if index >= len(tokens) or tokens[index] != ("symbol", "."):
+            break
+        index += 1
+    return name, index
+
+
+def read_ddl_column_list(tokens: Sequence[DdlToken], index: int) -> Tuple[List[str], int]:
+    """
+    Read column names from a parenthesized list, skipping anything following a
+    name, e.g. mysql index prefix lengths. Return the names and the index of
+    the token after the list.
+
+    """
+    if index >= len(tokens) or tokens[index] != ("symbol", "("):
+        return [], index
+    end = find_closing_ddl_parenthesis(tokens, index)
+    columns = [item[0][1] for item in split_ddl_list(tokens[index + 1:end]) if item]
+    return columns, end + 1
+
+
+def find_closing_ddl_parenthesis(tokens: Sequence[DdlToken], index: int) -> int:
+    depth = 0
+    for end in range(index, len(tokens)):
+        if tokens[end] == ("symbol", "("):
+            depth += 1
+        elif tokens[end] == ("symbol", ")"):
+            depth -= 1
+            if depth == 0:
+                return end
+    return len(tokens)
+
+
+def split_ddl_list(tokens: Sequence[DdlToken]) -> List[List[DdlToken]]:
+    """
+    Split tokens on commas that are not enclosed in parentheses.
+
+    """
+    items: List[List[DdlToken]] = [[]]
+    depth = 0
+    for token in tokens:
+        if token == ("symbol", ",") and depth == 0:
+            items.append([])
+            continue
+        if token == ("symbol", "("):
+            depth += 1
+        elif token == ("symbol", ")"):
+            depth -= 1
+        items[-1].append(token)
+    return items
+
+
+class ForeignKeyGraph:
+    """
+    Compact graph of foreign keys: tables are nodes, foreign keys are edges.
+
+    Tables are numbered with consecutive integers and the adjacency lists are
+    stored in CSR form: the neighbours of table `t` are
+    `neighbours[offsets[t]:offsets[t + 1]]` and the foreign keys linking them
+    are the matching items of `edges`. An edge is a foreign key index shifted
+    left by one bit, with the lowest bit set if the foreign key is walked from
+    its destination to its source. Key and ForeignKey objects are created only
+    for the edges of found paths.
+
+    Self-referencing foreign keys are never a part of the shortest path, so
+    they are not included in the adjacency lists.
+
+    """
+
+    snapshot_version = 1
+
+    def __init__(
+        self,
+        tables: Sequence[Tuple[Optional[str], str]],
+        foreign_key_tables: Sequence[int],
+        foreign_key_columns: Sequence[Tuple[Tuple[str, ...], Tuple[str, ...]]],
+    ):
+        self.tables = tables
+        self.foreign_key_tables = foreign_key_tables
+        self.foreign_key_columns = foreign_key_columns
+        self.offsets, self.neighbours, self.edges = build_adjacency(
+            len(tables),
+            foreign_key_tables,
+        )
+        self.table_ids = {
+            Key(database, table, ()).get_fully_qualified_table(): table_id
+            for table_id, (database, table) in enumerate(tables)
+        }
+        self.components: Optional[Sequence[int]] = None
+
+    @classmethod
+    def build(cls, foreign_keys: Iterable[ForeignKey]) -> ForeignKeyGraph:
+        tables: List[Tuple[Optional[str], str]] = []
+        table_ids: MutableMapping[Tuple[Optional[str], str], int] = {}
+        interned_columns: MutableMapping[Tuple[str, ...], Tuple[str, ...]] = {}
+        foreign_key_tables = array("l")
+        foreign_key_columns: List[Tuple[Tuple[str, ...], Tuple[str, ...]]] = []
+
+        def intern_table(key: Key) -> int:
+            table = (key.database, key.table)
+            if table not in table_ids:
+                table_ids[table] = len(tables)
+                tables.append(table)
+            return table_ids[table]
+
+        def intern_columns(key: Key) -> Tuple[str, ...]:
+            columns = tuple(key.columns)
+            return interned_columns.setdefault(columns, columns)
+
+        with measure_stage("build graph"):
+            for foreign_key in foreign_keys:
+                foreign_key_tables.append(intern_table(foreign_key.source))
+                foreign_key_tables.append(intern_table(foreign_key.destination))
+                foreign_key_columns.append(
+                    (intern_columns(foreign_key.source), intern_columns(foreign_key.destination))
+                )
+            graph = cls(tables, foreign_key_tables, foreign_key_columns)
+            count_stat("tables", graph.table_count())
+            count_stat("foreign keys", graph.foreign_key_count())
+            count_stat("edges", len(graph.edges) // 2)
+            return graph
+
+    def table_count(self) -> int:
+        return len(self.tables)
+
+    def foreign_key_count(self) -> int:
+        return len(self.foreign_key_columns)
+
+    def get_table_id(self, table: str) -> Optional[int]:
+        return self.table_ids.get(table)
+
+    def get_table(self, table_id: int) -> Tuple[Optional[str], str]:
+        return self.tables[table_id]
+
+    def get_table_name(self, table_id: int) -> str:
+        database, table = self.tables[table_id]
+        return table if database is None else f"{database}.{table}"
+
+    def get_foreign_key(self, index: int) -> ForeignKey:
+        source_columns, destination_columns = self.foreign_key_columns[index]
+        source_database, source_table = self.tables[self.foreign_key_tables[2 * index]]
+        destination_database, destination_table = self.tables[
+            self.foreign_key_tables[2 * index + 1]
+        ]
+        return ForeignKey(
+            source=Key(source_database, source_table, list(source_columns)),
+            destination=Key(destination_database, destination_table, list(destination_columns)),
+        )
+
+    def create_path(self, edges: Iterable[int]) -> Path:
+        return Path(self.get_foreign_key(edge >> 1) for edge in edges)
+
+    def index_components(self) -> None:
+        """
+        Number the connected components of the graph, so that searches
+        between tables that can't be joined end at once. Worth it for graphs
+        kept in memory for many searches.
+
+        """
+        self.components = find_components(self)
+
+    def digest(self) -> str:
+        # tables and their links, which is everything that distances depend on
+        digest = hashlib.sha256()
+        digest.update(json.dumps(list(self.tables)).encode())
+        digest.update(array("l", self.foreign_key_tables).tobytes())
+        return digest.hexdigest()
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Save the graph as a header line followed by flat arrays, in the format
+        mapped by MappedForeignKeyGraph.
+
+        """
+        strings: MutableMapping[str, int] = {}
+
+        def intern_string(text: str) -> int:
+            return strings.setdefault(text, len(strings))
+
+        table_strings = array("q")
+        for database, table in self.tables:
+            table_strings.append(-1 if database is None else intern_string(database))
+            table_strings.append(intern_string(table))
+        column_offsets = array("q", [0])
+        column_ids = array("q")
+        for columns_pair in self.foreign_key_columns:
+            for columns in columns_pair:
+                column_ids.extend(intern_string(column) for column in columns)
+                column_offsets.append(len(column_ids))
+        encoded_strings = [text.encode() for text in strings]
+        string_offsets = array("q", [0])
+        for encoded_string in encoded_strings:
+            string_offsets.append(string_offsets[-1] + len(encoded_string))
+        arrays = {
+            "offsets": array("q", self.offsets),
+            "neighbours": array("q", self.neighbours),
+            "edges": array("q", self.edges),
+            "foreign_key_tables": array("q", self.foreign_key_tables),
+            "table_strings": table_strings,
+            "table_order": array("q", sorted(range(self.table_count()), key=self.get_table_name)),
+            "column_offsets": column_offsets,
+            "column_ids": column_ids,
+            "string_offsets": string_offsets,
+        }
+        sections = {}
+        position = 0
+        for name, values in arrays.items():
+            sections[name] = (position, len(values) * values.itemsize)
+            position += len(values) * values.itemsize
+        sections["strings"] = (position, string_offsets[-1])
+        header = json.dumps({
+            "version": self.snapshot_version,
+            "byteorder": sys.byteorder,
+            "digest": self.digest(),
+            "sections": sections,
+        }).encode() + b"\n"
+        # write to a temporary file first, so that processes still mapping the
+        # old snapshot keep reading it
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(header)
+            snapshot_file.write(bytes(get_snapshot_data_offset(len(header)) - len(header)))
+            for values in arrays.values():
+                values.tofile(snapshot_file)
+            for encoded_string in encoded_strings:
+                snapshot_file.write(encoded_string)
+        os.replace(temporary_path, path)
+
+
+class MappedForeignKeyGraph(ForeignKeyGraph):
+    """
+    Read-only graph memory-mapped from a snapshot file written with
+    ForeignKeyGraph.save_snapshot.
+
+    The adjacency arrays are used directly from the mapped file, so opening
+    a snapshot takes about the same time regardless of the schema size, and
+    processes mapping the same file share its pages. Table names are stored
+    in a string table and looked up with a binary search over the table ids
+    sorted by name. Key and ForeignKey objects are created only for the edges
+    of found paths, as with the in-memory graph.
+
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as snapshot_file:
+            header = json.loads(snapshot_file.readline())
+            if header.get("version") != self.snapshot_version:
+                raise ValueError(f"unsupported graph snapshot version: {header.get('version')}")
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(f"graph snapshot byte order is {header['byteorder']}")
+            data_offset = get_snapshot_data_offset(snapshot_file.tell())
+            self.mapping = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self.mapping)[data_offset:]
+        sections = {
+            name: data[start:start + length] for name, (start, length) in header["sections"].items()
+        }
+        self.offsets = sections["offsets"].cast("q")
+        self.neighbours = sections["neighbours"].cast("q")
+        self.edges = sections["edges"].cast("q")
+        self.foreign_key_tables = sections["foreign_key_tables"].cast("q")
+        self.table_strings = sections["table_strings"].cast("q")
+        self.table_order = sections["table_order"].cast("q")
+        self.column_offsets = sections["column_offsets"].cast("q")
+        self.column_ids = sections["column_ids"].cast("q")
+        self.string_offsets = sections["string_offsets"].cast("q")
+        self.strings = sections["strings"]
+        self.graph_digest: str = header["digest"]
+        self.components: Optional[Sequence[int]] = None
+
+    def __reduce__(self) -> Tuple[Callable[[str], MappedForeignKeyGraph], Tuple[str]]:
+        # worker processes map the file again instead of copying the graph
+        return (type(self), (self.path,))
+
+    def save_snapshot(self, path: str) -> None:
+        # the mapped file is a snapshot already
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(self.mapping)
+        os.replace(temporary_path, path)
+
+    def table_count(self) -> int:
+        return len(self.table_strings) // 2
+
+    def foreign_key_count(self) -> int:
+        return len(self.foreign_key_tables) // 2
+
+    def get_string(self, string_id: int) -> str:
+        return str(
+            self.strings[self.string_offsets[string_id]:self.string_offsets[string_id + 1]],
+            "utf-8",
+        )
+
+    def get_table(self, table_id: int) -> Tuple[Optional[str], str]:
+        database_id = self.table_strings[2 * table_id]
+        return (
+            None if database_id < 0 else self.get_string(database_id),
+            self.get_string(self.table_strings[2 * table_id + 1]),
+        )
+
+    def get_table_id(self, table: str) -> Optional[int]:
+        low = 0
+        high = len(self.table_order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_table_name(self.table_order[middle]) < table:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.table_order) and self.get_table_name(self.table_order[low]) == table:
+            return self.table_order[low]
+        return None
+
+    def get_table_name(self, table_id: int) -> str:
+        database, table = self.get_table(table_id)
+        return table if database is None else f"{database}.{table}"
+
+    def get_columns(self, index: int) -> List[str]:
+        start = self.column_offsets[index]
+        end = self.column_offsets[index + 1]
+        return [self.get_string(string_id) for string_id in self.column_ids[start:end]]
+
+    def get_foreign_key(self, index: int) -> ForeignKey:
+        source_database, source_table = self.get_table(self.foreign_key_tables[2 * index])
+        destination_database, destination_table = self.get_table(
+            self.foreign_key_tables[2 * index + 1]
+        )
+        return ForeignKey(
+            source=Key(source_database, source_table, self.get_columns(2 * index)),
+            destination=Key(
+                destination_database,
+                destination_table,
+                self.get_columns(2 * index + 1),
+            ),
+        )
+
+    def digest(self) -> str:
+        return self.graph_digest
+
+
+def get_snapshot_data_offset(header_size: int) -> int:
+    # arrays are aligned to 8 bytes, counting from the start of the file
+    return (header_size + 7) // 8 * 8
+
+
+class TableNameIndex:
+    """
+    Resolve table names given by users to the names of tables in a graph.
+
+    A name is looked up as it is, then qualified with the default schema,
+    then case-insensitively and, if it's unqualified, in all schemas. Names
+    that don't match any table are rejected with suggestions of tables with
+    similar names, ranked by the similarity of their sets of trigrams. The
+    lookup structures are built only when a name isn't found as it is.
+
+    The graph has only the tables with foreign keys. The other tables are
+    listed with `list_tables`, if given, also only when a name isn't found
+    in the graph. They resolve to their names, with no paths to find.
+
+    """
+
+    def __init__(
+        self,
+        graph: ForeignKeyGraph,
+        default_schema: Optional[str] = None,
+        list_tables: Optional[Callable[[], Iterable[str]]] = None,
+    ):
+        self.graph = graph
+        self.default_schema = default_schema
+        self.list_tables = list_tables
+        # lowercase names, qualified and not, and trigrams of lowercase names
+        # without the schema -> fully qualified names
+        self.folded_names: MutableMapping[str, List[str]] = {}
+        self.folded_tables: MutableMapping[str, List[str]] = {}
+        self.trigrams: MutableMapping[str, List[str]] = {}
+        self.trigram_counts: MutableMapping[str, int] = {}
+
+    def resolve(self, table_name: str) -> str:
+        if self.graph.get_table_id(table_name) is not None:
+            return table_name
+        qualified = "." in table_name
+        default_table_name = None
+        if not qualified and self.default_schema is not None:
+            default_table_name = f"{self.default_schema}.{table_name}"
+            if self.graph.get_table_id(default_table_name) is not None:
+                return default_table_name
+        if not self.folded_names:
+            self.build()
+        candidates = self.folded_names.get(table_name.lower(), [])
+        if not candidates and default_table_name is not None:
+            candidates = self.folded_names.get(default_table_name.lower(), [])
+        if not candidates and not qualified:
+            candidates = self.folded_tables.get(table_name.lower(), [])
+            same_case = [name for name in candidates if name.rpartition(".")[2] == table_name]
+            if len(same_case) == 1:
+                return same_case[0]
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            raise AmbiguousTableName(table_name, sorted(candidates))
+        raise UnknownTableName(table_name, self.suggest(table_name))
+
+    def suggest(self, table_name: str, count: int = 3) -> List[str]:
+        """
+        Find tables whose names, without the schema, have at least a fifth
+        of their trigrams in common with the name (counting the trigrams of
+        both names). The most similar names come first.
+
+        """
+        if not self.folded_names:
+            self.build()
+        trigrams = get_trigrams(table_name.rpartition(".")[2])
+        shared = Counter(
+            name for trigram in trigrams for name in self.trigrams.get(trigram, ())
+        )
+        similarities = []
+        for name, shared_count in shared.items():
+            similarity = shared_count / (
+                len(trigrams) + self.trigram_counts[name] - shared_count
+            )
+            if similarity >= 0.2:
+                similarities.append((-similarity, name))
+        return [name for _, name in sorted(similarities)[:count]]
+
+    def build(self) -> None:
+        # fully qualified names and names without the schema
+        names = [
+            (Key(database, table, ()).get_fully_qualified_table(), table)
+            for database, table in map(self.graph.get_table, range(self.graph.table_count()))
+        ]
+        if self.list_tables is not None:
+            graph_names = {name for name, _ in names}
+            names += [
+                (name, name.rpartition(".")[2])
+                for name in sorted(set(self.list_tables()) - graph_names)
+            ]
+        for name, table in names:
+            self.folded_names.setdefault(name.lower(), []).append(name)
+            self.folded_tables.setdefault(table.lower(), []).append(name)
+            trigrams = get_trigrams(table)
+            for trigram in trigrams:
+                self.trigrams.setdefault(trigram, []).append(name)
+            self.trigram_counts[name] = len(trigrams)
+
+
+def get_trigrams(name: str) -> Set[str]:
+    padded_name = f"  {name.lower()} "
+    return {padded_name[index:index + 3] for index in range(len(padded_name) - 2)}
+
+
+class DistanceIndex:
+    """
+    Shortest join distances between all pairs of tables of a graph.
+
+    The distances are stored in a flat array holding the upper triangle of the
+    distance matrix, with the largest value of the array type marking tables
+    that can't be joined. One byte per pair is used unless some distance
+    doesn't fit, so the index for 10,000 tables takes about 50 MB.
+
+    """
+
+    version = 1
+
+    def __init__(self, table_count: int, distances: array, graph_digest: str):
+        self.table_count = table_count
+        self.distances = distances
+        self.graph_digest = graph_digest
+        self.unreachable = 2 ** (8 * distances.itemsize) - 1
+
+    @classmethod
+    def build(cls, graph: ForeignKeyGraph, jobs: Optional[int] = None) -> DistanceIndex:
+        """
+        Run a breadth-first search from each table. The searches are spread
+        over a pool of worker processes, unless `jobs` is 1.
+
+        """
+        table_count = graph.table_count()
+        sources = list(range(table_count))
+        if jobs == 1 or table_count < 2:
+            rows = compute_distance_rows(graph, sources)
+        else:
+            chunk_size = max(1, table_count // (4 * (jobs or os.cpu_count() or 1)))
+            chunks = [
+                sources[index:index + chunk_size] for index in range(0, table_count, chunk_size)
+            ]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                rows = [
+                    row
+                    for chunk_rows in executor.map(partial(compute_distance_rows, graph), chunks)
+                    for row in chunk_rows
+                ]
+        distances = array("H")
+        for row in rows:
+            distances.extend(row)
+        if all(distance < 0xFF or distance == 0xFFFF for distance in distances):
+            distances = array(
+                "B",
+                (0xFF if distance == 0xFFFF else distance for distance in distances),
+            )
+        return cls(table_count, distances, graph.digest())
+
+    def get_distance(self, begin: int, end: int) -> Optional[int]:
+        if begin == end:
+            return 0
+        if begin > end:
+            begin, end = end, begin
+        # position of (begin, end) in the row-major upper triangle, without the diagonal
+        position = begin * (2 * self.table_count - begin - 1) // 2 + end - begin - 1
+        distance = self.distances[position]
+        return None if distance == self.unreachable else distance
+
+    def matches(self, graph: ForeignKeyGraph) -> bool:
+        return self.graph_digest == graph.digest()
+
+    def save(self, path: str) -> None:
+        header = {
+            "version": self.version,
+            "table_count": self.table_count,
+            "typecode": self.distances.typecode,
+            "graph_digest": self.graph_digest,
+        }
+        with open(path, "wb") as index_file:
+            index_file.write(json.dumps(header).encode() + b"\n")
+            self.distances.tofile(index_file)
+
+    @classmethod
+    def load(cls, path: str) -> DistanceIndex:
+        with open(path, "rb") as index_file:
+            header = json.loads(index_file.readline())
+            if header.get("version") != cls.version:
+                raise ValueError(f"unsupported distance index version: {header.get('version')}")
+            distances = array(header["typecode"])
+            distances.frombytes(index_file.read())
+        return cls(header["table_count"], distances, header["graph_digest"])
+
+
+def compute_distance_rows(graph: ForeignKeyGraph, sources: Iterable[int]) -> List[array]:
+    # For each source table, distances to the tables with higher ids, or 0xFFFF
+    # if a table can't be reached.
+    table_count = graph.table_count()
+    rows = []
+    for source in sources:
+        distances = array("H", [0xFFFF]) * table_count
+        distances[source] = 0
+        frontier = [source]
+        level = 0
+        while frontier:
+            level += 1
+            next_frontier = []
+            for table in frontier:
+                for position in range(graph.offsets[table], graph.offsets[table + 1]):
+                    neighbour = graph.neighbours[position]
+                    if distances[neighbour] == 0xFFFF:
+                        distances[neighbour] = level
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        rows.append(distances[source + 1:])
+    return rows
+
+
+def build_adjacency(
+    table_count: int,
+    foreign_key_tables: Sequence[int],
+) -> Tuple[Sequence[int], Sequence[int], Sequence[int]]:
+    offsets = array("l", bytes(array("l").itemsize * (table_count + 1)))
+    for index in range(0, len(foreign_key_tables), 2):
+        source = foreign_key_tables[index]
+        destination = foreign_key_tables[index + 1]
+        if source != destination:
+            offsets[source + 1] += 1
+            offsets[destination + 1] += 1
+    for table_id in range(table_count):
+        offsets[table_id + 1] += offsets[table_id]
+    neighbours = array("l", bytes(array("l").itemsize * offsets[-1]))
+    edges = array("l", bytes(array("l").itemsize * offsets[-1]))
+    positions = offsets[:-1]
+    # foreign_key_tables holds two items per foreign key, so the index of the
+    # source item is already the foreign key index shifted left by one bit
+    for index in range(0, len(foreign_key_tables), 2):
+        source = foreign_key_tables[index]
+        destination = foreign_key_tables[index + 1]
+        if source == destination:
+            continue
+        neighbours[positions[source]] = destination
+        edges[positions[source]] = index
+        positions[source] += 1
+        neighbours[positions[destination]] = source
+        edges[positions[destination]] = index | 1
+        positions[destination] += 1
+    return offsets, neighbours, edges
+
+
+class GraphAnalysis(NamedTuple):
+    """
+    Structure of a graph of foreign keys: connected components, articulation
+    tables and bridges (tables and foreign keys that disconnect some tables
+    when removed) and the number of foreign keys (degree) and estimated
+    betweenness centrality of each table.
+
+    """
+
+    components: Sequence[int]
+    articulation_tables: Sequence[int]
+    bridges: Sequence[int]
+    degrees: Sequence[int]
+    betweenness: Sequence[float]
+
+    def get_component_sizes(self) -> List[int]:
+        return sorted(Counter(self.components).values(), reverse=True)
+
+    def count_disconnected_pairs(self) -> int:
+        table_count = len(self.components)
+        connected_pairs = sum(size * (size - 1) // 2 for size in self.get_component_sizes())
+        return table_count * (table_count - 1) // 2 - connected_pairs
+
+    def rank_hubs(self) -> List[int]:
+        return sorted(
+            range(len(self.degrees)),
+            key=lambda table: (-self.betweenness[table], -self.degrees[table], table),
+        )
+
+    def to_dict(self, graph: ForeignKeyGraph, limit: Optional[int] = None) -> Mapping[str, object]:
+        return {
+            "tables": graph.table_count(),
+            "foreign_keys": graph.foreign_key_count(),
+            "component_sizes": self.get_component_sizes()[:limit],
+            "disconnected_pairs": self.count_disconnected_pairs(),
+            "articulation_tables": [
+                graph.get_table_name(table) for table in self.articulation_tables[:limit]
+            ],
+            "bridges": [
+                foreign_key_to_dict(graph.get_foreign_key(index)) for index in self.bridges[:limit]
+            ],
+            "hubs": [
+                {
+                    "table": graph.get_table_name(table),
+                    "degree": self.degrees[table],
+                    "betweenness": self.betweenness[table],
+                }
+                for table in self.rank_hubs()[:limit]
+            ],
+        }
+
+    def format_text(self, graph: ForeignKeyGraph, limit: Optional[int] = None) -> str:
+        component_sizes = self.get_component_sizes()
+        lines = [
+            f"tables: {graph.table_count()}, foreign keys: {graph.foreign_key_count()}",
+            f"components: {len(component_sizes)}, sizes: "
+            + ", ".join(map(str, component_sizes[:limit]))
+            + (", ..." if limit is not None and len(component_sizes) > limit else ""),
+            f"table pairs that can't be joined: {self.count_disconnected_pairs()}",
+            f"articulation tables: {len(self.articulation_tables)}",
+        ]
+        lines += [
+            "\t" + graph.get_table_name(table) for table in self.articulation_tables[:limit]
+        ]
+        lines.append(f"bridges: {len(self.bridges)}")
+        lines += ["\t" + str(graph.get_foreign_key(index)) for index in self.bridges[:limit]]
+        lines.append("hubs:")
+        lines += [
+            f"\t{graph.get_table_name(table)}, degree {self.degrees[table]},"
+            f" betweenness {self.betweenness[table]:.1f}"
+            for table in self.rank_hubs()[:limit]
+        ]
+        return "\n".join(lines)
+
+
+def analyze_graph(
+    graph: ForeignKeyGraph,
+    samples: Optional[int] = 32,
+    seed: int = 0,
+) -> GraphAnalysis:
+    """
+    Compute the structure of the graph, in linear time except for the
+    betweenness, which is estimated from breadth-first searches started at
+    a random sample of tables (or all of them, if samples is None).
+
+    """
+    with measure_stage("analyze graph"):
+        articulation_tables, bridges = find_articulation_tables_and_bridges(graph)
+        return GraphAnalysis(
+            components=find_components(graph),
+            articulation_tables=articulation_tables,
+            bridges=bridges,
+            degrees=[
+                graph.offsets[table + 1] - graph.offsets[table]
+                for table in range(graph.table_count())
+            ],
+            betweenness=estimate_betweenness(graph, samples, seed),
+        )
+
+
+def find_components(graph: ForeignKeyGraph) -> Sequence[int]:
+    """
+    Number the connected components. Return the component number of each
+    table.
+
+    """
+    components = array("l", [-1]) * graph.table_count()
+    component = 0
+    for root in range(graph.table_count()):
+        if components[root] >= 0:
+            continue
+        components[root] = component
+        stack = [root]
+        while stack:
+            table = stack.pop()
+            for position in range(graph.offsets[table], graph.offsets[table + 1]):
+                neighbour = graph.neighbours[position]
+                if components[neighbour] < 0:
+                    components[neighbour] = component
+                    stack.append(neighbour)
+        component += 1
+    return components
+
+
+def find_articulation_tables_and_bridges(graph: ForeignKeyGraph) -> Tuple[List[int], List[int]]:
+    """
+    Find tables and foreign keys whose removal disconnects some tables, with
+    Tarjan's depth-first search, run iteratively so that deep schemas don't
+    hit the recursion limit. Parallel foreign keys are never bridges: only
+    the foreign key a table was reached with is skipped, so the others link
+    the tables again.
+
+    Return sorted table ids and foreign key indices.
+
+    """
+    offsets = graph.offsets
+    neighbours = graph.neighbours
+    edges = graph.edges
+    table_count = graph.table_count()
+    discovery = array("l", [-1]) * table_count
+    low = array("l", [0]) * table_count
+    articulation = bytearray(table_count)
+    bridges: List[int] = []
+    counter = 0
+    for root in range(table_count):
+        if discovery[root] >= 0:
+            continue
+        discovery[root] = low[root] = counter
+        counter += 1
+        root_children = 0
+        # table, foreign key it was reached with, next position in its adjacency list
+        stack = [[root, -1, offsets[root]]]
+        while stack:
+            top = stack[-1]
+            table, parent_foreign_key, position = top
+            if position < offsets[table + 1]:
+                top[2] = position + 1
+                foreign_key = edges[position] >> 1
+                if foreign_key == parent_foreign_key:
+                    continue
+                neighbour = neighbours[position]
+                if discovery[neighbour] < 0:
+                    discovery[neighbour] = low[neighbour] = counter
+                    counter += 1
+                    stack.append([neighbour, foreign_key, offsets[neighbour]])
+                elif discovery[neighbour] < low[table]:
+                    low[table] = discovery[neighbour]
+                continue
+            stack.pop()
+            if not stack:
+                continue
+            parent = stack[-1][0]
+            if low[table] < low[parent]:
+                low[parent] = low[table]
+            if low[table] > discovery[parent]:
+                bridges.append(parent_foreign_key)
+            if parent == root:
+                root_children += 1
+            elif low[table] >= discovery[parent]:
+                articulation[parent] = 1
+        if root_children > 1:
+            articulation[root] = 1
+    return [table for table in range(table_count) if articulation[table]], sorted(bridges)
+
+
+def estimate_betweenness(
+    graph: ForeignKeyGraph,
+    samples: Optional[int] = None,
+    seed: int = 0,
+) -> List[float]:
+    """
+    Estimate the betweenness centrality of each table (the number of shortest
+    paths between other tables going through it) with Brandes' algorithm run
+    from a random sample of source tables, scaled up to all tables. Parallel
+    foreign keys give separate shortest paths.
+
+    """
+    offsets = graph.offsets
+    neighbours = graph.neighbours
+    table_count = graph.table_count()
+    sources: Sequence[int] = range(table_count)
+    if samples is not None and samples < table_count:
+        sources = random.Random(seed).sample(sources, samples)
+    betweenness = [0.0] * table_count
+    for source in sources:
+        distances = array("l", [-1]) * table_count
+        distances[source] = 0
+        path_counts = [0] * table_count
+        path_counts[source] = 1
+        # tables in the order of distance, for the dependencies
+        order = []
+        queue = deque([source])
+        while queue:
+            table = queue.popleft()
+            order.append(table)
+            distance = distances[table] + 1
+            path_count = path_counts[table]
+            for neighbour in neighbours[offsets[table]:offsets[table + 1]]:
+                if distances[neighbour] < 0:
+                    distances[neighbour] = distance
+                    queue.append(neighbour)
+                if distances[neighbour] == distance:
+                    path_counts[neighbour] += path_count
+        # dependencies are propagated to the predecessors found again in the
+        # adjacency lists, instead of being recorded during the search
+        dependencies = [0.0] * table_count
+        for table in reversed(order):
+            distance = distances[table] - 1
+            dependency = (1 + dependencies[table]) / path_counts[table]
+            for neighbour in neighbours[offsets[table]:offsets[table + 1]]:
+                if distances[neighbour] == distance:
+                    dependencies[neighbour] += path_counts[neighbour] * dependency
+            if table != source:
+                betweenness[table] += dependencies[table]
+    # each pair is counted from both ends
+    scale = table_count / max(1, len(sources)) / 2
+    return [value * scale for value in betweenness]
+
+
+def gather_paths(
+    graph: ForeignKeyGraph,
+    begin_table: str,
+    end_table: str,
+    distance_index: Optional[DistanceIndex] = None,
+) -> List[Path]:
+    return list(iter_paths(graph, begin_table, end_table, distance_index))
+
+
+def iter_paths(
+    graph: ForeignKeyGraph,
+    begin_table: str,
+    end_table: str,
+    distance_index: Optional[DistanceIndex] = None,
+    max_length: Optional[int] = None,
+    constraints: Optional[SearchConstraints] = None,
+) -> Iterator[Path]:
+    """
+    Find all shortest paths between two tables, see iter_path_bundles.
+
+    """
+    for bundle in iter_path_bundles(
+        graph, begin_table, end_table, distance_index, max_length, constraints
+    ):
+        yield from bundle
+
+
+def iter_path_bundles(
+    graph: ForeignKeyGraph,
+    begin_table: str,
+    end_table: str,
+    distance_index: Optional[DistanceIndex] = None,
+    max_length: Optional[int] = None,
+    constraints: Optional[SearchConstraints] = None,
+) -> Iterator[PathBundle]:
+    """
+    Find all shortest paths between two tables, grouped into bundles of paths
+    joining the same tables.
+
+    The foreign keys are treated as undirected edges of a multigraph. A
+    bidirectional, level-synchronous breadth-first search is run from both
+    ends until the frontiers meet. Every edge that reaches a table on the next
+    level is recorded, so the visited tables form two predecessor DAGs that
+    contain all the shortest paths and nothing else. The bundles are then
+    generated lazily by walking these DAGs through the tables where the two
+    searches met, sorted by their edges.
+
+    With a distance index built for the graph, unreachable tables are detected
+    without any search and only the tables lying on shortest paths are visited.
+
+    The search stops early if the shortest paths are longer than max_length.
+
+    With constraints, only the joins they allow are followed. The distance
+    index then only detects unreachable tables and paths that are too long,
+    since the constrained paths may be longer than the indexed distances.
+
+    """
+    begin = graph.get_table_id(begin_table)
+    end = graph.get_table_id(end_table)
+    if begin is None or end is None or begin == end:
+        return
+    if graph.components is not None and graph.components[begin] != graph.components[end]:
+        return
+    if distance_index is not None:
+        distance = distance_index.get_distance(begin, end)
+        if distance is None or (max_length is not None and distance > max_length):
+            return
+        if constraints is None:
+            yield from iter_dag_bundles(
+                graph,
+                begin,
+                end,
+                [end],
+                find_indexed_predecessors(graph, distance_index, begin, end, distance),
+                {end: []},
+            )
+            return
+    forward: MutableMapping[int, List[Tuple[int, int]]] = {begin: []}
+    backward: MutableMapping[int, List[Tuple[int, int]]] = {end: []}
+    forward_frontier = [begin]
+    backward_frontier = [end]
+    meeting_tables: List[int] = []
+    length = 0
+    while not meeting_tables and forward_frontier and backward_frontier:
+        length += 1
+        if max_length is not None and length > max_length:
+            return
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier = expand_frontier(graph, forward_frontier, forward, constraints)
+            meeting_tables = [table for table in forward_frontier if table in backward]
+        else:
+            backward_frontier = expand_frontier(
+                graph, backward_frontier, backward, constraints, backward=True
+            )
+            meeting_tables = [table for table in backward_frontier if table in forward]
+    yield from iter_dag_bundles(graph, begin, end, meeting_tables, forward, backward)
+
+
+def find_indexed_predecessors(
+    graph: ForeignKeyGraph,
+    distance_index: DistanceIndex,
+    begin: int,
+    end: int,
+    distance: int,
+) -> Mapping[int, List[Tuple[int, int]]]:
+    predecessors: MutableMapping[int, List[Tuple[int, int]]] = {begin: []}
+    frontier = [begin]
+    for level in range(distance):
+        # a table is on a shortest path if it's one join further from the
+        # begin table and one join closer to the end table
+        remaining_distance = distance - level - 1
+        next_frontier = []
+        for table in frontier:
+            for position in range(graph.offsets[table], graph.offsets[table + 1]):
+                neighbour = graph.neighbours[position]
+                if distance_index.get_distance(neighbour, end) != remaining_distance:
+                    continue
+                if neighbour not in predecessors:
+                    predecessors[neighbour] = []
+                    next_frontier.append(neighbour)
+                predecessors[neighbour].append((table, graph.edges[position]))
+        frontier = next_frontier
+    return predecessors
+
+
+def gather_paths_from(
+    graph: ForeignKeyGraph,
+    begin_table: str,
+    end_tables: Sequence[str],
+) -> Iterable[List[Path]]:
+    """
+    Find all shortest paths from one table to each of the given tables.
+
+    A single breadth-first search from the begin table is run until all the
+    end tables are reached. The paths for each end table are yielded in the
+    order of the end tables.
+
+    """
+    begin = graph.get_table_id(begin_table)
+    ends = [graph.get_table_id(end_table) for end_table in end_tables]
+    predecessors: MutableMapping[int, List[Tuple[int, int]]] = {}
+    if begin is not None:
+        predecessors[begin] = []
+        frontier = [begin]
+        remaining = {end for end in ends if end is not None and end != begin}
+        while remaining and frontier:
+            frontier = expand_frontier(graph, frontier, predecessors)
+            remaining.difference_update(frontier)
+    for end in ends:
+        if begin is None or end is None or end == begin or end not in predecessors:
+            yield []
+            continue
+        yield [
+            found_path
+            for bundle in iter_dag_bundles(graph, begin, end, [end], predecessors, {end: []})
+            for found_path in bundle
+        ]
+
+
+def expand_frontier(
+    graph: ForeignKeyGraph,
+    frontier: Sequence[int],
+    predecessors: MutableMapping[int, List[Tuple[int, int]]],
+    constraints: Optional[SearchConstraints] = None,
+    backward: bool = False,
+) -> List[int]:
+    offsets = graph.offsets
+    neighbours = graph.neighbours
+    edges = graph.edges
+    next_frontier: List[int] = []
+    next_level: Set[int] = set()
+    count_stat("expanded tables", len(frontier))
+    for table in frontier:
+        for position in range(offsets[table], offsets[table + 1]):
+            neighbour = neighbours[position]
+            if constraints is not None and not constraints.allows(
+                neighbour, edges[position], backward
+            ):
+                continue
+            if neighbour not in predecessors:
+                predecessors[neighbour] = []
+                next_frontier.append(neighbour)
+                next_level.add(neighbour)
+            elif neighbour not in next_level:
+                continue
+            predecessors[neighbour].append((table, edges[position]))
+    return next_frontier
+
+
+def iter_dag_bundles(
+    graph: ForeignKeyGraph,
+    begin: int,
+    end: int,
+    meeting_tables: Iterable[int],
+    forward: Mapping[int, Sequence[Tuple[int, int]]],
+    backward: Mapping[int, Sequence[Tuple[int, int]]],
+) -> Iterator[PathBundle]:
+    """
+    Generate paths from the begin table to the end table, going through the
+    predecessor DAG of a search started at the begin table (forward) up to one
+    of the meeting tables, and then through the predecessor DAG of a search
+    started at the end table (backward).
+
+    Parallel foreign keys linking the same two tables are grouped together,
+    so the walk goes over sequences of tables and each of them is yielded as
+    a bundle of paths. The number of walked sequences doesn't grow with the
+    number of parallel foreign keys.
+
+    Bundles are generated in the order of their foreign keys, by a depth-first
+    walk choosing the next table in sorted order. Only the current sequence is
+    kept in memory.
+
+    """
+    # Successors in the forward DAG, limited to the tables that lead to one of
+    # the meeting tables. Tables in the backward DAG use their predecessors.
+    successors: MutableMapping[int, MutableMapping[int, List[int]]] = {}
+    stack = list(meeting_tables)
+    visited = set(stack)
+    while stack:
+        table = stack.pop()
+        for predecessor, edge in forward[table]:
+            successors.setdefault(predecessor, {}).setdefault(table, []).append(edge)
+            if predecessor not in visited:
+                visited.add(predecessor)
+                stack.append(predecessor)
+    sorted_successors: MutableMapping[int, List[Tuple[List[int], int]]] = {}
+
+    def get_edge_key(edge: int) -> Tuple[ForeignKey, int]:
+        return (graph.get_foreign_key(edge >> 1), edge)
+
+    def get_sorted_successors(table: int) -> List[Tuple[List[int], int]]:
+        if table not in sorted_successors:
+            linked_tables = successors.get(table)
+            if linked_tables is None:
+                linked_tables = {}
+                for predecessor, edge in backward[table]:
+                    linked_tables.setdefault(predecessor, []).append(edge)
+            steps = [
+                (sorted(edges, key=get_edge_key), linked_table)
+                for linked_table, edges in linked_tables.items()
+            ]
+            sorted_successors[table] = sorted(steps, key=lambda step: get_edge_key(step[0][0]))
+        return sorted_successors[table]
+
+    if begin not in successors and begin not in backward:
+        return
+    bundle_steps: List[List[int]] = []
+    walk = [iter(get_sorted_successors(begin))]
+    while walk:
+        step = next(walk[-1], None)
+        if step is None:
+            walk.pop()
+            if bundle_steps:
+                bundle_steps.pop()
+            continue
+        edges, table = step
+        if table == end:
+            yield PathBundle(graph, bundle_steps + [edges])
+            continue
+        bundle_steps.append(edges)
+        walk.append(iter(get_sorted_successors(table)))
+
+
+class WeightedPath(NamedTuple):
+    cost: float
+    edges: Tuple[int, ...]
+    tables: Tuple[int, ...]
+
+
+def iter_cheapest_paths(
+    graph: ForeignKeyGraph,
+    begin_table: str,
+    end_table: str,
+    weight: EdgeWeight = hop_weight,
+    max_length: Optional[int] = None,
+    constraints: Optional[SearchConstraints] = None,
+) -> Iterator[Path]:
+    """
+    Generate loopless paths between two tables, cheapest first, using Yen's
+    algorithm.
+
+    Each next path is the cheapest deviation from the paths already found:
+    for every table of the last found path, the path is cut there and the
+    cheapest way to the end table is searched with Dijkstra's algorithm,
+    without the tables of the path before the cut and without the edges that
+    previously found paths with the same beginning take at that table.
+    Parallel foreign keys are separate edges, so they give separate paths.
+    With `max_length`, the searches only consider paths that fit the limit,
+    so longer paths are never generated.
+
+    """
+    begin = graph.get_table_id(begin_table)
+    end = graph.get_table_id(end_table)
+    if begin is None or end is None or begin == end:
+        return
+    for path in iter_weighted_paths(
+        graph, begin, end, create_edge_weight(graph, weight), constraints, max_length
+    ):
+        yield graph.create_path(path.edges)
+
+
+def create_edge_weight(graph: ForeignKeyGraph, weight: EdgeWeight) -> Callable[[int, int], float]:
+    edge_weights: MutableMapping[int, float] = {}
+
+    def get_edge_weight(edge: int, joined_table: int) -> float:
+        if edge not in edge_weights:
+            edge_weights[edge] = weight(
+                graph.get_foreign_key(edge >> 1),
+                graph.get_table_name(joined_table),
+            )
+        return edge_weights[edge]
+
+    return get_edge_weight
+
+
+def iter_weighted_paths(
+    graph: ForeignKeyGraph,
+    begin: int,
+    end: int,
+    get_edge_weight: Callable[[int, int], float],
+    constraints: Optional[SearchConstraints] = None,
+    max_length: Optional[int] = None,
+) -> Iterator[WeightedPath]:
+    path = find_cheapest_path(
+        graph, begin, end, get_edge_weight, set(), set(), constraints, max_length
+    )
+    found: List[WeightedPath] = []
+    candidates: List[WeightedPath] = []
+    seen: Set[Tuple[int, ...]] = set()
+    while path is not None:
+        yield path
+        found.append(path)
+        seen.add(path.edges)
+        root_cost = 0.0
+        for index in range(len(path.edges)):
+            root_edges = path.edges[:index]
+            spur_table = path.tables[index]
+            removed_edges = {
+                found_path.edges[index] >> 1
+                for found_path in found
+                if found_path.edges[:index] == root_edges
+            }
+            removed_tables = set(path.tables[:index])
+            spur_path = find_cheapest_path(
+                graph, spur_table, end, get_edge_weight, removed_tables, removed_edges, constraints,
+                None if max_length is None else max_length - index,
+            )
+            if spur_path is not None:
+                candidate = WeightedPath(
+                    root_cost + spur_path.cost,
+                    root_edges + spur_path.edges,
+                    path.tables[:index] + spur_path.tables,
+                )
+                if candidate.edges not in seen:
+                    seen.add(candidate.edges)
+                    heapq.heappush(candidates, candidate)
+            root_cost += get_edge_weight(path.edges[index], path.tables[index + 1])
+        path = heapq.heappop(candidates) if candidates else None
+
+
+def find_cheapest_path(
+    graph: ForeignKeyGraph,
+    begin: int,
+    end: int,
+    get_edge_weight: Callable[[int, int], float],
+    removed_tables: Set[int],
+    removed_foreign_keys: Set[int],
+    constraints: Optional[SearchConstraints] = None,
+    max_hops: Optional[int] = None,
+) -> Optional[WeightedPath]:
+    # Without a hop limit, this is Dijkstra's algorithm. With a limit, a more
+    # expensive path to a table can still be useful if it has fewer hops, so
+    # a table is expanded again whenever it is reached with fewer hops than
+    # before. Every expansion is a label: a table, the hop count, the cost
+    # and the previous label.
+    costs: MutableMapping[int, float] = {begin: 0.0}
+    fewest_hops: MutableMapping[int, int] = {}
+    labels: List[Tuple[int, int, int]] = []
+    queue = [(0.0, 0, begin, -1, -1)]
+    found: Optional[Tuple[float, int]] = None
+    while queue:
+        cost, hops, table, previous, edge = heapq.heappop(queue)
+        if table in fewest_hops and (max_hops is None or fewest_hops[table] <= hops):
+            continue
+        fewest_hops[table] = hops
+        labels.append((table, previous, edge))
+        if table == end:
+            found = (cost, len(labels) - 1)
+            break
+        if max_hops is not None and hops >= max_hops:
+            continue
+        label = len(labels) - 1
+        for position in range(graph.offsets[table], graph.offsets[table + 1]):
+            neighbour = graph.neighbours[position]
+            neighbour_edge = graph.edges[position]
+            if neighbour in removed_tables:
+                continue
+            if neighbour in fewest_hops and (
+                max_hops is None or fewest_hops[neighbour] <= hops + 1
+            ):
+                continue
+            if neighbour_edge >> 1 in removed_foreign_keys:
+                continue
+            if constraints is not None and not constraints.allows(neighbour, neighbour_edge):
+                continue
+            neighbour_cost = cost + get_edge_weight(neighbour_edge, neighbour)
+            if max_hops is None:
+                if neighbour in costs and neighbour_cost >= costs[neighbour]:
+                    continue
+                costs[neighbour] = neighbour_cost
+            heapq.heappush(queue, (neighbour_cost, hops + 1, neighbour, label, neighbour_edge))
+    count_stat("expanded tables", len(fewest_hops))
+    if found is None:
+        return None
+    edges: List[int] = []
+    tables: List[int] = []
+    label = found[1]
+    while label >= 0:
+        table, label, edge = labels[label]
+        tables.append(table)
+        if edge >= 0:
+            edges.append(edge)
+    return WeightedPath(found[0], tuple(reversed(edges)), tuple(reversed(tables)))
+
+
+def build_join_tree(
+    graph: ForeignKeyGraph,
+    tables: Sequence[str],
+    exact_limit: int = 6,
+) -> Optional[JoinTree]:
+    """
+    Find a smallest tree of foreign keys connecting all the tables, i.e. a
+    Steiner tree in the graph of foreign keys, or None if the tables are not
+    connected.
+
+    A tree is first found with the shortest path heuristic: starting from the
+    first table, the closest table that is not connected yet is repeatedly
+    joined to the tree by a shortest path. The result is at most twice as
+    large as the smallest tree. For up to `exact_limit` tables, the smallest
+    tree is then found with the Dreyfus-Wagner dynamic programming. It takes
+    O(3^n) steps per table, so only the tables that can be a part of a tree
+    smaller than the heuristic one are considered.
+
+    The first table is the root of the returned tree. Each join adds one
+    table, so the size of a tree is the number of joins.
+
+    """
+    terminals: List[int] = []
+    for table in tables:
+        table_id = graph.get_table_id(table)
+        if table_id is None:
+            return None
+        if table_id not in terminals:
+            terminals.append(table_id)
+    if not terminals:
+        return None
+    edges = find_heuristic_join_tree(graph, terminals)
+    if edges is None:
+        return None
+    # a tree connecting n tables has at least n - 1 edges
+    if 2 < len(terminals) <= exact_limit and len(edges) > len(terminals) - 1:
+        edges = find_smallest_join_tree(graph, terminals, len(edges) - 1) or edges
+    return JoinTree(
+        graph.get_table_name(terminals[0]),
+        [graph.get_foreign_key(edge >> 1) for edge in edges],
+    )
+
+
+def find_heuristic_join_tree(
+    graph: ForeignKeyGraph,
+    terminals: Sequence[int],
+) -> Optional[List[int]]:
+    tree_tables = {terminals[0]}
+    remaining = set(terminals[1:])
+    tree_edges: List[int] = []
+    while remaining:
+        # breadth-first search from all the tables of the tree at once
+        predecessors: MutableMapping[int, Tuple[int, int]] = {}
+        frontier = list(tree_tables)
+        found = None
+        while frontier and found is None:
+            count_stat("expanded tables", len(frontier))
+            next_frontier = []
+            for table in frontier:
+                for position in range(graph.offsets[table], graph.offsets[table + 1]):
+                    neighbour = graph.neighbours[position]
+                    if neighbour in tree_tables or neighbour in predecessors:
+                        continue
+                    predecessors[neighbour] = (table, graph.edges[position])
+                    if neighbour in remaining:
+                        found = neighbour
+                        break
+                    next_frontier.append(neighbour)
+                if found is not None:
+                    break
+            frontier = next_frontier
+        if found is None:
+            return None
+        table = found
+        while table not in tree_tables:
+            previous_table, edge = predecessors[table]
+            tree_edges.append(edge)
+            tree_tables.add(table)
+            remaining.discard(table)
+            table = previous_table
+    return tree_edges
+
+
+def find_smallest_join_tree(
+    graph: ForeignKeyGraph,
+    terminals: Sequence[int],
+    max_size: int,
+) -> Optional[List[int]]:
+    """
+    Find the edges of a smallest tree connecting the terminals, or None if
+    there's no tree with at most max_size edges.
+
+    """
+    subgraph = build_join_tree_subgraph(graph, terminals, max_size)
+    if subgraph is None:
+        return None
+    local_ids, adjacency = subgraph
+    count_stat("join tree candidate tables", len(adjacency))
+    neighbours = [[neighbour for neighbour, _ in linked] for linked in adjacency]
+    # sizes[subset][table]: size of the smallest tree connecting the table and
+    # the subset (a bit mask) of the terminals other than the first one, which
+    # is either two trees for parts of the subset meeting at the table, or a
+    # tree for the same subset extended with an edge
+    other_terminals = [local_ids[terminal] for terminal in terminals[1:]]
+    unreachable = max_size + 1
+    sizes: List[List[int]] = [[]]
+    for subset in range(1, 1 << len(other_terminals)):
+        size = [unreachable] * len(adjacency)
+        if subset & (subset - 1) == 0:
+            size[other_terminals[subset.bit_length() - 1]] = 0
+        else:
+            lowest = subset & -subset
+            part = (subset - 1) & subset
+            while part:
+                if part & lowest:
+                    size = list(map(min, size, map(add, sizes[part], sizes[subset ^ part])))
+                part = (part - 1) & subset
+        extend_join_trees(neighbours, size, unreachable)
+        sizes.append(size)
+    root = local_ids[terminals[0]]
+    if sizes[-1][root] > max_size:
+        return None
+    return trace_join_tree(adjacency, sizes, len(sizes) - 1, root)
+
+
+def build_join_tree_subgraph(
+    graph: ForeignKeyGraph,
+    terminals: Sequence[int],
+    max_size: int,
+) -> Optional[Tuple[Mapping[int, int], List[List[Tuple[int, int]]]]]:
+    """
+    Number the tables that can be a part of a tree with at most max_size
+    edges connecting the terminals, and list their links. Tables farther
+    from any terminal are left out, then other tables that would be leaves
+    of the tree. Return None if any terminal is left out.
+
+    """
+    distances = [find_bounded_distances(graph, terminal, max_size) for terminal in terminals]
+    linked_tables: MutableMapping[int, MutableMapping[int, int]] = {
+        table: {} for table in distances[0] if all(table in other for other in distances[1:])
+    }
+    if any(terminal not in linked_tables for terminal in terminals):
+        return None
+    for table, linked in linked_tables.items():
+        for position in range(graph.offsets[table], graph.offsets[table + 1]):
+            neighbour = graph.neighbours[position]
+            if neighbour in linked_tables and neighbour not in linked:
+                linked[neighbour] = graph.edges[position]
+    leaves = [
+        table for table, linked in linked_tables.items()
+        if len(linked) < 2 and table not in terminals
+    ]
+    while leaves:
+        table = leaves.pop()
+        for neighbour in linked_tables.pop(table):
+            linked = linked_tables[neighbour]
+            del linked[table]
+            if len(linked) == 1 and neighbour not in terminals:
+                leaves.append(neighbour)
+    local_ids = {table: local_id for local_id, table in enumerate(linked_tables)}
+    adjacency = [
+        [(local_ids[neighbour], edge) for neighbour, edge in linked.items()]
+        for linked in linked_tables.values()
+    ]
+    return local_ids, adjacency
+
+
+def extend_join_trees(
+    neighbours: Sequence[Sequence[int]],
+    sizes: List[int],
+    unreachable: int,
+) -> None:
+    """
+    Lower the tree sizes in place, with a breadth-first search started from
+    all tables at once, each at its own size.
+
+    """
+    levels: List[List[int]] = [[] for _ in range(unreachable)]
+    for table, size in enumerate(sizes):
+        if size < unreachable:
+            levels[size].append(table)
+    for size in range(unreachable - 1):
+        next_size = size + 1
+        next_level = levels[next_size]
+        for table in levels[size]:
+            if sizes[table] != size:
+                continue
+            for neighbour in neighbours[table]:
+                if sizes[neighbour] > next_size:
+                    sizes[neighbour] = next_size
+                    next_level.append(neighbour)
+
+
+def trace_join_tree(
+    adjacency: Sequence[Sequence[Tuple[int, int]]],
+    sizes: Sequence[Sequence[int]],
+    subset: int,
+    table: int,
+) -> List[int]:
+    """
+    Find the edges of a tree with the size computed by find_smallest_join_tree.
+
+    """
+    tree_edges: List[int] = []
+    stack = [(subset, table)]
+    while stack:
+        subset, table = stack.pop()
+        size = sizes[subset][table]
+        if size == 0:
+            continue
+        for neighbour, edge in adjacency[table]:
+            if sizes[subset][neighbour] == size - 1:
+                tree_edges.append(edge)
+                stack.append((subset, neighbour))
+                break
+        else:
+            lowest = subset & -subset
+            part = (subset - 1) & subset
+            while not (part & lowest and sizes[part][table] + sizes[subset ^ part][table] == size):
+                part = (part - 1) & subset
+            stack.append((part, table))
+            stack.append((subset ^ part, table))
+    return tree_edges
+
+
+def find_bounded_distances(
+    graph: ForeignKeyGraph,
+    source: int,
+    max_distance: int,
+) -> Mapping[int, int]:
+    distances = {source: 0}
+    frontier = [source]
+    for distance in range(1, max_distance + 1):
+        next_frontier = []
+        for table in frontier:
+            for position in range(graph.offsets[table], graph.offsets[table + 1]):
+                neighbour = graph.neighbours[position]
+                if neighbour not in distances:
+                    distances[neighbour] = distance
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+    return distances
+
+
+def find_join_tree(
+    engine: sqlalchemy.engine.Engine,
+    tables: Sequence[str],
+    schema_filter: SchemaFilter = SchemaFilter(),
+    cache: Optional[ForeignKeyCache] = None,
+) -> Optional[JoinTree]:
+    graph = ForeignKeyGraph.build(load_foreign_keys(engine, schema_filter, cache))
+    with measure_stage("search"):
+        return build_join_tree(graph, [qualify_table_name(engine, table) for table in tables])
+
+
+def find_paths(
+    engine: sqlalchemy.engine.Engine,
+    begin: str,
+    end: str,
+    schema_filter: SchemaFilter = SchemaFilter(),
+    cache: Optional[ForeignKeyCache] = None,
+    distance_index: Optional[DistanceIndex] = None,
+    options: SearchOptions = SearchOptions(),
+) -> Iterable[Path]:
+    graph = ForeignKeyGraph.build(load_foreign_keys(engine, schema_filter, cache))
+    if distance_index is not None and not distance_index.matches(graph):
+        raise OutdatedDistanceIndex
+    return search_paths(engine, graph, begin, end, distance_index, options)
+
+
+async def find_paths_async(
+    engine: sqlalchemy.ext.asyncio.AsyncEngine,
+    begin: str,
+    end: str,
+    schema_filter: SchemaFilter = SchemaFilter(),
+    options: SearchOptions = SearchOptions(),
+) -> List[Path]:
+    """
+    Same as find_paths, for asyncio engines. The foreign keys are read without
+    blocking the event loop and the search runs in a separate thread.
+
+    """
+    foreign_keys = await reflect_foreign_keys_async(engine, schema_filter)
+    return await asyncio.to_thread(
+        search_foreign_keys,
+        engine.sync_engine,
+        foreign_keys,
+        begin,
+        end,
+        options,
+    )
+
+
+def search_foreign_keys(
+    engine: sqlalchemy.engine.Engine,
+    foreign_keys: Iterable[ForeignKey],
+    begin: str,
+    end: str,
+    options: SearchOptions = SearchOptions(),
+) -> List[Path]:
+    return search_paths(engine, ForeignKeyGraph.build(foreign_keys), begin, end, options=options)
+
+
+def load_foreign_keys(
+    engine: sqlalchemy.engine.Engine,
+    schema_filter: SchemaFilter = SchemaFilter(),
+    cache: Optional[ForeignKeyCache] = None,
+    url: Optional[str] = None,
+) -> List[ForeignKey]:
+    with measure_stage("load foreign keys"):
+        if cache is None:
+            foreign_keys = reflect_foreign_keys(engine, schema_filter)
+        else:
+            foreign_keys = cache.get_foreign_keys(engine, schema_filter, url)
+        count_stat("foreign keys", len(foreign_keys))
+        return foreign_keys
+
+
+def search_paths(
+    engine: sqlalchemy.engine.Engine,
+    graph: ForeignKeyGraph,
+    begin: str,
+    end: str,
+    distance_index: Optional[DistanceIndex] = None,
+    options: SearchOptions = SearchOptions(),
+) -> List[Path]:
+    with measure_stage("search"):
+        return list(iter_search_paths(engine, graph, begin, end, distance_index, options))
+
+
+def iter_search_paths(
+    engine: sqlalchemy.engine.Engine,
+    graph: ForeignKeyGraph,
+    begin: str,
+    end: str,
+    distance_index: Optional[DistanceIndex] = None,
+    options: SearchOptions = SearchOptions(),
+) -> Iterator[Path]:
+    return iter_graph_paths(
+        graph,
+        qualify_table_name(engine, begin),
+        qualify_table_name(engine, end),
+        distance_index,
+        options,
+    )
+
+
+def iter_graph_paths(
+    graph: ForeignKeyGraph,
+    begin: str,
+    end: str,
+    distance_index: Optional[DistanceIndex] = None,
+    options: SearchOptions = SearchOptions(),
+) -> Iterator[Path]:
+    """
+    Same as iter_search_paths, for fully qualified table names.
+
+    """
+    found_paths: Iterator[Path]
+    if options.via in (begin, end):
+        options = options._replace(via=None)
+    terminals = [begin, end] if options.via is None else [begin, end, options.via]
+    constraints = SearchConstraints.create(graph, options, terminals)
+    if options.via is not None:
+        found_paths = iter_via_paths(
+            graph, begin, options.via, end, distance_index, options, constraints
+        )
+    elif options.k is not None:
+        found_paths = islice(
+            iter_cheapest_paths(
+                graph, begin, end, options.weight, options.max_length, constraints
+            ),
+            options.k,
+        )
+    else:
+        found_paths = iter_paths(
+            graph, begin, end, distance_index, options.max_length, constraints
+        )
+    return islice(found_paths, options.limit)
+
+
+def iter_via_paths(
+    graph: ForeignKeyGraph,
+    begin: str,
+    via: str,
+    end: str,
+    distance_index: Optional[DistanceIndex],
+    options: SearchOptions,
+    constraints: Optional[SearchConstraints],
+) -> Iterator[Path]:
+    """
+    Find paths going through the via table: paths from the begin table to the
+    via table followed by paths from the via table to the end table, except
+    the ones that would join a table twice.
+
+    Without options.k, all the shortest paths to and from the via table are
+    combined. Otherwise the k cheapest combinations are generated from the
+    cheapest paths to and from the via table, in the order of their total
+    cost.
+
+    """
+    max_length = options.max_length
+    if options.k is None:
+        for first, second in product(
+            iter_paths(graph, begin, via, distance_index, max_length, constraints),
+            iter_paths(graph, via, end, distance_index, max_length, constraints),
+        ):
+            if len(list_path_tables(first) & list_path_tables(second)) != 1:
+                continue
+            if max_length is None or first.length() + second.length() <= max_length:
+                yield Path(first.edges + second.edges)
+        return
+    begin_id = graph.get_table_id(begin)
+    via_id = graph.get_table_id(via)
+    end_id = graph.get_table_id(end)
+    if begin_id is None or via_id is None or end_id is None:
+        return
+    get_edge_weight = create_edge_weight(graph, options.weight)
+    # the length is checked before taking k paths, so that long paths don't
+    # take the places of shorter ones
+    yield from islice(
+        (
+            graph.create_path(path.edges)
+            for path in merge_weighted_paths(
+                iter_weighted_paths(
+                    graph, begin_id, via_id, get_edge_weight, constraints, max_length
+                ),
+                iter_weighted_paths(
+                    graph, via_id, end_id, get_edge_weight, constraints, max_length
+                ),
+            )
+            if max_length is None or len(path.edges) <= max_length
+        ),
+        options.k,
+    )
+
+
+def list_path_tables(path: Path) -> Set[str]:
+    return {
+        key.get_fully_qualified_table()
+        for edge in path.edges
+        for key in (edge.source, edge.destination)
+    }
+
+
+def merge_weighted_paths(
+    first_paths: Iterator[WeightedPath],
+    second_paths: Iterator[WeightedPath],
+) -> Iterator[WeightedPath]:
+    """
+    Join every path of the first sequence with every path of the second one,
+    cheapest first, skipping joined paths with loops. Both sequences have to
+    be sorted by cost and are read only as far as needed.
+
+    """
+    found: Tuple[List[WeightedPath], List[WeightedPath]] = ([], [])
+    sequences = (first_paths, second_paths)
+
+    def get_path(sequence: int, index: int) -> Optional[WeightedPath]:
+        while len(found[sequence]) <= index:
+            path = next(sequences[sequence], None)
+            if path is None:
+                return None
+            found[sequence].append(path)
+        return found[sequence][index]
+
+    queue: List[Tuple[float, int, int]] = []
+    queued: Set[Tuple[int, int]] = set()
+
+    def push(first_index: int, second_index: int) -> None:
+        first = get_path(0, first_index)
+        second = get_path(1, second_index)
+        if first is not None and second is not None and (first_index, second_index) not in queued:
+            queued.add((first_index, second_index))
+            heapq.heappush(queue, (first.cost + second.cost, first_index, second_index))
+
+    push(0, 0)
+    while queue:
+        cost, first_index, second_index = heapq.heappop(queue)
+        first = found[0][first_index]
+        second = found[1][second_index]
+        if not set(first.tables).intersection(second.tables[1:]):
+            yield WeightedPath(cost, first.edges + second.edges, first.tables + second.tables[1:])
+        push(first_index + 1, second_index)
+        push(first_index, second_index + 1)
+
+
+def find_paths_many(
+    engine: sqlalchemy.engine.Engine,
+    pairs: Iterable[Tuple[str, str]],
+    schema_filter: SchemaFilter = SchemaFilter(),
+    cache: Optional[ForeignKeyCache] = None,
+) -> Iterable[Tuple[str, str, List[Path]]]:
+    """
+    Find shortest paths for many begin / end table pairs.
+
+    The foreign keys are read once and a single search is run for each
+    distinct begin table. Results are yielded grouped by the begin table, in
+    the order in which begin tables first appear in the pairs.
+
+    """
+    graph = ForeignKeyGraph.build(load_foreign_keys(engine, schema_filter, cache))
+    return search_paths_many(engine, graph, pairs)
+
+
+def search_paths_many(
+    engine: sqlalchemy.engine.Engine,
+    graph: ForeignKeyGraph,
+    pairs: Iterable[Tuple[str, str]],
+) -> Iterable[Tuple[str, str, List[Path]]]:
+    return search_graph_paths_many(graph, pairs, partial(qualify_table_name, engine))
+
+
+def search_graph_paths_many(
+    graph: ForeignKeyGraph,
+    pairs: Iterable[Tuple[str, str]],
+    qualify: Callable[[str], str],
+) -> Iterable[Tuple[str, str, List[Path]]]:
+    end_tables: MutableMapping[str, List[str]] = {}
+    for begin, end in pairs:
+        end_tables.setdefault(begin, []).append(end)
+    for begin, ends in end_tables.items():
+        found_paths = gather_paths_from(graph, qualify(begin), [qualify(end) for end in ends])
+        for end, end_paths in zip(ends, found_paths):
+            yield begin, end, end_paths
+
+
+def read_table_pairs(lines: Iterable[str]) -> Iterable[Tuple[str, str]]:
+    """
+    Parse lines with two whitespace separated table names. Empty lines and
+    lines starting with # are skipped.
+
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        names = line.split()
+        if len(names) != 2:
+            raise InvalidTablePair(number, line)
+        yield names[0], names[1]
+
+
+def engine_supports_schemas(engine: sqlalchemy.engine.Engine) -> bool:
+    """
+    SQLite does not have a concept of a schema in the same sense as other DB
+    systems.
+
+    The sqlite dialect advertises schema support with the supports_schemas
+    property set to True. The pysqlite driver, however, when passed a schema
+    that is not None, crashes in get_table_names with an error caused by the
+    following SQL query:
+
+    SELECT name FROM "schema_name.sqlite".sqlite_master WHERE type='table' ORDER BY name
+
+    Not sure if this is a bug in the pysqlite driver. Other SQLite drivers, like
+    aiosqlite, are treated the same way, so that table names don't depend on
+    the driver.
+
+    """
+    return dialect_supports_schemas(engine.dialect.name)
+
+
+def dialect_supports_schemas(dialect_name: str) -> bool:
+    return not dialect_name == "sqlite"
+
+
+def qualify_table_name(engine: sqlalchemy.engine.Engine, table_name: str) -> str:
+    if engine_supports_schemas(engine):
+        return get_fully_qualified_table_name(engine, table_name)
+    return table_name
+
+
+def qualify_cached_table_name(cached: CachedForeignKeys, table_name: str) -> str:
+    """
+    Same as qualify_table_name, for an engine that the cache entry was
+    created with.
+
+    """
+    if dialect_supports_schemas(cached.dialect_name):
+        return qualify_dialect_table_name(cached.dialect_name, cached.default_schema, table_name)
+    return table_name
+
+
+def get_fully_qualified_table_name(engine: sqlalchemy.engine.Engine, table_name: str) -> str:
+    return qualify_dialect_table_name(engine.dialect.name, get_default_schema(engine), table_name)
+
+
+def qualify_dialect_table_name(
+    dialect_name: str,
+    default_schema: Optional[str],
+    table_name: str,
+) -> str:
+    if "." in table_name:
+        return table_name
+    if default_schema is None:
+        raise NoSchemaForUnqualifiedTableName(dialect_name=dialect_name, table_name=table_name)
+    return default_schema + "." + table_name
+
+
+def get_default_schema(engine: sqlalchemy.engine.Engine) -> Optional[str]:
+    if engine.dialect.name == "mysql":
+        database: Optional[str] = engine.url.database
+        return database
+    if engine.dialect.name == "postgresql":
+        return "public"
+    return None
+
+
+def qualify_dump_table_name(default_schema: Optional[str], table_name: str) -> str:
+    if "." in table_name or default_schema is None:
+        return table_name
+    return default_schema + "." + table_name
+
+
+def key_to_dict(key: Key) -> Mapping[str, object]:
+    return {"database": key.database, "table": key.table, "columns": list(key.columns)}
+
+
+def foreign_key_to_dict(foreign_key: ForeignKey) -> Mapping[str, object]:
+    return {
+        "source": key_to_dict(foreign_key.source),
+        "destination": key_to_dict(foreign_key.destination),
+    }
+
+
+def path_to_dict(path: Path, renderer: Optional[JoinRenderer] = None) -> Mapping[str, object]:
+    """
+    Convert a path to a JSON object, with the joins rendered for the dialect
+    of the renderer (the default dialect if it's None).
+
+    """
+    if renderer is None:
+        renderer = JoinRenderer()
+    return {
+        "length": path.length(),
+        "edges": [foreign_key_to_dict(edge) for edge in path.edges],
+        "joins": renderer.render_path(path),
+    }
+
+
+def format_foreign_key_columns(foreign_key: ForeignKey) -> str:
+    return (
+        ", ".join(foreign_key.source.columns) + " -> " + ", ".join(foreign_key.destination.columns)
+    )
+
+
+class PathWriter:
+    """
+    Write paths, or all foreign keys of a graph, to a stream one by one, as
+    they are generated. Subclasses implement the output formats, the ones
+    with SQL joins render them with the renderer.
+
+    """
+
+    def __init__(self, stream: TextIO, renderer: Optional[JoinRenderer] = None):
+        self.stream = stream
+        self.renderer = renderer
+        self.count = 0
+
+    def begin(self) -> None:
+        pass
+
+    def write_path(self, path: Path) -> None:
+        raise NotImplementedError
+
+    def write_foreign_key(self, foreign_key: ForeignKey) -> None:
+        raise NotImplementedError
+
+    def end(self) -> None:
+        pass
+
+
+class TextPathWriter(PathWriter):
+
+    def write_path(self, path: Path) -> None:
+        self.count += 1
+        self.stream.write(f"path {self.count}, length {path.length()}\n")
+        self.stream.write(textwrap.indent(
+            self.renderer.render_path(path) if self.renderer is not None else str(path),
+            "\t",
+        ))
+        self.stream.write("\n")
+
+    def write_foreign_key(self, foreign_key: ForeignKey) -> None:
+        self.count += 1
+        self.stream.write(f"{foreign_key}\n")
+
+
+class JsonLinesPathWriter(PathWriter):
+
+    def write_path(self, path: Path) -> None:
+        if self.renderer is None:
+            self.renderer = JoinRenderer()
+        self.write_item(path_to_dict(path, self.renderer))
+
+    def write_foreign_key(self, foreign_key: ForeignKey) -> None:
+        self.write_item(foreign_key_to_dict(foreign_key))
+
+    def write_item(self, item: Mapping[str, object]) -> None:
+        self.count += 1
+        self.stream.write(json.dumps(item))
+        self.stream.write("\n")
+
+
+class JsonPathWriter(JsonLinesPathWriter):
+    """
+    Write a JSON array, without keeping its items in memory.
+
+    """
+
+    def begin(self) -> None:
+        self.stream.write("[")
+
+    def write_item(self, item: Mapping[str, object]) -> None:
+        self.stream.write(",\n" if self.count else "\n")
+        self.count += 1
+        self.stream.write(json.dumps(item))
+
+    def end(self) -> None:
+        self.stream.write("\n]\n" if self.count else "]\n")
+
+
+class DotPathWriter(PathWriter):
+    """
+    Write a Graphviz graph with tables as nodes and foreign keys as edges,
+    pointing from the referencing table to the referenced one. Edges of paths
+    have the number of their path as an attribute.
+
+    """
+
+    def begin(self) -> None:
+        self.stream.write("digraph foreign_keys {\n")
+
+    def write_path(self, path: Path) -> None:
+        self.count += 1
+        for edge in path.edges:
+            self.write_edge(edge, f", path={self.count}")
+
+    def write_foreign_key(self, foreign_key: ForeignKey) -> None:
+        self.count += 1
+        self.write_edge(foreign_key, "")
+
+    def write_edge(self, foreign_key: ForeignKey, attributes: str) -> None:
+        self.stream.write(
+            f"\t{quote_dot(foreign_key.source.get_fully_qualified_table())}"
+            f" -> {quote_dot(foreign_key.destination.get_fully_qualified_table())}"
+            f" [label={quote_dot(format_foreign_key_columns(foreign_key))}{attributes}];\n"
+        )
+
+    def end(self) -> None:
+        self.stream.write("}\n")
+
+
+def quote_dot(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def escape_xml(text: str) -> str:
+    # xml.sax.saxutils imports urllib.request, which takes longer than
+    # everything else at startup
+    return (
+        text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    )
+
+
+class GraphmlPathWriter(PathWriter):
+    """
+    Write a GraphML document with tables as nodes and foreign keys as edges,
+    pointing from the referencing table to the referenced one. Nodes are
+    written before the first edge linking them. Edges of paths have the
+    number of their path as data.
+
+    """
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self.tables: Set[str] = set()
+
+    def begin(self) -> None:
+        self.stream.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            '<key id="columns" for="edge" attr.name="columns" attr.type="string"/>\n'
+            '<key id="path" for="edge" attr.name="path" attr.type="int"/>\n'
+            '<graph id="foreign_keys" edgedefault="directed">\n'
+        )
+
+    def write_path(self, path: Path) -> None:
+        self.count += 1
+        for edge in path.edges:
+            self.write_edge(edge, f'<data key="path">{self.count}</data>')
+
+    def write_foreign_key(self, foreign_key: ForeignKey) -> None:
+        self.count += 1
+        self.write_edge(foreign_key, "")
+
+    def write_edge(self, foreign_key: ForeignKey, data: str) -> None:
+        source = foreign_key.source.get_fully_qualified_table()
+        destination = foreign_key.destination.get_fully_qualified_table()
+        for table in (source, destination):
+            if table not in self.tables:
+                self.tables.add(table)
+                self.stream.write(f'<node id="{escape_xml(table)}"/>\n')
+        self.stream.write(
+            f'<edge source="{escape_xml(source)}" target="{escape_xml(destination)}">'
+            f'<data key="columns">{escape_xml(format_foreign_key_columns(foreign_key))}</data>'
+            f"{data}</edge>\n"
+        )
+
+    def end(self) -> None:
+        self.stream.write("</graph>\n</graphml>\n")
+
+
+PATH_WRITERS: Mapping[str, Type[PathWriter]] = {
+    "text": TextPathWriter,
+    "json": JsonPathWriter,
+    "jsonl": JsonLinesPathWriter,
+    "dot": DotPathWriter,
+    "graphml": GraphmlPathWriter,
+}
+
+
+def write_paths(paths: Iterable[Path], writer: PathWriter) -> int:
+    """
+    Write the paths as they are generated. Return the number of written paths.
+
+    """
+    writer.begin()
+    for path in paths:
+        writer.write_path(path)
+    writer.end()
+    return writer.count
+
+
+def write_graph(graph: ForeignKeyGraph, writer: PathWriter) -> int:
+    """
+    Write all foreign keys of the graph. Return their number.
+
+    """
+    writer.begin()
+    for index in range(graph.foreign_key_count()):
+        writer.write_foreign_key(graph.get_foreign_key(index))
+    writer.end()
+    return writer.count
+
+
+ForeignKeyIdentity = Tuple[Optional[str], str, Tuple[str, ...], Optional[str], str, Tuple[str, ...]]
+
+
+class ForeignKeyDelta(NamedTuple):
+    added: Sequence[ForeignKey] = ()
+    removed: Sequence[ForeignKey] = ()
+    # fully qualified names, all foreign keys of these tables are removed
+    dropped_tables: Sequence[str] = ()
+
+
+def diff_foreign_keys(old: Iterable[ForeignKey], new: Iterable[ForeignKey]) -> ForeignKeyDelta:
+    old_counts = Counter(map(get_foreign_key_identity, old))
+    new_counts = Counter(map(get_foreign_key_identity, new))
+    return ForeignKeyDelta(
+        added=list(map(build_identified_foreign_key, (new_counts - old_counts).elements())),
+        removed=list(map(build_identified_foreign_key, (old_counts - new_counts).elements())),
+    )
+
+
+def get_foreign_key_identity(foreign_key: ForeignKey) -> ForeignKeyIdentity:
+    source, destination = foreign_key
+    return (
+        source.database, source.table, tuple(source.columns),
+        destination.database, destination.table, tuple(destination.columns),
+    )
+
+
+def build_identified_foreign_key(identity: ForeignKeyIdentity) -> ForeignKey:
+    return ForeignKey(
+        source=Key(identity[0], identity[1], list(identity[2])),
+        destination=Key(identity[3], identity[4], list(identity[5])),
+    )
+
+
+class PathCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    max_size: Optional[int]
+    size: int
+
+
+# begin table, end table, normalized search options
+PathAnswerKey = Tuple[str, str, SearchOptions]
+
+
+class PathAnswerCache:
+    """
+    Answers of path searches, keyed on fully qualified table names and
+    search options normalized with normalize_search_options. Above max_size
+    entries (unbounded if None), the least recently used one is dropped.
+
+    Not thread safe, the owner has to lock it.
+
+    """
+
+    def __init__(self, max_size: Optional[int] = 1024):
+        self.max_size = max_size
+        self.answers: OrderedDict[PathAnswerKey, List[Path]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: PathAnswerKey) -> Optional[List[Path]]:
+        found_paths = self.answers.get(key)
+        if found_paths is None:
+            self.misses += 1
+            return None
+        self.answers.move_to_end(key)
+        self.hits += 1
+        return list(found_paths)
+
+    def put(self, key: PathAnswerKey, found_paths: List[Path]) -> None:
+        self.answers[key] = found_paths
+        if self.max_size is not None and len(self.answers) > self.max_size:
+            self.answers.popitem(last=False)
+
+    def retain(self, predicate: Callable[[PathAnswerKey, List[Path]], bool]) -> None:
+        dropped = [
+            key for key, found_paths in self.answers.items() if not predicate(key, found_paths)
+        ]
+        for key in dropped:
+            del self.answers[key]
+
+    def clear(self) -> None:
+        self.answers.clear()
+
+    def __iter__(self) -> Iterator[PathAnswerKey]:
+        return iter(self.answers)
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def items(self) -> Iterable[Tuple[PathAnswerKey, List[Path]]]:
+        return self.answers.items()
+
+    def info(self) -> PathCacheInfo:
+        return PathCacheInfo(self.hits, self.misses, self.max_size, len(self.answers))
+
+
+def normalize_search_options(options: SearchOptions) -> SearchOptions:
+    if options.k is None:
+        # the weight is used only for the cheapest paths
+        options = options._replace(weight=hop_weight)
+    # lists of patterns can't be used in keys
+    return options._replace(
+        tables=TableFilter(tuple(options.tables.include), tuple(options.tables.exclude)),
+        schemas=SchemaFilter(tuple(options.schemas.include), tuple(options.schemas.exclude)),
+    )
+
+
+class MutableForeignKeyGraph:
+    """
+    Foreign key graph that is updated in place, e.g. after a migration,
+    instead of reading all foreign keys again.
+
+    Shortest paths found in the graph are memoized, in an LRU cache of up to
+    max_size answers, and an update invalidates only the answers it can
+    change. Adding a foreign key between tables `u`
+    and `v` invalidates the answer for `begin`, `end` if `begin` - `u` - `v` -
+    `end` (or `begin` - `v` - `u` - `end`) is not longer than the memoized
+    paths. Removing a foreign key invalidates the answers that use it.
+
+    The compact ForeignKeyGraph used for searching is built in memory on the
+    first search after an update. Searches running in other threads during an
+    update keep using the previous one.
+
+    """
+
+    def __init__(self, foreign_keys: Iterable[ForeignKey] = (), max_size: Optional[int] = 1024):
+        self.foreign_keys: Counter[ForeignKeyIdentity] = Counter()
+        # linked tables, with the number of foreign keys linking them
+        self.adjacency: MutableMapping[str, Counter[str]] = {}
+        self.memo = PathAnswerCache(max_size)
+        self.graph: Optional[ForeignKeyGraph] = None
+        self.version = 0
+        self.lock = threading.Lock()
+        self.update(ForeignKeyDelta(added=list(foreign_keys)))
+
+    def update(self, delta: ForeignKeyDelta) -> None:
+        with self.lock:
+            removed = list(delta.removed)
+            if delta.dropped_tables:
+                dropped_tables = set(delta.dropped_tables)
+                removed += [
+                    foreign_key for foreign_key in self.list_foreign_keys()
+                    if foreign_key.source.get_fully_qualified_table() in dropped_tables
+                    or foreign_key.destination.get_fully_qualified_table() in dropped_tables
+                ]
+            for foreign_key in removed:
+                self.remove_foreign_key(foreign_key)
+            for foreign_key in delta.added:
+                self.add_foreign_key(foreign_key)
+            self.version += 1
+            self.graph = None
+
+    def refresh_schemas(
+        self,
+        engine: sqlalchemy.engine.Engine,
+        schemas: Sequence[Optional[str]],
+    ) -> ForeignKeyDelta:
+        """
+        Read foreign keys of source tables in the schemas again and apply the
+        difference.
+
+        """
+        if not engine_supports_schemas(engine):
+            schemas = [None]
+        if get_foreign_keys_query(engine) is None:
+            foreign_keys = list(inspect_foreign_keys(engine, schemas))
+        else:
+            foreign_keys = [
+                foreign_key for foreign_key in reflect_foreign_keys(engine)
+                if foreign_key.source.database in schemas
+            ]
+        with self.lock:
+            old_foreign_keys = [
+                foreign_key for foreign_key in self.list_foreign_keys()
+                if foreign_key.source.database in schemas
+            ]
+        delta = diff_foreign_keys(old_foreign_keys, foreign_keys)
+        self.update(delta)
+        return delta
+
+    def find_paths(
+        self,
+        begin: str,
+        end: str,
+        options: SearchOptions = SearchOptions(),
+    ) -> List[Path]:
+        """
+        Find paths between fully qualified table names. The cheapest paths,
+        with options.k set, are not memoized.
+
+        """
+        options = normalize_search_options(options)
+        key = (begin, end, options)
+        with self.lock:
+            if options.k is None:
+                memoized_paths = self.memo.get(key)
+                if memoized_paths is not None:
+                    return memoized_paths
+            version = self.version
+            graph = self.get_graph()
+        found_paths = list(iter_graph_paths(graph, begin, end, options=options))
+        if options.k is None:
+            with self.lock:
+                if self.version == version:
+                    self.memo.put(key, found_paths)
+        return list(found_paths)
+
+    def list_foreign_keys(self) -> List[ForeignKey]:
+        return list(map(build_identified_foreign_key, self.foreign_keys.elements()))
+
+    def table_count(self) -> int:
+        return self.get_current_graph().table_count()
+
+    def get_current_graph(self) -> ForeignKeyGraph:
+        with self.lock:
+            return self.get_graph()
+
+    def get_graph(self) -> ForeignKeyGraph:
+        if self.graph is None:
+            self.graph = ForeignKeyGraph.build(self.list_foreign_keys())
+            self.graph.index_components()
+        return self.graph
+
+    def add_foreign_key(self, foreign_key: ForeignKey) -> None:
+        source = foreign_key.source.get_fully_qualified_table()
+        destination = foreign_key.destination.get_fully_qualified_table()
+        self.foreign_keys[get_foreign_key_identity(foreign_key)] += 1
+        if source == destination:
+            return
+        if self.memo:
+            self.invalidate_shorter_paths(source, destination)
+        self.adjacency.setdefault(source, Counter())[destination] += 1
+        self.adjacency.setdefault(destination, Counter())[source] += 1
+
+    def remove_foreign_key(self, foreign_key: ForeignKey) -> None:
+        identity = get_foreign_key_identity(foreign_key)
+        if identity not in self.foreign_keys:
+            return
+        self.foreign_keys[identity] -= 1
+        if not self.foreign_keys[identity]:
+            del self.foreign_keys[identity]
+        source = foreign_key.source.get_fully_qualified_table()
+        destination = foreign_key.destination.get_fully_qualified_table()
+        if source == destination:
+            return
+        for table, linked_table in ((source, destination), (destination, source)):
+            self.adjacency[table][linked_table] -= 1
+            if not self.adjacency[table][linked_table]:
+                del self.adjacency[table][linked_table]
+            if not self.adjacency[table]:
+                del self.adjacency[table]
+        self.memo.retain(lambda key, found_paths: not any(
+            identity == get_foreign_key_identity(edge)
+            for found_path in found_paths
+            for edge in found_path.edges
+        ))
+
+    def invalidate_shorter_paths(self, first_table: str, second_table: str) -> None:
+        lengths = {
+            key: found_paths[0].length() if found_paths else key[2].max_length
+            for key, found_paths in self.memo.items()
+        }
+        bounded_lengths = [length for length in lengths.values() if length is not None]
+        max_length = max(bounded_lengths) if len(bounded_lengths) == len(lengths) else None
+        first_distances = self.get_distances(first_table, max_length)
+        second_distances = self.get_distances(second_table, max_length)
+
+        def is_valid(begin: str, end: str, length: Optional[int]) -> bool:
+            new_length = 1 + min(
+                first_distances.get(begin, math.inf) + second_distances.get(end, math.inf),
+                second_distances.get(begin, math.inf) + first_distances.get(end, math.inf),
+            )
+            return new_length > (math.inf if length is None else length)
+
+        self.memo.retain(lambda key, found_paths: is_valid(key[0], key[1], lengths[key]))
+
+    def get_distances(self, table: str, max_distance: Optional[int]) -> Mapping[str, int]:
+        distances = {table: 0}
+        frontier = [table]
+        distance = 0
+        while frontier and (max_distance is None or distance < max_distance):
+            distance += 1
+            next_frontier = []
+            for frontier_table in frontier:
+                for linked_table in self.adjacency.get(frontier_table, ()):
+                    if linked_table not in distances:
+                        distances[linked_table] = distance
+                        next_frontier.append(linked_table)
+            frontier = next_frontier
+        return distances
+
+
+class PathQuery:
+    """
+    Keep the foreign key graph in memory and answer path queries against it.
+    Table names are resolved with a TableNameIndex, like on the command line.
+
+    """
+
+    def __init__(
+        self,
+        engine: sqlalchemy.engine.Engine,
+        schema_filter: SchemaFilter = SchemaFilter(),
+        cache: Optional[ForeignKeyCache] = None,
+    ):
+        self.engine = engine
+        self.schema_filter = schema_filter
+        self.cache = cache
+        self.renderer = JoinRenderer(engine.dialect)
+        self.default_schema = (
+            get_default_schema(engine) if engine_supports_schemas(engine) else None
+        )
+        self.graph = MutableForeignKeyGraph(
+            load_foreign_keys(self.engine, self.schema_filter, self.cache)
+        )
+        self.table_names = self.create_table_name_index()
+
+    def reload(self, schemas: Optional[Sequence[str]] = None) -> ForeignKeyDelta:
+        """
+        Read the foreign keys again, all of them or only the ones of source
+        tables in the schemas, and apply the changes. The cache is refreshed,
+        not read.
+
+        """
+        if schemas is not None:
+            return self.graph.refresh_schemas(
+                self.engine,
+                [schema for schema in schemas if self.schema_filter.matches(schema)],
+            )
+        cache = None if self.cache is None else self.cache.refreshing()
+        foreign_keys = load_foreign_keys(self.engine, self.schema_filter, cache)
+        delta = diff_foreign_keys(self.graph.list_foreign_keys(), foreign_keys)
+        self.graph.update(delta)
+        return delta
+
+    def create_table_name_index(self) -> TableNameIndex:
+        return TableNameIndex(
+            self.graph.get_current_graph(),
+            self.default_schema,
+            partial(reflect_table_names, self.engine, self.schema_filter),
+        )
+
+    def resolve(self, table_name: str) -> str:
+        table_names = self.table_names
+        if table_names.graph is not self.graph.get_current_graph():
+            # updated since the index was built
+            table_names = self.table_names = self.create_table_name_index()
+        return table_names.resolve(table_name)
+
+    def find_paths(
+        self,
+        begin: str,
+        end: str,
+        options: SearchOptions = SearchOptions(),
+    ) -> List[Path]:
+        if options.via is not None:
+            options = options._replace(via=self.resolve(options.via))
+        return self.graph.find_paths(self.resolve(begin), self.resolve(end), options)
+
+
+class PathFinder:
+    """
+    Find paths between tables of a database, reading its foreign keys only
+    once. Table names are resolved with a TableNameIndex, so unknown and
+    ambiguous names raise UnknownTableName and AmbiguousTableName.
+
+    Answers are kept in an LRU cache of up to max_size entries (unbounded if
+    None), keyed on fully qualified table names and search options. The
+    reversed pair of tables has its own entry: reversing the cached paths
+    would give them in a different order than a search from the other end,
+    and different paths with a limit.
+
+    """
+
+    def __init__(
+        self,
+        engine: sqlalchemy.engine.Engine,
+        schema_filter: SchemaFilter = SchemaFilter(),
+        cache: Optional[ForeignKeyCache] = None,
+        max_size: Optional[int] = 1024,
+    ):
+        self.engine = engine
+        self.schema_filter = schema_filter
+        self.cache = cache
+        self.answers = PathAnswerCache(max_size)
+        self.lock = threading.Lock()
+        self.default_schema = (
+            get_default_schema(engine) if engine_supports_schemas(engine) else None
+        )
+        self.graph = self.build_graph(self.cache)
+        self.table_names = self.create_table_name_index(self.graph)
+
+    def build_graph(self, cache: Optional[ForeignKeyCache] = None) -> ForeignKeyGraph:
+        graph = ForeignKeyGraph.build(load_foreign_keys(self.engine, self.schema_filter, cache))
+        graph.index_components()
+        return graph
+
+    def create_table_name_index(self, graph: ForeignKeyGraph) -> TableNameIndex:
+        return TableNameIndex(
+            graph,
+            self.default_schema,
+            partial(reflect_table_names, self.engine, self.schema_filter),
+        )
+
+    def find_paths(
+        self,
+        begin: str,
+        end: str,
+        options: SearchOptions = SearchOptions(),
+    ) -> List[Path]:
+        with self.lock:
+            begin = self.table_names.resolve(begin)
+            end = self.table_names.resolve(end)
+            options = self.normalize_options(options)
+            key = (begin, end, options)
+            cached_paths = self.answers.get(key)
+            if cached_paths is not None:
+                return cached_paths
+            graph = self.graph
+        found_paths = list(iter_graph_paths(graph, begin, end, options=options))
+        with self.lock:
+            # skip answers found in a graph replaced in the meantime
+            if self.graph is graph:
+                self.answers.put(key, found_paths)
+        return list(found_paths)
+
+    def normalize_options(self, options: SearchOptions) -> SearchOptions:
+        if options.via is not None:
+            options = options._replace(via=self.table_names.resolve(options.via))
+        return normalize_search_options(options)
+
+    def invalidate(self, begin: Optional[str] = None, end: Optional[str] = None) -> None:
+        """
+        Forget the answers for a pair of tables (in both directions), or all
+        of them.
+
+        """
+        with self.lock:
+            if begin is None or end is None:
+                self.answers.clear()
+                return
+            try:
+                tables = {self.table_names.resolve(begin), self.table_names.resolve(end)}
+            except (UnknownTableName, AmbiguousTableName):
+                # answers are kept only for known tables
+                return
+            self.answers.retain(lambda key, _: {key[0], key[1]} != tables)
+
+    def reload(self) -> None:
+        """
+        Read the foreign keys again, refreshing the cache, and forget all
+        answers.
+
+        """
+        graph = self.build_graph(None if self.cache is None else self.cache.refreshing())
+        with self.lock:
+            self.graph = graph
+            self.table_names = self.create_table_name_index(graph)
+            self.answers.clear()
+
+    def cache_info(self) -> PathCacheInfo:
+        with self.lock:
+            return self.answers.info()
+
+
+class PathQueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /paths?begin=TABLE&end=TABLE[&limit=N][&max_length=K] - find shortest paths
+        [&through_table=PATTERN...][&avoid_table=PATTERN...][&through_schema=PATTERN...]
+        [&avoid_schema=PATTERN...][&parents_only=1][&via=TABLE] - constrain the search
+    POST /reload[?schema=SCHEMA...] - read the foreign keys again, optionally only
+        the ones in the schemas
+
+    """
+
+    server: PathQueryServer
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/paths":
+            self.send_json(404, {"error": "not found"})
+            return
+        parameters = urllib.parse.parse_qs(url.query)
+        if "begin" not in parameters or "end" not in parameters:
+            self.send_json(400, {"error": "begin and end parameters are required"})
+            return
+        begin = parameters["begin"][0]
+        end = parameters["end"][0]
+        try:
+            options = SearchOptions(
+                limit=(
+                    non_negative_int(parameters["limit"][0]) if "limit" in parameters else None
+                ),
+                max_length=(
+                    non_negative_int(parameters["max_length"][0])
+                    if "max_length" in parameters else None
+                ),
+                tables=TableFilter(
+                    include=tuple(parameters.get("through_table", ())),
+                    exclude=tuple(parameters.get("avoid_table", ())),
+                ),
+                schemas=SchemaFilter(
+                    include=tuple(parameters.get("through_schema", ())),
+                    exclude=tuple(parameters.get("avoid_schema", ())),
+                ),
+                parents_only=parameters.get("parents_only", ["0"])[0] not in ("0", ""),
+                via=parameters["via"][0] if "via" in parameters else None,
+            )
+        except ValueError:
+            self.send_json(400, {"error": "limit and max_length must be non-negative integers"})
+            return
+        try:
+            found_paths = self.server.path_query.find_paths(begin, end, options)
+        except (UnknownTableName, AmbiguousTableName) as exception:
+            self.send_json(400, {"error": str(exception)})
+            return
+        renderer = self.server.path_query.renderer
+        self.send_json(200, {
+            "begin": begin,
+            "end": end,
+            "paths": [path_to_dict(path, renderer) for path in found_paths],
+        })
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/reload":
+            self.send_json(404, {"error": "not found"})
+            return
+        self.server.path_query.reload(urllib.parse.parse_qs(url.query).get("schema"))
+        self.send_json(200, {"tables": self.server.path_query.graph.table_count()})
+
+    def send_json(self, status: int, content: object) -> None:
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # client addresses of Unix sockets are empty strings
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+
+class PathQueryServer(ThreadingHTTPServer):
+
+    def __init__(self, address: Tuple[str, int], path_query: PathQuery):
+        super().__init__(address, PathQueryRequestHandler)
+        self.path_query = path_query
+
+
+class UnixPathQueryServer(PathQueryServer):
+
+    address_family = socket.AF_UNIX
+
+    def server_bind(self) -> None:
+        # skip HTTPServer.server_bind, it expects a (host, port) address
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def create_path_query_server(address: str, path_query: PathQuery) -> PathQueryServer:
+    """
+    Listen on HOST:PORT or, if the address contains a slash, on a Unix socket.
+
+    """
+    if "/" in address:
+        if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+            os.unlink(address)
+        return UnixPathQueryServer(address, path_query)  # type: ignore[arg-type]
+    host, _, port = address.rpartition(":")
+    return PathQueryServer((host, int(port)), path_query)
+
+
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"negative number: {value}")
+    return number
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Use foreign keys to find shortest join paths between two tables in a SQL database."
+        )
+    )
+    parser.add_argument(
+        "url",
+        help="database URL, or a schema dump file with --ddl, or a graph snapshot with --snapshot",
+    )
+    parser.add_argument("begin", nargs="?", help="begin with this table")
+    parser.add_argument("end", nargs="?", help="end with this table")
+    parser.add_argument(
+        "more",
+        nargs="*",
+        metavar="table",
+        help="also connect these tables, with the smallest tree of joins",
+    )
+    parser.add_argument("-j", "--join", action="store_true", help="print paths as SQL joins")
+    parser.add_argument(
+        "-f", "--format",
+        choices=list(PATH_WRITERS),
+        default="text",
+        help="output format of paths and of --export-graph (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help=(
+            "print connected components, articulation tables, bridge foreign keys and hub"
+            " tables instead of paths (lists are limited by --limit, default: 10)"
+        ),
+    )
+    parser.add_argument(
+        "--export-graph",
+        action="store_true",
+        help="print all foreign keys, e.g. as a graph for a visualizer, instead of paths",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help=(
+            "print paths joining the same tables together, with their number and the"
+            " parallel foreign keys of each join"
+        ),
+    )
+    parser.add_argument(
+        "-n", "--limit",
+        type=non_negative_int,
+        metavar="N",
+        help="print at most N paths",
+    )
+    parser.add_argument(
+        "-m", "--max-length",
+        type=non_negative_int,
+        metavar="K",
+        help="don't look for paths longer than K joins",
+    )
+    parser.add_argument(
+        "-k", "--k-cheapest",
+        type=non_negative_int,
+        metavar="K",
+        help="print the K cheapest loopless paths, not only the shortest ones",
+    )
+    parser.add_argument(
+        "-w", "--weight",
+        choices=["hops", "rows"],
+        default="hops",
+        help=(
+            "cost of a join for --k-cheapest: hops - each join costs the same,"
+            " rows - estimated number of rows in the joined table (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--through-table",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="join only tables matching this glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--avoid-table",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="don't join tables matching this glob pattern, e.g. '*_log' (repeatable)",
+    )
+    parser.add_argument(
+        "--through-schema",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="join only tables in schemas matching this glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--avoid-schema",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="don't join tables in schemas matching this glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--parents-only",
+        action="store_true",
+        help="follow foreign keys only from the referencing table to the referenced one",
+    )
+    parser.add_argument(
+        "--via",
+        metavar="TABLE",
+        help="find only paths going through this table",
+    )
+    parser.add_argument(
+        "-s", "--schema",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="read foreign keys only from schemas matching this glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "-x", "--exclude-schema",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="don't read foreign keys from schemas matching this glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always read foreign keys from the database, don't use the on-disk cache",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="read foreign keys from the database and replace the cached ones",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        metavar="SECONDS",
+        help="use cached foreign keys younger than this without validating them",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help=(
+            "keep the foreign keys in memory and answer queries over HTTP, listening on"
+            " HOST:PORT or on a Unix socket PATH"
+        ),
+    )
+    parser.add_argument(
+        "--pairs",
+        metavar="FILE",
+        help=(
+            "find paths for each pair of table names in FILE (one pair per line, - for"
+            " standard input) and print them as JSON Lines"
+        ),
+    )
+    parser.add_argument(
+        "--build-distance-index",
+        metavar="FILE",
+        help="compute join distances between all pairs of tables and save them to FILE",
+    )
+    parser.add_argument(
+        "--distance-index",
+        metavar="FILE",
+        help="use join distances from FILE to speed up the search",
+    )
+    parser.add_argument(
+        "--ddl",
+        action="store_true",
+        help=(
+            "read foreign keys from a schema dump (SQL file, optionally gzipped, - for"
+            " standard input) instead of connecting to a database"
+        ),
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        metavar="FILE",
+        help="save the graph of foreign keys to FILE, to be memory-mapped with --snapshot",
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="read the graph of foreign keys from a snapshot file instead of a database",
+    )
+    parser.add_argument(
+        "--default-schema",
+        metavar="NAME",
+        help=(
+            "with --ddl or --snapshot: schema of unqualified table names in the dump and in"
+            " arguments"
+        ),
+    )
+    parser.add_argument(
+        "--dialect",
+        metavar="NAME",
+        help=(
+            "with --ddl or --snapshot: SQLAlchemy dialect name (e.g. mysql) used for quoting"
+            " identifiers in printed joins"
+        ),
+    )
+    parser.add_argument(
+        "--stats",
+        choices=["text", "json"],
+        help=(
+            "print time, catalog queries, fetched rows, peak memory and counters for each"
+            " stage to standard error, as text or JSON"
+        ),
+    )
+    parser.add_argument(
+        "-J", "--jobs",
+        type=int,
+        metavar="N",
+        help=(
+            "number of parallel workers: database connections used for reading foreign keys"
+            " (default: size of the connection pool) and processes used for building the"
+            " distance index (default: number of CPUs)"
+        ),
+    )
+    return parser
+
+
+def main() -> int:
+    parser = create_argument_parser()
+    args = parser.parse_intermixed_args()
+    if args.stats is None:
+        return run(parser, args)
+    with Stats(trace_memory=True) as stats:
+        try:
+            return run(parser, args)
+        finally:
+            if args.stats == "json":
+                print(json.dumps(stats.to_dict()), file=sys.stderr)
+            else:
+                print(stats.format_text(), file=sys.stderr)
+
+
+def run(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    if (
+        args.serve is None
+        and args.pairs is None
+        and args.build_distance_index is None
+        and args.save_snapshot is None
+        and not args.export_graph
+        and not args.analyze
+        and (args.begin is None or args.end is None)
+    ):
+        parser.error("the begin and end tables are required")
+    if args.ddl and args.snapshot:
+        parser.error("--ddl and --snapshot can't be used together")
+    if args.format != "text" and (args.join or args.summary or args.more):
+        parser.error("--join, --summary and more than two tables require --format text")
+    if (args.ddl or args.snapshot) and (args.serve is not None or args.weight == "rows"):
+        parser.error("--serve and --weight rows require a database connection")
+    schema_filter = SchemaFilter(include=args.schema, exclude=args.exclude_schema)
+    dialect_name: Optional[str]
+    default_schema: Optional[str]
+    # tables without foreign keys, listed only for names not found in the graph
+    list_tables: Optional[Callable[[], Iterable[str]]] = None
+    if args.ddl or args.snapshot:
+        engine = None
+        dialect_name = args.dialect
+        graph: ForeignKeyGraph
+        if args.snapshot:
+            graph = MappedForeignKeyGraph(args.url)
+        else:
+            graph = ForeignKeyGraph.build(
+                foreign_key for foreign_key in read_ddl_file(args.url, args.default_schema)
+                if schema_filter.matches(foreign_key.source.database)
+            )
+        qualify = partial(qualify_dump_table_name, args.default_schema)
+        default_schema = args.default_schema
+    else:
+        cache = None if args.no_cache else ForeignKeyCache(
+            ttl=args.cache_ttl,
+            refresh=args.refresh_cache,
+        )
+        cached = None
+        if cache is not None and args.serve is None and args.weight != "rows":
+            cached = cache.get_recent_entry(args.url, schema_filter)
+        if cached is not None:
+            # no need to connect to the database (or even import SQLAlchemy)
+            engine = None
+            dialect_name = cached.dialect_name
+            graph = ForeignKeyGraph.build(cached.foreign_keys)
+            qualify = partial(qualify_cached_table_name, cached)
+            default_schema = (
+                cached.default_schema if dialect_supports_schemas(cached.dialect_name) else None
+            )
+            list_tables = partial(reflect_url_table_names, args.url, schema_filter)
+        else:
+            engine = create_engine(args.url, args.jobs)
+            dialect_name = engine.dialect.name
+            stats = CURRENT_STATS.get()
+            if stats is not None:
+                stats.watch(engine)
+            if args.serve is not None:
+                with create_path_query_server(
+                    args.serve,
+                    PathQuery(engine, schema_filter, cache),
+                ) as server:
+                    server.serve_forever()
+                return 0
+            graph = ForeignKeyGraph.build(load_foreign_keys(engine, schema_filter, cache, args.url))
+            qualify = partial(qualify_table_name, engine)
+            default_schema = get_default_schema(engine) if engine_supports_schemas(engine) else None
+            list_tables = partial(reflect_table_names, engine, schema_filter)
+    renderer = None
+    # JSON output has the joins of each path too
+    if args.join or args.pairs is not None or args.format in ("json", "jsonl"):
+        try:
+            renderer = JoinRenderer.for_dialect(dialect_name)
+        except sqlalchemy.exc.NoSuchModuleError:
+            parser.error(f"unknown dialect: {dialect_name}")
+    if args.pairs is not None:
+        with open(args.pairs, encoding="utf-8") if args.pairs != "-" else sys.stdin as pairs:
+            try:
+                with measure_stage("search"):
+                    return print_paths_many(
+                        search_graph_paths_many(graph, read_table_pairs(pairs), qualify),
+                        renderer,
+                    )
+            except InvalidTablePair as exception:
+                parser.error(f"{args.pairs}: {exception}")
+    if args.save_snapshot is not None:
+        graph.save_snapshot(args.save_snapshot)
+        return 0
+    if args.export_graph:
+        write_graph(graph, PATH_WRITERS[args.format](sys.stdout))
+        return 0
+    if args.analyze:
+        analysis = analyze_graph(graph)
+        limit = 10 if args.limit is None else args.limit
+        if args.format == "text":
+            print(analysis.format_text(graph, limit))
+        elif args.format in ("json", "jsonl"):
+            print(json.dumps(analysis.to_dict(graph, limit)))
+        else:
+            parser.error("--analyze requires --format text, json or jsonl")
+        return 0
+    if args.build_distance_index is not None:
+        with measure_stage("build distance index"):
+            DistanceIndex.build(graph, args.jobs).save(args.build_distance_index)
+        return 0
+    table_names = TableNameIndex(graph, default_schema, list_tables)
+    try:
+        tables = [table_names.resolve(table) for table in [args.begin, args.end] + args.more]
+        via = None if args.via is None else table_names.resolve(args.via)
+    except (UnknownTableName, AmbiguousTableName) as exception:
+        parser.error(str(exception))
+    options = SearchOptions(
+        limit=args.limit,
+        max_length=args.max_length,
+        k=args.k_cheapest,
+        tables=TableFilter(include=args.through_table, exclude=args.avoid_table),
+        schemas=SchemaFilter(include=args.through_schema, exclude=args.avoid_schema),
+        parents_only=args.parents_only,
+        via=via,
+    )
+    if args.more:
+        if args.k_cheapest is not None or args.weight == "rows":
+            parser.error("--k-cheapest and --weight rows can't be used with more than two tables")
+        if options.is_constrained() or options.via is not None:
+            parser.error("path constraints can't be used with more than two tables")
+        with measure_stage("search"):
+            join_tree = build_join_tree(
+                graph,
+                tables,
+            )
+        if join_tree is None:
+            return 1
+        print(f"tree, length {join_tree.length()}")
+        print(textwrap.indent(
+            renderer.render_tree(join_tree) if renderer is not None else str(join_tree),
+            "\t",
+        ))
+        return 0
+    distance_index = None
+    if args.distance_index is not None:
+        distance_index = DistanceIndex.load(args.distance_index)
+        if not distance_index.matches(graph):
+            parser.error(f"{args.distance_index}: {OutdatedDistanceIndex()}, rebuild it")
+    if args.summary:
+        if args.k_cheapest is not None or args.via is not None or args.join:
+            parser.error("--summary can't be used with --k-cheapest, --via or --join")
+        return print_path_bundles(
+            islice(
+                iter_path_bundles(
+                    graph,
+                    tables[0],
+                    tables[1],
+                    distance_index,
+                    options.max_length,
+                    SearchConstraints.create(graph, options, tables),
+                ),
+                options.limit,
+            )
+        )
+    weight: EdgeWeight = hop_weight
+    if args.weight == "rows" and engine is not None:
+        with measure_stage("read row counts"):
+            weight = RowCountWeight(reflect_row_counts(engine, schema_filter))
+    found_paths = iter_graph_paths(
+        graph,
+        tables[0],
+        tables[1],
+        distance_index,
+        options._replace(weight=weight),
+    )
+    writer = PATH_WRITERS[args.format](sys.stdout, renderer)
+    with measure_stage("search"):
+        return 0 if write_paths(found_paths, writer) else 1
+
+
+def print_path_bundles(bundles: Iterable[PathBundle]) -> int:
+    bundle_exists = False
+    with measure_stage("search"):
+        for index, bundle in enumerate(bundles):
+            print(f"bundle {index + 1}, length {bundle.length()}, {bundle.count()} paths")
+            print(textwrap.indent(str(bundle), "\t"))
+            bundle_exists = True
+    return 0 if bundle_exists else 1
+
+
+def print_paths_many(
+    results: Iterable[Tuple[str, str, List[Path]]],
+    renderer: Optional[JoinRenderer] = None,
+) -> int:
+    if renderer is None:
+        renderer = JoinRenderer()
+    all_paths_exist = True
+    for begin, end, found_paths in results:
+        print(json.dumps({
+            "begin": begin,
+            "end": end,
+            "paths": [path_to_dict(path, renderer) for path in found_paths],
+        }))
+        all_paths_exist = all_paths_exist and len(found_paths) > 0
+    return 0 if all_paths_exist else 1
 
 
 if __name__ == "__main__":
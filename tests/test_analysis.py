@@ -0,0 +1,95 @@
+import random
+from itertools import combinations
+from typing import List, Sequence
+import pytest
+from sqlfkpath import (
+    ForeignKey, ForeignKeyGraph, MutableForeignKeyGraph, analyze_graph, find_components,
+    gather_paths,
+)
+from tests.test_gather_paths import fk
+
+
+def random_foreign_keys(seed: int) -> List[ForeignKey]:
+    generator = random.Random(seed)
+    tables = [f"t{i}" for i in range(12)]
+    foreign_keys = [fk(*generator.sample(tables, 2)) for _ in range(13)]
+    # a parallel foreign key and a self-referencing one
+    foreign_keys.append(foreign_keys[0]._replace(
+        source=foreign_keys[0].source._replace(columns=["other_id"])
+    ))
+    foreign_keys.append(fk("t0", "t0"))
+    return foreign_keys
+
+
+def count_components(foreign_keys: Sequence[ForeignKey], tables: Sequence[str]) -> int:
+    graph = ForeignKeyGraph.build(foreign_keys)
+    # tables without foreign keys are components of their own
+    return len(set(find_components(graph))) + len(set(tables) - set(graph.table_ids))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_same_as_removing(seed: int) -> None:
+    foreign_keys = random_foreign_keys(seed)
+    graph = ForeignKeyGraph.build(foreign_keys)
+    tables = [graph.get_table_name(table) for table in range(graph.table_count())]
+    analysis = analyze_graph(graph)
+    component_count = len(analysis.get_component_sizes())
+    assert component_count == count_components(foreign_keys, tables)
+    articulation_tables = [
+        table for table in tables
+        if count_components(
+            [
+                foreign_key for foreign_key in foreign_keys
+                if table not in (foreign_key.source.table, foreign_key.destination.table)
+            ],
+            [other_table for other_table in tables if other_table != table],
+        ) > component_count
+    ]
+    assert [graph.get_table_name(table) for table in analysis.articulation_tables] == sorted(
+        articulation_tables, key=tables.index
+    )
+    bridges = [
+        index for index in range(len(foreign_keys))
+        if count_components(foreign_keys[:index] + foreign_keys[index + 1:], tables)
+        > component_count
+    ]
+    assert list(analysis.bridges) == bridges
+
+
+def test_betweenness() -> None:
+    graph = ForeignKeyGraph.build(random_foreign_keys(6))
+    analysis = analyze_graph(graph, samples=None)
+    expected = [0.0] * graph.table_count()
+    for begin, end in combinations(range(graph.table_count()), 2):
+        found_paths = gather_paths(graph, graph.get_table_name(begin), graph.get_table_name(end))
+        for table in range(graph.table_count()):
+            if table in (begin, end):
+                continue
+            table_name = graph.get_table_name(table)
+            expected[table] += sum(
+                any(
+                    table_name in (edge.source.table, edge.destination.table)
+                    for edge in found_path.edges
+                )
+                for found_path in found_paths
+            ) / max(1, len(found_paths))
+    assert analysis.betweenness == pytest.approx(expected)
+    assert analysis.rank_hubs()[0] == expected.index(max(expected))
+
+
+def test_disconnected_pairs() -> None:
+    graph = ForeignKeyGraph.build([fk("a", "b"), fk("b", "c"), fk("x", "y")])
+    analysis = analyze_graph(graph)
+    assert analysis.get_component_sizes() == [3, 2]
+    assert analysis.count_disconnected_pairs() == 6
+    assert analysis.articulation_tables == [graph.get_table_id("b")]
+    assert analysis.to_dict(graph, limit=1)["hubs"] == [
+        {"table": "b", "degree": 2, "betweenness": 1.0},
+    ]
+
+
+def test_components_end_search() -> None:
+    graph = MutableForeignKeyGraph([fk("a", "b"), fk("x", "y")])
+    assert not graph.find_paths("a", "y")
+    assert graph.get_graph().components is not None
+    assert len(graph.find_paths("a", "b")) == 1
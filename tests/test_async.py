@@ -0,0 +1,38 @@
+import asyncio
+import os
+import tempfile
+import sqlalchemy
+import sqlalchemy.ext.asyncio
+from sqlfkpath import SearchOptions, find_paths, find_paths_async, reflect_foreign_keys_async
+
+
+SCHEMA = [
+    "CREATE TABLE grandparent (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE parent (id INTEGER PRIMARY KEY, "
+    "grandparent_id INTEGER REFERENCES grandparent(id))",
+    "CREATE TABLE child (id INTEGER PRIMARY KEY, parent_id INTEGER REFERENCES parent(id))",
+]
+
+
+def test_same_as_sync() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "test.sqlite")
+        engine = sqlalchemy.create_engine(f"sqlite:///{filename}")
+        with engine.begin() as connection:
+            for statement in SCHEMA:
+                connection.execute(sqlalchemy.text(statement))
+        async_engine = sqlalchemy.ext.asyncio.create_async_engine(
+            f"sqlite+aiosqlite:///{filename}"
+        )
+
+        async def run() -> None:
+            foreign_keys = await reflect_foreign_keys_async(async_engine)
+            assert len(foreign_keys) == 2
+            found_paths = await find_paths_async(async_engine, "child", "grandparent")
+            assert found_paths == find_paths(engine, "child", "grandparent")
+            assert len(found_paths) == 1
+            options = SearchOptions(max_length=1)
+            assert not await find_paths_async(async_engine, "child", "grandparent", options=options)
+            await async_engine.dispose()
+
+        asyncio.run(run())
@@ -0,0 +1,17 @@
+import pytest
+from benchmarks.benchmark import GENERATORS, run_benchmark, find_regressions
+
+
+@pytest.mark.parametrize("shape", sorted(GENERATORS))
+def test_run_benchmark(shape: str) -> None:
+    result = run_benchmark(shape, 50, queries=5, memory=False)
+    assert result["foreign_keys"] > 0
+    assert set(result["stages"]) == {"reflect", "parse_ddl", "build", "search"}
+
+
+def test_find_regressions() -> None:
+    baseline = [{"shape": "star", "tables": 50, "stages": {"build": {"seconds": 1.0}}}]
+    results = [{"shape": "star", "tables": 50, "stages": {"build": {"seconds": 3.0}}}]
+    assert find_regressions(results, baseline, 2.0) == ["star/build: 1.000s -> 3.000s"]
+    assert not find_regressions(results, baseline, 4.0)
+    assert not find_regressions(results, baseline, 2.0, min_slowdown=2.0)
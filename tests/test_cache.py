@@ -0,0 +1,107 @@
+import concurrent.futures
+import gzip
+import os
+import sqlalchemy
+from sqlfkpath import Key, ForeignKey, ForeignKeyCache, find_paths
+from tests.test_paths import db_from_sql
+
+
+SQL = """
+    CREATE TABLE parent (
+        id INT
+    );
+
+    CREATE TABLE child (
+        parent_id INT,
+        FOREIGN KEY(parent_id) REFERENCES parent(id)
+    );
+"""
+
+EXPECTED_FOREIGN_KEYS = [
+    ForeignKey(
+        source=Key(database=None, table="child", columns=["parent_id"]),
+        destination=Key(database=None, table="parent", columns=["id"]),
+    ),
+]
+
+
+def add_grandchild(engine: sqlalchemy.engine.Engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text(
+            "CREATE TABLE grandchild (child_id INT, FOREIGN KEY(child_id) REFERENCES child(id))"
+        ))
+
+
+def test_store_and_load(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    cache = ForeignKeyCache(directory=str(tmp_path))
+    assert cache.get_foreign_keys(engine) == EXPECTED_FOREIGN_KEYS
+    assert len(os.listdir(tmp_path)) == 1
+    cache = ForeignKeyCache(directory=str(tmp_path))
+    assert cache.get_foreign_keys(engine) == EXPECTED_FOREIGN_KEYS
+
+
+def test_invalidated_by_fingerprint(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    ForeignKeyCache(directory=str(tmp_path)).get_foreign_keys(engine)
+    add_grandchild(engine)
+    foreign_keys = ForeignKeyCache(directory=str(tmp_path)).get_foreign_keys(engine)
+    assert len(foreign_keys) == 2
+
+
+def test_ttl_skips_validation(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    ForeignKeyCache(directory=str(tmp_path)).get_foreign_keys(engine)
+    add_grandchild(engine)
+    cache = ForeignKeyCache(directory=str(tmp_path), ttl=3600)
+    assert cache.get_foreign_keys(engine) == EXPECTED_FOREIGN_KEYS
+
+
+def test_refresh(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    ForeignKeyCache(directory=str(tmp_path)).get_foreign_keys(engine)
+    add_grandchild(engine)
+    cache = ForeignKeyCache(directory=str(tmp_path), ttl=3600, refresh=True)
+    assert len(cache.get_foreign_keys(engine)) == 2
+    assert len(ForeignKeyCache(directory=str(tmp_path), ttl=3600).get_foreign_keys(engine)) == 2
+
+
+def test_corrupted_file_is_ignored(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    cache = ForeignKeyCache(directory=str(tmp_path))
+    cache.get_foreign_keys(engine)
+    for file_name in os.listdir(tmp_path):
+        with gzip.open(os.path.join(tmp_path, file_name), "wt") as cache_file:
+            cache_file.write("{")
+    assert cache.get_foreign_keys(engine) == EXPECTED_FOREIGN_KEYS
+
+
+def test_find_paths_with_cache(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    cache = ForeignKeyCache(directory=str(tmp_path))
+    expected_paths = find_paths(engine, "child", "parent")
+    assert find_paths(engine, "child", "parent", cache=cache) == expected_paths
+
+
+def test_unwritable_directory_is_ignored(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    file_path = os.path.join(tmp_path, "file")
+    with open(file_path, "w", encoding="utf-8"):
+        pass
+    cache = ForeignKeyCache(directory=os.path.join(file_path, "cache"))
+    assert cache.get_foreign_keys(engine) == EXPECTED_FOREIGN_KEYS
+    assert os.listdir(tmp_path) == ["file"]
+
+
+def test_concurrent_stores(tmp_path: str) -> None:
+    engine = db_from_sql(SQL)
+    cache = ForeignKeyCache(directory=str(tmp_path))
+    cache.get_foreign_keys(engine)
+    (file_name,) = os.listdir(tmp_path)
+    path = os.path.join(tmp_path, file_name)
+    cached = cache.load(path)
+    assert cached is not None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: cache.store(path, cached), range(32)))
+    assert os.listdir(tmp_path) == [file_name]
+    assert cache.load(path) == cached
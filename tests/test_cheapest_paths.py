@@ -0,0 +1,167 @@
+import random
+import time
+from itertools import combinations
+from typing import List, Mapping, Sequence
+from sqlfkpath import (
+    ForeignKey, ForeignKeyGraph, Path, RowCountWeight, SearchOptions,
+    find_paths, gather_paths, iter_cheapest_paths, reflect_foreign_keys, reflect_row_counts,
+)
+from tests.test_gather_paths import fk
+from tests.test_paths import db_from_sql
+
+
+def test_first_path_is_shortest() -> None:
+    foreign_keys = [fk("a", "b"), fk("b", "c"), fk("a", "c")]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    assert list(iter_cheapest_paths(graph, "a", "c")) == [
+        Path([fk("a", "c")]),
+        Path([fk("a", "b"), fk("b", "c")]),
+    ]
+
+
+def test_parallel_edges() -> None:
+    foreign_keys = [fk("a", "b"), fk("a", "b"), fk("b", "c")]
+    foreign_keys[1] = foreign_keys[1]._replace(
+        source=foreign_keys[1].source._replace(columns=["other_b_id"])
+    )
+    graph = ForeignKeyGraph.build(foreign_keys)
+    assert len(list(iter_cheapest_paths(graph, "a", "c"))) == 2
+
+
+def test_row_count_weight() -> None:
+    # the direct path goes through a huge table, a longer one through small tables
+    foreign_keys = [
+        fk("begin", "huge"), fk("huge", "end"),
+        fk("begin", "small1"), fk("small1", "small2"), fk("small2", "end"),
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    weight = RowCountWeight({"huge": 1e6, "small1": 10, "small2": 10, "end": 100})
+    found_paths = list(iter_cheapest_paths(graph, "begin", "end", weight))
+    assert [path.length() for path in found_paths] == [3, 2]
+
+
+def test_same_as_exhaustive_search() -> None:
+    generator = random.Random(7)
+    tables = [f"t{i}" for i in range(9)]
+    foreign_keys = [fk(generator.choice(tables), generator.choice(tables)) for _ in range(16)]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    row_counts = {table: float(generator.randint(1, 1000)) for table in tables}
+    weight = RowCountWeight(row_counts)
+    for begin in tables:
+        for end in tables:
+            if begin == end:
+                continue
+            found_costs = [
+                path_cost(path, begin, row_counts)
+                for path in iter_cheapest_paths(graph, begin, end, weight)
+            ]
+            expected_costs = sorted(
+                path_cost(path, begin, row_counts)
+                for path in all_simple_paths(foreign_keys, begin, end)
+            )
+            assert found_costs == expected_costs
+
+
+def test_max_length() -> None:
+    generator = random.Random(3)
+    tables = [f"t{i}" for i in range(8)]
+    foreign_keys = [fk(generator.choice(tables), generator.choice(tables)) for _ in range(16)]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    row_counts = {table: float(generator.randint(1, 1000)) for table in tables}
+    weight = RowCountWeight(row_counts)
+    for max_length in range(7):
+        found_costs = [
+            path_cost(path, "t0", row_counts)
+            for path in iter_cheapest_paths(graph, "t0", "t1", weight, max_length)
+        ]
+        expected_costs = sorted(
+            path_cost(path, "t0", row_counts)
+            for path in all_simple_paths(foreign_keys, "t0", "t1")
+            if path.length() <= max_length
+        )
+        assert found_costs == expected_costs
+
+
+def test_max_length_dense_graph() -> None:
+    # a complete graph has more than 10 ** 5 loopless paths between two tables,
+    # none of them may be generated when they do not fit the limit
+    tables = [f"t{i}" for i in range(9)]
+    graph = ForeignKeyGraph.build(fk(*pair) for pair in combinations(tables, 2))
+    start = time.perf_counter()
+    assert not list(iter_cheapest_paths(graph, "t0", "t8", max_length=0))
+    assert len(list(iter_cheapest_paths(graph, "t0", "t8", max_length=1))) == 1
+    assert len(list(iter_cheapest_paths(graph, "t0", "t8", max_length=2))) == 8
+    assert time.perf_counter() - start < 1
+
+
+def test_find_paths_with_k() -> None:
+    sql = """
+        CREATE TABLE right (
+            id INT
+        );
+
+        CREATE TABLE left (
+            id INT,
+            right_id INT,
+            FOREIGN KEY(right_id) REFERENCES right(id)
+        );
+
+        CREATE TABLE top (
+            id INT,
+            left_id INT,
+            right_id INT,
+            FOREIGN KEY(left_id) REFERENCES left(id),
+            FOREIGN KEY(right_id) REFERENCES right(id)
+        );
+    """
+    engine = db_from_sql(sql)
+    graph = ForeignKeyGraph.build(reflect_foreign_keys(engine))
+    found_paths = find_paths(engine, "left", "right", options=SearchOptions(k=1))
+    assert found_paths == gather_paths(graph, "left", "right")
+    found_paths = find_paths(engine, "left", "right", options=SearchOptions(k=5))
+    assert [path.length() for path in found_paths] == [1, 2]
+
+
+def test_reflect_row_counts() -> None:
+    sql = """
+        CREATE TABLE foo (
+            id INT
+        );
+
+        INSERT INTO foo VALUES (1), (2), (3);
+
+        CREATE TABLE bar (
+            id INT
+        );
+    """
+    assert reflect_row_counts(db_from_sql(sql)) == {"foo": 3.0, "bar": 0.0}
+
+
+def path_cost(path: Path, begin: str, row_counts: Mapping[str, float]) -> float:
+    cost = 0.0
+    table = begin
+    for edge in path.edges:
+        table = edge.destination.table if edge.source.table == table else edge.source.table
+        cost += max(1.0, row_counts[table])
+    return cost
+
+
+def all_simple_paths(foreign_keys: Sequence[ForeignKey], begin: str, end: str) -> List[Path]:
+    found_paths: List[Path] = []
+
+    def walk(table: str, walked_tables: List[str], walked_keys: List[ForeignKey]) -> None:
+        if table in walked_tables:
+            return
+        if table == end:
+            found_paths.append(Path(walked_keys))
+            return
+        for foreign_key in foreign_keys:
+            source = foreign_key.source.table
+            destination = foreign_key.destination.table
+            if source == destination or table not in (source, destination):
+                continue
+            neighbour = destination if source == table else source
+            walk(neighbour, walked_tables + [table], walked_keys + [foreign_key])
+
+    walk(begin, [], [])
+    return found_paths
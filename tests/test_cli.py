@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+from typing import Tuple
+import pytest
+import sqlalchemy
+from sqlfkpath import main
+from tests.test_paths import PARENT_CHILD_SQL, file_db_from_sql
+
+
+SQL = PARENT_CHILD_SQL + """;
+    CREATE TABLE grandchild (child_id INT, FOREIGN KEY(child_id) REFERENCES child(id));
+    CREATE TABLE toy (child_id INT, FOREIGN KEY(child_id) REFERENCES child(id))
+"""
+
+
+@pytest.fixture(name="engine")
+def fixture_engine(tmp_path: str) -> sqlalchemy.engine.Engine:
+    return file_db_from_sql(tmp_path, SQL)
+
+
+def run_cli(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    *arguments: str,
+) -> Tuple[int, str, str]:
+    monkeypatch.setattr(sys, "argv", ["sqlfkpath.py", "--no-cache", *arguments])
+    try:
+        exit_code = main()
+    except SystemExit as exception:
+        exit_code = int(exception.code or 0)
+    captured = capsys.readouterr()
+    return exit_code, captured.out, captured.err
+
+
+def test_more_tables(
+    engine: sqlalchemy.engine.Engine,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    url = str(engine.url)
+    exit_code, output, _ = run_cli(monkeypatch, capsys, url, "parent", "grandchild", "toy")
+    assert exit_code == 0
+    assert output.splitlines() == [
+        "tree, length 3",
+        "\tchild(parent_id) -> parent(id)",
+        "\tgrandchild(child_id) -> child(id)",
+        "\ttoy(child_id) -> child(id)",
+    ]
+    exit_code, output, _ = run_cli(monkeypatch, capsys, "-j", url, "parent", "grandchild", "toy")
+    assert exit_code == 0
+    assert output.splitlines() == [
+        "tree, length 3",
+        "\tFROM parent",
+        "\tJOIN child ON parent.id = child.parent_id",
+        "\tJOIN grandchild ON child.id = grandchild.child_id",
+        "\tJOIN toy ON child.id = toy.child_id",
+    ]
+    exit_code, output, _ = run_cli(monkeypatch, capsys, url, "parent", "child", "plugh")
+    assert exit_code == 2
+    exit_code, _, error = run_cli(
+        monkeypatch, capsys, "--avoid-table", "x", url, "parent", "grandchild", "toy"
+    )
+    assert exit_code == 2
+    assert "path constraints can't be used with more than two tables" in error
+
+
+def test_distance_index_prunes_search(
+    engine: sqlalchemy.engine.Engine,
+    tmp_path: str,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    url = str(engine.url)
+    index_path = os.path.join(tmp_path, "distances")
+    assert run_cli(monkeypatch, capsys, "--build-distance-index", index_path, url)[0] == 0
+
+    def count_expanded_tables(*arguments: str) -> int:
+        exit_code, _, error = run_cli(
+            monkeypatch, capsys, "--stats", "json", *arguments, url, "parent", "toy"
+        )
+        assert exit_code == 0
+        return sum(
+            stage["counters"].get("expanded tables", 0)
+            for stage in json.loads(error.splitlines()[-1])["stages"]
+        )
+
+    assert count_expanded_tables() > 0
+    assert count_expanded_tables("--distance-index", index_path) == 0
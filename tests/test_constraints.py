@@ -0,0 +1,118 @@
+import random
+from typing import List
+from sqlfkpath import (
+    ForeignKeyGraph, MutableForeignKeyGraph, Path, RowCountWeight,
+    SchemaFilter, SearchOptions, TableFilter, gather_paths, iter_graph_paths,
+)
+from tests.test_gather_paths import fk
+from tests.test_table_names import qualified_fk
+
+
+def search(graph: ForeignKeyGraph, begin: str, end: str, options: SearchOptions) -> List[Path]:
+    return list(iter_graph_paths(graph, begin, end, options=options))
+
+
+def test_avoid_tables() -> None:
+    # the shortest path goes through a log table, a longer one doesn't
+    foreign_keys = [
+        fk("order_log", "order"), fk("order_log", "customer"),
+        fk("order", "shop"), fk("shop", "region"), fk("customer", "region"),
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    options = SearchOptions(tables=TableFilter(exclude=["*_log"]))
+    assert search(graph, "order", "customer", SearchOptions()) == [Path(foreign_keys[:2])]
+    assert search(graph, "order", "customer", options) == [Path(foreign_keys[2:])]
+    assert search(graph, "order", "customer", options._replace(k=3)) == [Path(foreign_keys[2:])]
+    # the begin and end tables are never filtered out
+    assert search(graph, "order_log", "shop", options) == [Path([foreign_keys[0], foreign_keys[2]])]
+
+
+def test_schemas() -> None:
+    foreign_keys = [
+        qualified_fk("shop.order", "archive.customer"),
+        qualified_fk("shop.invoice", "archive.customer"),
+        qualified_fk("shop.order", "shop.item"),
+        qualified_fk("shop.invoice", "shop.item"),
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    for options in [
+        SearchOptions(schemas=SchemaFilter(exclude=["archive"])),
+        SearchOptions(schemas=SchemaFilter(include=["shop"])),
+        SearchOptions(tables=TableFilter(exclude=["archive.*"])),
+    ]:
+        assert search(graph, "shop.order", "shop.invoice", options) == [Path(foreign_keys[2:])]
+
+
+def test_parents_only() -> None:
+    # order -> customer <- invoice is shorter, but joins a child of customer
+    foreign_keys = [
+        fk("order", "customer"), fk("invoice", "customer"),
+        fk("order", "shipment"), fk("shipment", "invoice"),
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    options = SearchOptions(parents_only=True)
+    assert search(graph, "order", "invoice", SearchOptions())[0].length() == 2
+    assert search(graph, "order", "invoice", options) == [Path(foreign_keys[2:])]
+    assert search(graph, "order", "invoice", options._replace(k=5)) == [Path(foreign_keys[2:])]
+    assert not search(graph, "invoice", "order", options)
+
+
+def test_via() -> None:
+    foreign_keys = [
+        fk("a", "b"), fk("b", "c"),
+        fk("a", "x"), fk("x", "y"), fk("y", "c"),
+        # a dead end: paths through it would join b twice
+        fk("dead_end", "b"),
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    expected = [Path([fk("a", "x"), fk("x", "y"), fk("y", "c")])]
+    assert search(graph, "a", "c", SearchOptions(via="x")) == expected
+    assert search(graph, "a", "c", SearchOptions(via="x", k=5)) == expected
+    assert not search(graph, "a", "c", SearchOptions(via="dead_end"))
+    assert not search(graph, "a", "c", SearchOptions(via="dead_end", k=5))
+    assert not search(graph, "a", "c", SearchOptions(via="x", max_length=2))
+    assert search(graph, "a", "c", SearchOptions(via="a")) == [Path(foreign_keys[:2])]
+
+
+def test_via_cheapest_with_max_length() -> None:
+    # the cheapest paths through v are too long
+    foreign_keys = [
+        fk("a", "s1"), fk("s1", "s2"), fk("s2", "v"),
+        fk("a", "h1"), fk("h1", "v"), fk("a", "h2"), fk("h2", "v"),
+        fk("v", "c"), fk("v", "m"), fk("m", "c"),
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    weight = RowCountWeight({"h1": 1000, "h2": 2000, "v": 10, "c": 10})
+    options = SearchOptions(k=2, max_length=3, weight=weight)
+    expected = [
+        Path([fk("a", "h1"), fk("h1", "v"), fk("v", "c")]),
+        Path([fk("a", "h2"), fk("h2", "v"), fk("v", "c")]),
+    ]
+    assert search(graph, "a", "c", options) == expected
+    assert search(graph, "a", "c", options._replace(via="v")) == expected
+
+
+def test_same_as_filtered_graph() -> None:
+    generator = random.Random(4)
+    tables = [f"t{i}" for i in range(12)] + [f"t{i}_log" for i in range(4)]
+    foreign_keys = [fk(*generator.sample(tables, 2)) for _ in range(30)]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    options = SearchOptions(tables=TableFilter(exclude=["*_log"]))
+    filtered_graph = ForeignKeyGraph.build(
+        foreign_key for foreign_key in foreign_keys
+        if not foreign_key.source.table.endswith("_log")
+        and not foreign_key.destination.table.endswith("_log")
+    )
+    for _ in range(30):
+        begin, end = generator.sample(tables[:12], 2)
+        assert search(graph, begin, end, options) == gather_paths(filtered_graph, begin, end)
+
+
+def test_memoized() -> None:
+    graph = MutableForeignKeyGraph([
+        fk("a", "log"), fk("log", "b"), fk("a", "c"), fk("c", "d"), fk("d", "b"),
+    ])
+    options = SearchOptions(tables=TableFilter(exclude=("log",)))
+    assert graph.find_paths("a", "b")[0].length() == 2
+    assert graph.find_paths("a", "b", options)[0].length() == 3
+    assert graph.find_paths("a", "b", options)[0].length() == 3
@@ -0,0 +1,130 @@
+import io
+import os
+from typing import List, Optional
+from sqlfkpath import Key, ForeignKey, DdlTokenizer, ForeignKeyGraph, parse_ddl, gather_paths
+
+
+def parse(sql: str, default_schema: Optional[str] = None) -> List[ForeignKey]:
+    return list(parse_ddl(io.StringIO(sql), default_schema))
+
+
+def test_pg_dump() -> None:
+    sql = '''
+        SET standard_conforming_strings = on;
+        SELECT pg_catalog.set_config('search_path', '', false);
+        CREATE TABLE public.parent (
+            id integer NOT NULL,
+            name text DEFAULT 'C:\\'
+        );
+        CREATE TABLE "Other Schema"."child ""quoted""" (
+            id integer NOT NULL,
+            parent_id integer
+        );
+        CREATE FUNCTION public.f() RETURNS trigger LANGUAGE plpgsql AS $body$
+        BEGIN
+            ALTER TABLE x ADD FOREIGN KEY (a) REFERENCES y(b);
+        END
+        $body$;
+        ALTER TABLE ONLY public.parent
+            ADD CONSTRAINT parent_pkey PRIMARY KEY (id);
+        ALTER TABLE ONLY "Other Schema"."child ""quoted"""
+            ADD CONSTRAINT child_parent_fkey FOREIGN KEY (parent_id) REFERENCES public.parent(id);
+    '''
+    assert parse(sql) == [
+        ForeignKey(
+            source=Key(database="Other Schema", table='child "quoted"', columns=["parent_id"]),
+            destination=Key(database="public", table="parent", columns=["id"]),
+        ),
+    ]
+
+
+def test_mysqldump() -> None:
+    sql = """
+        -- MySQL dump
+        /*!40101 SET NAMES utf8mb4 */;
+        USE `shop`;
+        CREATE TABLE `customer` (
+          `id` int NOT NULL,
+          `note` varchar(10) DEFAULT 'it\\'s; ok',
+          PRIMARY KEY (`id`)
+        ) ENGINE=InnoDB;
+        CREATE TABLE `order` (
+          `id` int NOT NULL,
+          `customer_id` int NOT NULL,
+          KEY `customer_id` (`customer_id`(4)),
+          CONSTRAINT `order_ibfk_1` FOREIGN KEY `customer_idx` (`customer_id`)
+            REFERENCES `customer` (`id`) ON DELETE CASCADE
+        ) ENGINE=InnoDB;
+        DELIMITER ;;
+        CREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END ;;
+        DELIMITER ;
+        CREATE TABLE audit.log (order_id int REFERENCES shop.`order`(id));
+    """
+    assert parse(sql) == [
+        ForeignKey(
+            source=Key(database="shop", table="order", columns=["customer_id"]),
+            destination=Key(database="shop", table="customer", columns=["id"]),
+        ),
+        ForeignKey(
+            source=Key(database="audit", table="log", columns=["order_id"]),
+            destination=Key(database="shop", table="order", columns=["id"]),
+        ),
+    ]
+
+
+def test_referenced_primary_key() -> None:
+    sql = """
+        CREATE TABLE child (parent_id INT REFERENCES parent);
+        CREATE TABLE parent (a INT, b INT, PRIMARY KEY (a, b));
+        CREATE TABLE other (x INT, y INT, FOREIGN KEY (x, y) REFERENCES parent);
+        CREATE TABLE missing (x INT REFERENCES plugh);
+    """
+    assert parse(sql, "main") == [
+        ForeignKey(
+            source=Key(database="main", table="other", columns=["x", "y"]),
+            destination=Key(database="main", table="parent", columns=["a", "b"]),
+        ),
+    ]
+
+
+def test_columns_named_like_constraints() -> None:
+    sql = """
+        CREATE TABLE parent (key varchar(10) PRIMARY KEY);
+        CREATE TABLE child (
+            key integer REFERENCES parent(key),
+            period varchar(10) NOT NULL REFERENCES parent,
+            KEY child_key (key),
+            UNIQUE (period),
+            CHECK (key > 0),
+            PERIOD FOR SYSTEM_TIME (row_start, row_end)
+        );
+    """
+    assert parse(sql) == [
+        ForeignKey(
+            source=Key(database=None, table="child", columns=["key"]),
+            destination=Key(database=None, table="parent", columns=["key"]),
+        ),
+        ForeignKey(
+            source=Key(database=None, table="child", columns=["period"]),
+            destination=Key(database=None, table="parent", columns=["key"]),
+        ),
+    ]
+
+
+def test_search_path() -> None:
+    with open(os.path.join(os.path.dirname(__file__), "PostgreSQL", "03_path_out_of_schemas.sql"),
+              encoding="utf-8") as stream:
+        foreign_keys = list(parse_ddl(stream, "public"))
+    graph = ForeignKeyGraph.build(foreign_keys)
+    assert [path.length() for path in gather_paths(graph, "public.foo", "public.bar")] == [2]
+    assert {foreign_key.source.database for foreign_key in foreign_keys} == {"test_03_out"}
+
+
+def test_chunk_boundaries() -> None:
+    sql = "CREATE TABLE c (p_id INT /* comment; */, FOREIGN KEY (p_id) REFERENCES p (id));\n" * 3
+    tokenizer = DdlTokenizer(io.StringIO(sql))
+    tokenizer.chunk_size = 1
+    statements = list(tokenizer.iter_statements({"CREATE"}))
+    assert len(statements) == 3
+    assert all(statement == statements[0] for statement in statements)
+    assert statements[0][:3] == [("word", "CREATE"), ("word", "TABLE"), ("word", "c")]
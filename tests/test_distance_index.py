@@ -0,0 +1,85 @@
+import os
+import random
+import pytest
+from sqlfkpath import (
+    DistanceIndex, ForeignKeyGraph, OutdatedDistanceIndex, find_paths, gather_paths,
+)
+from tests.test_gather_paths import fk
+from tests.test_paths import db_from_sql
+
+
+def random_graph(seed: int) -> ForeignKeyGraph:
+    generator = random.Random(seed)
+    tables = [f"t{i}" for i in range(30)]
+    return ForeignKeyGraph.build(
+        [fk(generator.choice(tables), generator.choice(tables)) for _ in range(35)]
+    )
+
+
+def test_distances() -> None:
+    graph = random_graph(1)
+    distance_index = DistanceIndex.build(graph, jobs=1)
+    for begin in range(graph.table_count()):
+        for end in range(graph.table_count()):
+            found_paths = gather_paths(
+                graph,
+                graph.get_table_name(begin),
+                graph.get_table_name(end),
+            )
+            distance = distance_index.get_distance(begin, end)
+            if begin == end:
+                assert distance == 0
+            elif found_paths:
+                assert distance == found_paths[0].length()
+            else:
+                assert distance is None
+
+
+def test_indexed_search() -> None:
+    graph = random_graph(2)
+    distance_index = DistanceIndex.build(graph, jobs=1)
+    for begin in range(graph.table_count()):
+        for end in range(graph.table_count()):
+            begin_table = graph.get_table_name(begin)
+            end_table = graph.get_table_name(end)
+            assert sorted(gather_paths(graph, begin_table, end_table, distance_index)) == sorted(
+                gather_paths(graph, begin_table, end_table)
+            )
+
+
+def test_parallel_build() -> None:
+    graph = random_graph(3)
+    expected_distances = DistanceIndex.build(graph, jobs=1).distances
+    assert DistanceIndex.build(graph, jobs=2).distances == expected_distances
+
+
+def test_save_and_load(tmp_path: str) -> None:
+    graph = random_graph(4)
+    distance_index = DistanceIndex.build(graph, jobs=1)
+    path = os.path.join(tmp_path, "index")
+    distance_index.save(path)
+    loaded_index = DistanceIndex.load(path)
+    assert loaded_index.distances == distance_index.distances
+    assert loaded_index.table_count == distance_index.table_count
+    assert loaded_index.matches(graph)
+    assert not loaded_index.matches(random_graph(5))
+
+
+def test_outdated_index() -> None:
+    sql = """
+        CREATE TABLE parent (
+            id INT
+        );
+
+        CREATE TABLE child (
+            parent_id INT,
+            FOREIGN KEY(parent_id) REFERENCES parent(id)
+        );
+    """
+    with pytest.raises(OutdatedDistanceIndex):
+        find_paths(
+            db_from_sql(sql),
+            "child",
+            "parent",
+            distance_index=DistanceIndex.build(random_graph(6), jobs=1),
+        )
@@ -0,0 +1,132 @@
+import random
+from itertools import islice
+from typing import List, Mapping, Optional, Sequence
+from sqlfkpath import Key, ForeignKey, Path, ForeignKeyGraph, gather_paths, iter_paths
+
+
+def fk(
+    source: str,
+    destination: str,
+    column: str = "",
+    database: Optional[str] = None,
+    shared_columns: Sequence[str] = (),
+) -> ForeignKey:
+    return ForeignKey(
+        source=Key(database, source, [column or f"{destination}_id", *shared_columns]),
+        destination=Key(database, destination, ["id", *shared_columns]),
+    )
+
+
+def test_layers() -> None:
+    # begin -> 3 tables -> 3 tables -> end, every table linked to every table
+    # in the next layer: 3 * 3 shortest paths
+    foreign_keys = [fk("begin", f"a{i}") for i in range(3)]
+    foreign_keys += [fk(f"a{i}", f"b{j}") for i in range(3) for j in range(3)]
+    foreign_keys += [fk(f"b{j}", "end") for j in range(3)]
+    found_paths = gather_paths(ForeignKeyGraph.build(foreign_keys), "begin", "end")
+    assert len(found_paths) == 9
+    assert all(path.length() == 3 for path in found_paths)
+    assert len({str(path) for path in found_paths}) == 9
+
+
+def test_long_chain() -> None:
+    foreign_keys = [fk(f"t{i}", f"t{i + 1}") for i in range(2000)]
+    found_paths = gather_paths(ForeignKeyGraph.build(foreign_keys), "t0", "t2000")
+    assert found_paths == [Path(foreign_keys)]
+
+
+def test_unknown_table() -> None:
+    foreign_keys = [fk("child", "parent")]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    assert not gather_paths(graph, "child", "plugh")
+    assert not gather_paths(graph, "plugh", "child")
+
+
+def test_same_as_exhaustive_search() -> None:
+    generator = random.Random(1)
+    tables = [f"t{i}" for i in range(12)]
+    foreign_keys = [
+        fk(generator.choice(tables), generator.choice(tables))
+        for _ in range(30)
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    table_fk_map: Mapping[str, List[ForeignKey]] = {
+        table: [
+            foreign_key for foreign_key in foreign_keys
+            if table in (foreign_key.source.table, foreign_key.destination.table)
+        ]
+        for table in tables
+    }
+    for begin in tables:
+        for end in tables:
+            if begin == end:
+                continue
+            expected_paths = exhaustive_search(table_fk_map, begin, end)
+            assert sorted(gather_paths(graph, begin, end)) == sorted(expected_paths)
+
+
+def exhaustive_search(
+    table_fk_map: Mapping[str, Sequence[ForeignKey]],
+    begin: str,
+    end: str,
+) -> List[Path]:
+    found_paths: List[Path] = []
+
+    def walk(table: str, walked_tables: List[str], walked_keys: List[ForeignKey]) -> None:
+        if table in walked_tables:
+            return
+        if table == end:
+            found_paths.append(Path(walked_keys))
+            return
+        for foreign_key in table_fk_map.get(table, ()):
+            for neighbour in (foreign_key.destination.table, foreign_key.source.table):
+                walk(neighbour, walked_tables + [table], walked_keys + [foreign_key])
+
+    walk(begin, [], [])
+    if not found_paths:
+        return []
+    minimum_length = min(path.length() for path in found_paths)
+    return [path for path in found_paths if path.length() == minimum_length]
+
+
+def test_graph() -> None:
+    foreign_keys = [fk("child", "parent"), fk("child", "child"), fk("parent", "grandparent")]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    assert graph.table_count() == 3
+    assert graph.foreign_key_count() == 3
+    child = graph.get_table_id("child")
+    parent = graph.get_table_id("parent")
+    assert child is not None and parent is not None
+    assert graph.get_table_name(parent) == "parent"
+    assert graph.get_table_id("plugh") is None
+    assert list(graph.neighbours[graph.offsets[child]:graph.offsets[child + 1]]) == [parent]
+    assert [graph.get_foreign_key(index) for index in range(3)] == foreign_keys
+
+
+def test_sorted_order() -> None:
+    foreign_keys = [fk("begin", f"a{i}") for i in (2, 0, 1)]
+    foreign_keys += [fk(f"a{i}", "end") for i in (1, 2, 0)]
+    found_paths = gather_paths(ForeignKeyGraph.build(foreign_keys), "begin", "end")
+    assert found_paths == sorted(found_paths)
+    assert len(found_paths) == 3
+
+
+def test_lazy() -> None:
+    # 10 layers of 10 tables, each linked to each table in the next layer:
+    # 10 ** 9 shortest paths, only the first ones are generated
+    foreign_keys = [fk("begin", f"l0t{j}") for j in range(10)]
+    foreign_keys += [
+        fk(f"l{i}t{j}", f"l{i + 1}t{k}") for i in range(9) for j in range(10) for k in range(10)
+    ]
+    foreign_keys += [fk(f"l9t{j}", "end") for j in range(10)]
+    found_paths = iter_paths(ForeignKeyGraph.build(foreign_keys), "begin", "end")
+    first_paths = list(islice(found_paths, 3))
+    assert first_paths == sorted(first_paths)
+    assert [path.length() for path in first_paths] == [11, 11, 11]
+
+
+def test_max_length() -> None:
+    foreign_keys = [fk("child", "parent"), fk("parent", "grandparent")]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    assert not list(iter_paths(graph, "child", "grandparent", max_length=1))
+    assert len(list(iter_paths(graph, "child", "grandparent", max_length=2))) == 1
@@ -0,0 +1,62 @@
+import io
+from functools import partial
+import sqlalchemy
+from sqlfkpath import Key, ForeignKey, Path, JoinTree, JoinRenderer
+from tests.test_gather_paths import fk
+
+
+shop_fk = partial(fk, database="shop")
+
+
+def test_self_reference() -> None:
+    path = Path([shop_fk("employee", "employee", "manager_id"), shop_fk("employee", "department")])
+    assert JoinRenderer().render_path(path) == (
+        "FROM shop.employee AS employee\n"
+        "JOIN shop.employee AS employee_2 ON employee.manager_id = employee_2.id\n"
+        "JOIN shop.department AS department ON employee_2.department_id = department.id"
+    )
+
+
+def test_reversed_foreign_keys() -> None:
+    # customer <- order -> address, walked from customer
+    path = Path([shop_fk("order", "customer"), shop_fk("order", "address")])
+    assert JoinRenderer().render_path(path) == (
+        "FROM shop.customer AS customer\n"
+        'JOIN shop."order" AS "order" ON customer.id = "order".customer_id\n'
+        'JOIN shop.address AS address ON "order".address_id = address.id'
+    )
+
+
+def test_dialect_quoting() -> None:
+    dialect = sqlalchemy.engine.url.make_url("mysql://").get_dialect()()
+    foreign_key = ForeignKey(
+        source=Key(database=None, table="Order Item", columns=["order_id", "{x}"]),
+        destination=Key(database=None, table="order", columns=["id", "x"]),
+    )
+    assert JoinRenderer(dialect).render(foreign_key.source.table, [foreign_key]) == (
+        "FROM `Order Item`\n"
+        "JOIN `order` ON `Order Item`.order_id = `order`.id AND `Order Item`.`{x}` = `order`.x"
+    )
+
+
+def test_tree() -> None:
+    tree = JoinTree("shop.order", [shop_fk("order", "customer"), shop_fk("order_item", "order")])
+    assert JoinRenderer().render_tree(tree) == (
+        'FROM shop."order" AS "order"\n'
+        'JOIN shop.customer AS customer ON "order".customer_id = customer.id\n'
+        'JOIN shop.order_item AS order_item ON "order".id = order_item.order_id'
+    )
+
+
+def test_write_paths() -> None:
+    paths = [Path([shop_fk(f"t{i}", "parent")]) for i in range(1000)]
+    renderer = JoinRenderer()
+    stream = io.StringIO()
+    assert renderer.write_paths(paths + paths, stream) == 2000
+    clauses = stream.getvalue().split("\n\n")
+    assert len(clauses) == 2000
+    assert clauses[1] == (
+        "FROM shop.t1 AS t1\n"
+        "JOIN shop.parent AS parent ON t1.parent_id = parent.id"
+    )
+    assert len(renderer.templates) == 1000
@@ -0,0 +1,132 @@
+import random
+from itertools import combinations
+from typing import Optional, Sequence
+from sqlfkpath import ForeignKey, ForeignKeyGraph, JoinTree, build_join_tree, find_join_tree
+from tests.test_gather_paths import fk
+from tests.test_paths import PARENT_CHILD_SQL, file_db_from_sql
+
+
+def test_joins() -> None:
+    # customer <- order -> shop, product <- order_item -> order
+    foreign_keys = [
+        fk("order", "customer"),
+        fk("order", "shop"),
+        fk("order_item", "order"),
+        fk("order_item", "product"),
+        fk("customer", "country"),
+    ]
+    tree = build_join_tree(ForeignKeyGraph.build(foreign_keys), ["customer", "product", "shop"])
+    assert tree is not None
+    assert tree.length() == 4
+    assert tree.joins() == "\n".join([
+        "customer",
+        "JOIN order ON customer.id = order.customer_id",
+        "JOIN shop ON order.shop_id = shop.id",
+        "JOIN order_item ON order.id = order_item.order_id",
+        "JOIN product ON order_item.product_id = product.id",
+    ])
+
+
+def test_steiner_table() -> None:
+    # the smallest tree is a star around a table that is not given, not a
+    # chain of foreign keys between the given tables
+    foreign_keys = [fk(f"t{i}", "hub") for i in range(4)]
+    foreign_keys += [fk("t0", "t1"), fk("t1", "t2"), fk("t2", "t3")]
+    foreign_keys += [fk("x0", "x1"), fk("x1", "x2"), fk("x2", "x3")]
+    foreign_keys += [fk(f"x{i}", "hub") for i in range(4)]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    tree = build_join_tree(graph, ["t0", "t3", "x0", "x3"])
+    assert tree is not None
+    assert tree.length() == 4
+    assert {edge.destination.table for edge in tree.edges} == {"hub"}
+
+
+def test_trivial() -> None:
+    graph = ForeignKeyGraph.build([fk("child", "parent"), fk("island", "island_parent")])
+    single_tree = build_join_tree(graph, ["child", "child"])
+    assert single_tree is not None
+    assert single_tree.length() == 0
+    assert single_tree.joins() == "child"
+    assert build_join_tree(graph, ["child", "parent", "island"]) is None
+    assert build_join_tree(graph, ["child", "parent", "plugh"]) is None
+
+
+def test_find_join_tree(tmp_path: str) -> None:
+    engine = file_db_from_sql(tmp_path, PARENT_CHILD_SQL + """;
+        CREATE TABLE toy (parent_id INT, FOREIGN KEY(parent_id) REFERENCES parent(id));
+        CREATE TABLE island (id INT)
+    """)
+    tree = find_join_tree(engine, ["child", "toy", "parent"])
+    assert tree is not None
+    assert tree.length() == 2
+    assert tree.joins() == "\n".join([
+        "child",
+        "JOIN parent ON child.parent_id = parent.id",
+        "JOIN toy ON parent.id = toy.parent_id",
+    ])
+    assert find_join_tree(engine, ["child", "toy", "island"]) is None
+
+
+def test_disconnected_edges() -> None:
+    try:
+        JoinTree("a", [fk("b", "c")])
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_same_as_exhaustive_search() -> None:
+    generator = random.Random(2)
+    tables = [f"t{i}" for i in range(10)]
+    foreign_keys = [fk(*generator.sample(tables, 2)) for _ in range(16)]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    for _ in range(40):
+        terminals = generator.sample(tables, generator.randint(3, 5))
+        tree = build_join_tree(graph, terminals)
+        expected_length = exhaustive_search(foreign_keys, terminals)
+        if expected_length is None:
+            assert tree is None
+            continue
+        assert tree is not None
+        assert tree.length() == expected_length
+        joined_tables = {terminals[0]}
+        for edge in tree.edges:
+            joined_tables.update((edge.source.table, edge.destination.table))
+        assert joined_tables.issuperset(terminals)
+
+
+def test_heuristic() -> None:
+    generator = random.Random(3)
+    tables = [f"t{i}" for i in range(10)]
+    foreign_keys = [fk(*generator.sample(tables, 2)) for _ in range(16)]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    for _ in range(20):
+        terminals = generator.sample(tables, 4)
+        exact_tree = build_join_tree(graph, terminals)
+        heuristic_tree = build_join_tree(graph, terminals, exact_limit=0)
+        if exact_tree is None or heuristic_tree is None:
+            assert exact_tree is None and heuristic_tree is None
+            continue
+        assert exact_tree.length() <= heuristic_tree.length() <= 2 * exact_tree.length()
+
+
+def exhaustive_search(
+    foreign_keys: Sequence[ForeignKey],
+    terminals: Sequence[str],
+) -> Optional[int]:
+    # a tree connecting some of the 10 tables has at most 9 edges
+    for size in range(len(terminals) - 1, 10):
+        for edges in combinations(foreign_keys, size):
+            connected = {terminals[0]}
+            changed = True
+            while changed:
+                changed = False
+                for edge in edges:
+                    linked = {edge.source.table, edge.destination.table}
+                    if connected & linked and not linked <= connected:
+                        connected |= linked
+                        changed = True
+            if connected.issuperset(terminals):
+                return size
+    return None
@@ -0,0 +1,86 @@
+import random
+import sqlalchemy
+from sqlfkpath import (
+    ForeignKeyDelta, ForeignKeyGraph, MutableForeignKeyGraph, SearchOptions, TableFilter,
+    diff_foreign_keys, gather_paths,
+)
+from tests.test_gather_paths import fk
+from tests.test_paths import PARENT_CHILD_SQL, file_db_from_sql
+
+
+def test_same_as_rebuilt_graph() -> None:
+    generator = random.Random(1)
+    tables = [f"t{i}" for i in range(10)]
+    foreign_keys = [fk(generator.choice(tables), generator.choice(tables)) for _ in range(12)]
+    graph = MutableForeignKeyGraph(foreign_keys)
+    for _ in range(40):
+        for begin in tables:
+            for end in tables:
+                expected_paths = gather_paths(ForeignKeyGraph.build(foreign_keys), begin, end)
+                assert graph.find_paths(begin, end) == expected_paths
+                assert graph.find_paths(begin, end, SearchOptions(max_length=2)) == [
+                    path for path in expected_paths if path.length() <= 2
+                ]
+        if generator.random() < 0.5 and foreign_keys:
+            removed = foreign_keys.pop(generator.randrange(len(foreign_keys)))
+            graph.update(ForeignKeyDelta(removed=[removed]))
+        elif generator.random() < 0.1:
+            table = generator.choice(tables)
+            foreign_keys = [
+                foreign_key for foreign_key in foreign_keys
+                if table not in (foreign_key.source.table, foreign_key.destination.table)
+            ]
+            graph.update(ForeignKeyDelta(dropped_tables=[table]))
+        else:
+            added = fk(generator.choice(tables), generator.choice(tables))
+            foreign_keys.append(added)
+            graph.update(ForeignKeyDelta(added=[added]))
+
+
+def test_selective_invalidation() -> None:
+    graph = MutableForeignKeyGraph([fk("a", "b"), fk("b", "c"), fk("x", "y")])
+    graph.find_paths("a", "c")
+    graph.find_paths("x", "y")
+    graph.update(ForeignKeyDelta(added=[fk("y", "z")]))
+    assert set(graph.memo) == {("a", "c", SearchOptions()), ("x", "y", SearchOptions())}
+    graph.update(ForeignKeyDelta(added=[fk("a", "c")]))
+    assert set(graph.memo) == {("x", "y", SearchOptions())}
+    graph.find_paths("a", "c")
+    graph.update(ForeignKeyDelta(removed=[fk("a", "b")]))
+    assert set(graph.memo) == {("a", "c", SearchOptions()), ("x", "y", SearchOptions())}
+    graph.update(ForeignKeyDelta(removed=[fk("x", "y")]))
+    assert set(graph.memo) == {("a", "c", SearchOptions())}
+
+
+def test_memo_size() -> None:
+    graph = MutableForeignKeyGraph([fk("a", "b"), fk("b", "c"), fk("a", "d")], max_size=2)
+    options = SearchOptions(tables=TableFilter(exclude=["d"]))
+    assert len(graph.find_paths("a", "c", options)) == 1
+    assert len(graph.find_paths("a", "c", options)) == 1
+    graph.find_paths("a", "b")
+    graph.find_paths("a", "d")
+    assert len(graph.memo) == 2
+    assert graph.memo.info().hits == 1
+    assert ("a", "c", SearchOptions(tables=TableFilter(exclude=("d",)))) not in set(graph.memo)
+
+
+def test_diff() -> None:
+    old = [fk("a", "b"), fk("a", "b"), fk("b", "c")]
+    new = [fk("a", "b"), fk("c", "d")]
+    assert diff_foreign_keys(old, new) == ForeignKeyDelta(
+        added=[fk("c", "d")],
+        removed=[fk("a", "b"), fk("b", "c")],
+    )
+
+
+def test_refresh_schemas(tmp_path: str) -> None:
+    engine = file_db_from_sql(tmp_path, PARENT_CHILD_SQL)
+    graph = MutableForeignKeyGraph()
+    delta = graph.refresh_schemas(engine, [None])
+    assert len(delta.added) == 1 and not delta.removed
+    assert len(graph.find_paths("child", "parent")) == 1
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text("DROP TABLE child"))
+    delta = graph.refresh_schemas(engine, [None])
+    assert not delta.added and len(delta.removed) == 1
+    assert not graph.find_paths("child", "parent")
@@ -0,0 +1,39 @@
+from itertools import islice
+from sqlfkpath import Key, ForeignKey, ForeignKeyGraph, gather_paths, iter_path_bundles
+from tests.test_gather_paths import fk
+
+
+def parallel_fk(source: str, destination: str, column: str) -> ForeignKey:
+    return ForeignKey(
+        source=Key(database=None, table=source, columns=[column]),
+        destination=Key(database=None, table=destination, columns=["id"]),
+    )
+
+
+def test_bundles() -> None:
+    foreign_keys = [
+        parallel_fk("doc", "users", column) for column in ("created_by", "updated_by", "owner_id")
+    ]
+    foreign_keys += [fk("note", "doc"), parallel_fk("note", "doc", "other_doc_id")]
+    foreign_keys += [fk("team", "users"), fk("note", "team")]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    bundles = list(iter_path_bundles(graph, "note", "users"))
+    assert [(bundle.length(), bundle.count()) for bundle in bundles] == [(2, 6), (2, 1)]
+    assert str(bundles[1]) == "note(team_id) -> team(id)\nteam(users_id) -> users(id)"
+    found_paths = [found_path for bundle in bundles for found_path in bundle]
+    assert found_paths == gather_paths(graph, "note", "users")
+    assert len(set(map(str, found_paths))) == 7
+
+
+def test_many_parallel_foreign_keys() -> None:
+    # 4 ** 12 paths joining the same tables
+    foreign_keys = [
+        parallel_fk(f"t{i}", f"t{i + 1}", f"column{j}") for i in range(12) for j in range(4)
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    bundles = list(iter_path_bundles(graph, "t0", "t12"))
+    assert len(bundles) == 1
+    assert bundles[0].count() == 4 ** 12
+    first_paths = list(islice(bundles[0], 5))
+    assert first_paths == sorted(first_paths)
+    assert all(found_path.length() == 12 for found_path in first_paths)
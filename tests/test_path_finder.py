@@ -0,0 +1,84 @@
+import os
+import pytest
+import sqlalchemy
+from sqlfkpath import (
+    ForeignKeyCache, PathCacheInfo, PathFinder, SearchOptions, TableFilter, UnknownTableName,
+    find_paths,
+)
+from tests.test_paths import PARENT_CHILD_SQL, file_db_from_sql
+
+
+@pytest.fixture(name="engine")
+def fixture_engine(tmp_path: str) -> sqlalchemy.engine.Engine:
+    return file_db_from_sql(
+        tmp_path,
+        PARENT_CHILD_SQL
+        + "; CREATE TABLE grandchild (child_id INT, FOREIGN KEY(child_id) REFERENCES child(id))",
+    )
+
+
+def test_reversed_pair(tmp_path: str) -> None:
+    sql = """
+        CREATE TABLE z (id INT);
+        CREATE TABLE p (id INT, z_id INT REFERENCES z(id));
+        CREATE TABLE a (id INT, p_id INT REFERENCES p(id));
+        CREATE TABLE c (a_id INT REFERENCES a(id), z_id INT REFERENCES z(id))
+    """
+    engine = file_db_from_sql(tmp_path, sql)
+    finder = PathFinder(engine)
+    options = SearchOptions(limit=1)
+    finder.find_paths("a", "z", options)
+    # the reversed pair is searched again, a search from z finds other paths first
+    assert finder.find_paths("z", "a", options) == find_paths(engine, "z", "a", options=options)
+    assert finder.find_paths("Z", "A") == find_paths(engine, "z", "a")
+    assert finder.cache_info() == PathCacheInfo(hits=0, misses=3, max_size=1024, size=3)
+    assert finder.find_paths("z", "a", options) == find_paths(engine, "z", "a", options=options)
+    assert finder.cache_info().hits == 1
+
+
+def test_eviction(engine: sqlalchemy.engine.Engine) -> None:
+    finder = PathFinder(engine, max_size=2)
+    finder.find_paths("parent", "child")
+    finder.find_paths("child", "grandchild")
+    finder.find_paths("parent", "child")
+    finder.find_paths("parent", "grandchild")
+    assert finder.cache_info() == PathCacheInfo(hits=1, misses=3, max_size=2, size=2)
+    # child - grandchild was the least recently used one
+    finder.find_paths("parent", "child")
+    finder.find_paths("child", "grandchild")
+    assert finder.cache_info() == PathCacheInfo(hits=2, misses=4, max_size=2, size=2)
+
+
+def test_unhashable_options(engine: sqlalchemy.engine.Engine) -> None:
+    finder = PathFinder(engine)
+    options = SearchOptions(tables=TableFilter(exclude=["child"]))
+    assert not finder.find_paths("parent", "grandchild", options)
+    assert not finder.find_paths("parent", "grandchild", options)
+    assert finder.cache_info().hits == 1
+
+
+def test_invalidation(engine: sqlalchemy.engine.Engine) -> None:
+    finder = PathFinder(engine)
+    finder.find_paths("parent", "child")
+    finder.find_paths("child", "grandchild")
+    finder.invalidate("child", "parent")
+    assert finder.cache_info().size == 1
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text("DROP TABLE grandchild"))
+    assert finder.find_paths("grandchild", "child")
+    finder.reload()
+    assert finder.cache_info().size == 0
+    with pytest.raises(UnknownTableName):
+        finder.find_paths("grandchild", "child")
+    finder.invalidate()
+    assert finder.cache_info().size == 0
+
+
+def test_reload_bypasses_cache(engine: sqlalchemy.engine.Engine, tmp_path: str) -> None:
+    cache = ForeignKeyCache(os.path.join(tmp_path, "cache"), ttl=3600)
+    finder = PathFinder(engine, cache=cache)
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text("DROP TABLE grandchild"))
+    finder.reload()
+    with pytest.raises(UnknownTableName):
+        finder.find_paths("grandchild", "child")
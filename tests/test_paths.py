@@ -1,3 +1,4 @@
+import os
 import sqlalchemy
 from sqlfkpath import Key, ForeignKey, Path, find_paths
 
@@ -243,3 +244,18 @@ def db_from_sql(sql: str) -> sqlalchemy.engine.Engine:
         connection.execute(sqlalchemy.sql.text(statement))
     transaction.commit()
     return engine
+
+
+PARENT_CHILD_SQL = """
+    CREATE TABLE parent (id INT);
+    CREATE TABLE child (parent_id INT, FOREIGN KEY(parent_id) REFERENCES parent(id))
+"""
+
+
+def file_db_from_sql(tmp_path: str, sql: str) -> sqlalchemy.engine.Engine:
+    # unlike an in-memory database, a file is shared by all connections
+    engine = sqlalchemy.create_engine("sqlite:///" + os.path.join(tmp_path, "test.sqlite"))
+    with engine.begin() as connection:
+        for statement in sql.split(";"):
+            connection.execute(sqlalchemy.sql.text(statement))
+    return engine
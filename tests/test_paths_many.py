@@ -0,0 +1,65 @@
+import pytest
+from sqlfkpath import (
+    Key, ForeignKey, Path, ForeignKeyGraph, InvalidTablePair,
+    gather_paths, gather_paths_from, find_paths_many, read_table_pairs,
+)
+from tests.test_gather_paths import fk
+from tests.test_paths import db_from_sql
+
+
+def test_gather_paths_from() -> None:
+    foreign_keys = [
+        fk("child", "parent"),
+        fk("parent", "grandparent"),
+        fk("sibling", "parent"),
+        fk("plugh", "xyzzy"),
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    end_tables = ["grandparent", "sibling", "xyzzy", "nonexistent", "child"]
+    assert list(gather_paths_from(graph, "child", end_tables)) == [
+        gather_paths(graph, "child", end_table) for end_table in end_tables
+    ]
+
+
+def test_find_paths_many() -> None:
+    sql = """
+        CREATE TABLE grandparent (
+            id INT
+        );
+
+        CREATE TABLE parent (
+            id INT,
+            grandparent_id INT,
+            FOREIGN KEY(grandparent_id) REFERENCES grandparent(id)
+        );
+
+        CREATE TABLE child (
+            parent_id INT,
+            FOREIGN KEY(parent_id) REFERENCES parent(id)
+        );
+    """
+    child_parent = ForeignKey(
+        source=Key(database=None, table="child", columns=["parent_id"]),
+        destination=Key(database=None, table="parent", columns=["id"]),
+    )
+    parent_grandparent = ForeignKey(
+        source=Key(database=None, table="parent", columns=["grandparent_id"]),
+        destination=Key(database=None, table="grandparent", columns=["id"]),
+    )
+    pairs = [("child", "parent"), ("grandparent", "child"), ("child", "grandparent")]
+    assert list(find_paths_many(db_from_sql(sql), pairs)) == [
+        ("child", "parent", [Path([child_parent])]),
+        ("child", "grandparent", [Path([child_parent, parent_grandparent])]),
+        ("grandparent", "child", [Path([parent_grandparent, child_parent])]),
+    ]
+
+
+def test_read_table_pairs() -> None:
+    lines = ["# comment\n", "foo bar\n", "\n", "  db.baz\tqux  \n"]
+    assert list(read_table_pairs(lines)) == [("foo", "bar"), ("db.baz", "qux")]
+
+
+def test_read_invalid_table_pairs() -> None:
+    with pytest.raises(InvalidTablePair) as error:
+        list(read_table_pairs(["foo bar\n", "baz\n"]))
+    assert error.value.line_number == 2
@@ -0,0 +1,109 @@
+import os
+from typing import Any
+import sqlalchemy
+from sqlfkpath import (
+    Key, ForeignKey, SchemaFilter,
+    group_foreign_key_rows, reflect_foreign_keys, inspect_foreign_keys, get_pool_size,
+    create_engine,
+)
+from tests.test_paths import db_from_sql
+
+
+def test_schema_filter_default() -> None:
+    schema_filter = SchemaFilter()
+    assert schema_filter.matches("foo")
+    assert schema_filter.matches(None)
+
+
+def test_schema_filter_include() -> None:
+    schema_filter = SchemaFilter(include=["tenant_*", "public"])
+    assert schema_filter.matches("tenant_1")
+    assert schema_filter.matches("public")
+    assert not schema_filter.matches("audit")
+
+
+def test_schema_filter_exclude() -> None:
+    schema_filter = SchemaFilter(include=["tenant_*"], exclude=["tenant_test*"])
+    assert schema_filter.matches("tenant_1")
+    assert not schema_filter.matches("tenant_test_1")
+
+
+def test_group_rows() -> None:
+    rows = [
+        ("db1", "baz", "fk_qux", "qux_id1", "db2", "qux", "id1"),
+        ("db1", "baz", "fk_qux", "qux_id2", "db2", "qux", "id2"),
+        ("db1", "child", "fk_parent", "parent_id", "db1", "parent", "id"),
+    ]
+    assert list(group_foreign_key_rows(rows)) == [
+        ForeignKey(
+            source=Key(database="db1", table="baz", columns=["qux_id1", "qux_id2"]),
+            destination=Key(database="db2", table="qux", columns=["id1", "id2"]),
+        ),
+        ForeignKey(
+            source=Key(database="db1", table="child", columns=["parent_id"]),
+            destination=Key(database="db1", table="parent", columns=["id"]),
+        ),
+    ]
+
+
+def test_group_no_rows() -> None:
+    assert not list(group_foreign_key_rows([]))
+
+
+def test_reflect_foreign_keys() -> None:
+    sql = """
+        CREATE TABLE qux (
+            id1 INT,
+            id2 INT
+        );
+
+        CREATE TABLE baz (
+            qux_id1 INT,
+            qux_id2 INT,
+            FOREIGN KEY(qux_id1, qux_id2) REFERENCES qux(id1, id2)
+        );
+    """
+    assert reflect_foreign_keys(db_from_sql(sql)) == [
+        ForeignKey(
+            source=Key(database=None, table="baz", columns=["qux_id1", "qux_id2"]),
+            destination=Key(database=None, table="qux", columns=["id1", "id2"]),
+        ),
+    ]
+
+
+def test_inspect_schemas_in_parallel(tmp_path: str) -> None:
+    schemas = ["main", "a", "b", "c", "d"]
+
+    def create_attached_engine(pool_size: int) -> sqlalchemy.engine.Engine:
+        engine = sqlalchemy.create_engine(
+            "sqlite:///" + os.path.join(tmp_path, "main.sqlite"),
+            poolclass=sqlalchemy.pool.QueuePool,
+            pool_size=pool_size,
+            connect_args={"check_same_thread": False},
+        )
+
+        @sqlalchemy.event.listens_for(engine, "connect")
+        def attach(dbapi_connection: Any, _: Any) -> None:
+            for schema in schemas[1:]:
+                path = os.path.join(tmp_path, schema + ".sqlite")
+                dbapi_connection.execute(f"ATTACH DATABASE '{path}' AS {schema}")
+
+        return engine
+
+    engine = create_attached_engine(pool_size=1)
+    with engine.begin() as connection:
+        for schema in schemas:
+            connection.execute(sqlalchemy.text(f"CREATE TABLE {schema}.parent (id INT)"))
+            connection.execute(sqlalchemy.text(
+                f"CREATE TABLE {schema}.child ("
+                "parent_id INT, FOREIGN KEY(parent_id) REFERENCES parent(id))"
+            ))
+    expected_foreign_keys = list(inspect_foreign_keys(engine, schemas))
+    assert len(expected_foreign_keys) == len(schemas)
+    engine = create_attached_engine(pool_size=4)
+    assert get_pool_size(engine) == 4
+    assert list(inspect_foreign_keys(engine, schemas)) == expected_foreign_keys
+
+
+def test_create_engine() -> None:
+    assert get_pool_size(create_engine("sqlite://", jobs=4)) == 1
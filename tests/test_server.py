@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from typing import Any, Iterator
+import pytest
+import sqlalchemy
+from sqlfkpath import ForeignKeyCache, PathQuery, PathQueryServer, create_path_query_server
+from tests.test_paths import PARENT_CHILD_SQL, file_db_from_sql
+
+
+@pytest.fixture(name="engine")
+def fixture_engine(tmp_path: str) -> sqlalchemy.engine.Engine:
+    return file_db_from_sql(tmp_path, PARENT_CHILD_SQL)
+
+
+@pytest.fixture(name="server")
+def fixture_server(engine: sqlalchemy.engine.Engine) -> Iterator[PathQueryServer]:
+    server = create_path_query_server("127.0.0.1:0", PathQuery(engine))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def request(server: PathQueryServer, path: str, method: str = "GET") -> Any:
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    with urllib.request.urlopen(urllib.request.Request(url, method=method)) as response:
+        return json.load(response)
+
+
+def test_paths(server: PathQueryServer) -> None:
+    response = request(server, "/paths?begin=parent&end=child")
+    assert response["begin"] == "parent"
+    assert response["end"] == "child"
+    assert response["paths"] == [
+        {
+            "length": 1,
+            "edges": [
+                {
+                    "source": {"database": None, "table": "child", "columns": ["parent_id"]},
+                    "destination": {"database": None, "table": "parent", "columns": ["id"]},
+                },
+            ],
+            "joins": "FROM child\nJOIN parent ON child.parent_id = parent.id",
+        },
+    ]
+
+
+def test_missing_parameters(server: PathQueryServer) -> None:
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request(server, "/paths?begin=parent")
+    assert error.value.code == 400
+
+
+def test_reload(server: PathQueryServer, engine: sqlalchemy.engine.Engine) -> None:
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request(server, "/paths?begin=parent&end=grandchild")
+    assert error.value.code == 400
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text(
+            "CREATE TABLE grandchild (child_id INT, FOREIGN KEY(child_id) REFERENCES child(id))"
+        ))
+    assert request(server, "/reload", method="POST") == {"tables": 3}
+    assert len(request(server, "/paths?begin=parent&end=grandchild")["paths"]) == 1
+
+
+def test_reload_bypasses_cache(engine: sqlalchemy.engine.Engine, tmp_path: str) -> None:
+    path_query = PathQuery(engine, cache=ForeignKeyCache(os.path.join(tmp_path, "cache"), ttl=3600))
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text(
+            "CREATE TABLE grandchild (child_id INT, FOREIGN KEY(child_id) REFERENCES child(id))"
+        ))
+    assert len(path_query.reload().added) == 1
+    assert path_query.graph.table_count() == 3
+
+
+def test_unknown_table(server: PathQueryServer) -> None:
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request(server, "/paths?begin=parnet&end=child")
+    assert error.value.code == 400
+    assert json.load(error.value) == {"error": "unknown table: parnet, did you mean: parent?"}
+    assert len(request(server, "/paths?begin=PARENT&end=child")["paths"]) == 1
+
+
+def test_limit(server: PathQueryServer) -> None:
+    assert len(request(server, "/paths?begin=parent&end=child&limit=0")["paths"]) == 0
+    assert len(request(server, "/paths?begin=parent&end=child&max_length=1")["paths"]) == 1
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request(server, "/paths?begin=parent&end=child&limit=x")
+    assert error.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request(server, "/paths?begin=parent&end=child&limit=-1")
+    assert error.value.code == 400
+
+
+def test_reload_schema(server: PathQueryServer, engine: sqlalchemy.engine.Engine) -> None:
+    assert len(request(server, "/paths?begin=parent&end=child")["paths"]) == 1
+    with engine.begin() as connection:
+        connection.execute(sqlalchemy.text("DROP TABLE child"))
+    assert request(server, "/reload?schema=main", method="POST") == {"tables": 0}
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request(server, "/paths?begin=parent&end=child")
+    assert error.value.code == 400
+
+
+def test_constraints(server: PathQueryServer) -> None:
+    assert not request(server, "/paths?begin=parent&end=child&parents_only=1")["paths"]
+    assert len(request(server, "/paths?begin=child&end=parent&parents_only=1")["paths"]) == 1
+    assert len(request(server, "/paths?begin=child&end=parent&avoid_table=parent")["paths"]) == 1
@@ -0,0 +1,95 @@
+import os
+import pickle
+import random
+import tempfile
+from functools import partial
+from typing import Iterator
+import pytest
+from sqlfkpath import (
+    Key, ForeignKey, ForeignKeyGraph, MappedForeignKeyGraph, DistanceIndex, gather_paths,
+)
+from tests.test_gather_paths import fk
+
+
+# non-ASCII names and composite keys have to survive the snapshot
+tenant_fk = partial(fk, database="schemą", shared_columns=["tenant_id"])
+
+
+@pytest.fixture(name="directory")
+def fixture_directory() -> Iterator[str]:
+    with tempfile.TemporaryDirectory() as directory:
+        yield directory
+
+
+def test_same_as_graph(directory: str) -> None:
+    generator = random.Random(1)
+    tables = [f"t{i}" for i in range(30)]
+    foreign_keys = [
+        tenant_fk(generator.choice(tables), generator.choice(tables)) for _ in range(60)
+    ]
+    graph = ForeignKeyGraph.build(foreign_keys)
+    path = os.path.join(directory, "graph.snapshot")
+    graph.save_snapshot(path)
+    mapped_graph = MappedForeignKeyGraph(path)
+    assert mapped_graph.table_count() == graph.table_count()
+    assert mapped_graph.foreign_key_count() == graph.foreign_key_count()
+    assert mapped_graph.digest() == graph.digest()
+    assert [mapped_graph.get_foreign_key(index) for index in range(60)] == foreign_keys
+    names = [f"schemą.{table}" for table in tables]
+    for name in names:
+        assert mapped_graph.get_table_id(name) == graph.get_table_id(name)
+        for other_name in names:
+            assert gather_paths(mapped_graph, name, other_name) == (
+                gather_paths(graph, name, other_name)
+            )
+    assert mapped_graph.get_table_id("t1") is None
+    assert mapped_graph.get_table_id("zzz") is None
+    assert DistanceIndex.build(mapped_graph, 2).matches(graph)
+
+
+def test_unqualified_tables(directory: str) -> None:
+    foreign_key = ForeignKey(
+        source=Key(database=None, table="child", columns=["parent_id"]),
+        destination=Key(database=None, table="parent", columns=["id"]),
+    )
+    path = os.path.join(directory, "graph.snapshot")
+    ForeignKeyGraph.build([foreign_key]).save_snapshot(path)
+    mapped_graph = pickle.loads(pickle.dumps(MappedForeignKeyGraph(path)))
+    assert [path.edges for path in gather_paths(mapped_graph, "child", "parent")] == [
+        (foreign_key,)
+    ]
+
+
+def test_replace(directory: str) -> None:
+    path = os.path.join(directory, "graph.snapshot")
+    ForeignKeyGraph.build([tenant_fk("child", "parent")]).save_snapshot(path)
+    old_graph = MappedForeignKeyGraph(path)
+    ForeignKeyGraph.build([tenant_fk("other", "parent")]).save_snapshot(path)
+    assert old_graph.get_table_name(0) == "schemą.child"
+    assert MappedForeignKeyGraph(path).get_table_name(0) == "schemą.other"
+    assert os.listdir(directory) == ["graph.snapshot"]
+
+
+def test_save_mapped(directory: str) -> None:
+    path = os.path.join(directory, "graph.snapshot")
+    graph = ForeignKeyGraph.build([tenant_fk("child", "parent"), tenant_fk("grandchild", "child")])
+    graph.save_snapshot(path)
+    copy_path = os.path.join(directory, "copy.snapshot")
+    MappedForeignKeyGraph(path).save_snapshot(copy_path)
+    copied_graph = MappedForeignKeyGraph(copy_path)
+    assert copied_graph.digest() == graph.digest()
+    assert gather_paths(copied_graph, "schemą.grandchild", "schemą.parent") == gather_paths(
+        graph, "schemą.grandchild", "schemą.parent"
+    )
+    # saving over the mapped file itself
+    copied_graph.save_snapshot(copy_path)
+    assert MappedForeignKeyGraph(copy_path).digest() == graph.digest()
+    assert sorted(os.listdir(directory)) == ["copy.snapshot", "graph.snapshot"]
+
+
+def test_unsupported_version(directory: str) -> None:
+    path = os.path.join(directory, "graph.snapshot")
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(b'{"version": 0}\n')
+    with pytest.raises(ValueError):
+        MappedForeignKeyGraph(path)
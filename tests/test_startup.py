@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from typing import List, Mapping, Tuple
+import pytest
+
+
+SQL = """
+    CREATE TABLE parent (id INT PRIMARY KEY);
+    CREATE TABLE child (parent_id INT REFERENCES parent(id));
+"""
+
+CHECK_IMPORTS = """
+import sys
+import sqlfkpath
+sys.argv = ["sqlfkpath.py"] + sys.argv[1:]
+exit_code = sqlfkpath.main()
+assert "sqlalchemy.engine" not in sys.modules, "SQLAlchemy was imported"
+sys.exit(exit_code)
+"""
+
+
+def run(arguments: List[str], environment: Mapping[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable] + arguments,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=environment,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+@pytest.fixture(name="cached_run")
+def fixture_cached_run(tmp_path: str) -> Tuple[List[str], Mapping[str, str]]:
+    database_path = os.path.join(tmp_path, "test.sqlite")
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(SQL)
+    environment = dict(os.environ, XDG_CACHE_HOME=str(tmp_path))
+    arguments = ["--cache-ttl", "3600", f"sqlite:///{database_path}", "child", "parent"]
+    run(["sqlfkpath.py"] + arguments, environment)
+    return arguments, environment
+
+
+def test_cache_hit(cached_run: Tuple[List[str], Mapping[str, str]]) -> None:
+    arguments, environment = cached_run
+    run(["-c", CHECK_IMPORTS] + arguments, environment)
+
+
+# wall time depends on the machine, so it's measured only when asked for, in
+# the benchmark job
+@pytest.mark.skipif(
+    "SQLFKPATH_STARTUP_BUDGET" not in os.environ,
+    reason="set SQLFKPATH_STARTUP_BUDGET to measure the startup time",
+)
+def test_cache_hit_time(cached_run: Tuple[List[str], Mapping[str, str]]) -> None:
+    arguments, environment = cached_run
+    interpreter_time = min(run(["-c", "pass"], environment) for _ in range(5))
+    script_time = min(run(["sqlfkpath.py"] + arguments, environment) for _ in range(5))
+    assert script_time - interpreter_time < float(os.environ["SQLFKPATH_STARTUP_BUDGET"])
@@ -0,0 +1,44 @@
+import json
+import os
+from typing import List
+from sqlfkpath import ForeignKeyCache, StageStats, Stats, find_paths
+from tests.test_paths import PARENT_CHILD_SQL, file_db_from_sql
+
+
+def test_stages(tmp_path: str) -> None:
+    engine = file_db_from_sql(tmp_path, PARENT_CHILD_SQL)
+    ended: List[StageStats] = []
+    with Stats(trace_memory=True, on_stage=ended.append) as stats:
+        stats.watch(engine)
+        found_paths = list(find_paths(engine, "child", "parent"))
+    assert len(found_paths) == 1
+    assert [(stage.name, stage.depth) for stage in stats.stages] == [
+        ("load foreign keys", 0),
+        ("reflect", 1),
+        ("build graph", 0),
+        ("search", 0),
+    ]
+    assert [stage.name for stage in ended] == [
+        "reflect", "load foreign keys", "build graph", "search",
+    ]
+    load, reflect, build, search = stats.stages
+    assert reflect.queries > 0
+    assert load.queries == reflect.queries
+    assert build.queries == 0
+    assert build.counters == {"tables": 2, "foreign keys": 1, "edges": 1}
+    assert search.counters == {"expanded tables": 1}
+    assert all(stage.peak_memory for stage in stats.stages)
+    assert load.peak_memory is not None and reflect.peak_memory is not None
+    assert load.peak_memory >= reflect.peak_memory
+    json.dumps(stats.to_dict())
+    # not watched any more
+    find_paths(engine, "child", "parent", cache=ForeignKeyCache(os.path.join(tmp_path, "cache")))
+    assert len(stats.stages) == 4
+
+
+def test_inactive() -> None:
+    stats = Stats()
+    with stats.stage("outside"):
+        pass
+    assert [stage.name for stage in stats.stages] == ["outside"]
+    assert stats.stages[0].peak_memory is None
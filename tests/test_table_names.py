@@ -0,0 +1,78 @@
+from functools import partial
+import pytest
+from sqlfkpath import (
+    Key, ForeignKey, ForeignKeyGraph, AmbiguousTableName, TableNameIndex, UnknownTableName,
+    find_paths, reflect_foreign_keys, reflect_table_names,
+)
+from tests.test_paths import db_from_sql
+
+
+def qualified_fk(source: str, destination: str) -> ForeignKey:
+    source_schema, source_table = source.split(".")
+    destination_schema, destination_table = destination.split(".")
+    return ForeignKey(
+        source=Key(source_schema, source_table, [f"{destination_table}_id"]),
+        destination=Key(destination_schema, destination_table, ["id"]),
+    )
+
+
+GRAPH = ForeignKeyGraph.build([
+    qualified_fk("shop.order", "shop.Customer"),
+    qualified_fk("shop.order", "billing.customer"),
+    qualified_fk("billing.invoice", "billing.customer"),
+    qualified_fk("shop.order_item", "shop.order"),
+    qualified_fk("archive.order_item", "archive.Order_Item"),
+])
+
+
+@pytest.mark.parametrize("table_name, default_schema, expected", [
+    ("shop.order", None, "shop.order"),
+    ("order", "shop", "shop.order"),
+    ("SHOP.ORDER", None, "shop.order"),
+    ("Order", "shop", "shop.order"),
+    ("invoice", None, "billing.invoice"),
+    ("INVOICE", "shop", "billing.invoice"),
+    ("customer", "shop", "shop.Customer"),
+    ("customer", None, "billing.customer"),
+    ("Customer", None, "shop.Customer"),
+])
+def test_resolve(table_name: str, default_schema: str, expected: str) -> None:
+    assert TableNameIndex(GRAPH, default_schema).resolve(table_name) == expected
+
+
+def test_ambiguous() -> None:
+    with pytest.raises(AmbiguousTableName) as error:
+        TableNameIndex(GRAPH).resolve("CUSTOMER")
+    assert error.value.candidates == ["billing.customer", "shop.Customer"]
+    with pytest.raises(AmbiguousTableName):
+        TableNameIndex(GRAPH).resolve("ARCHIVE.ORDER_ITEM")
+
+
+def test_suggestions() -> None:
+    with pytest.raises(UnknownTableName) as error:
+        TableNameIndex(GRAPH, "shop").resolve("ordr_item")
+    suggestions = ["archive.Order_Item", "archive.order_item", "shop.order_item"]
+    assert error.value.suggestions == suggestions
+    assert str(error.value).endswith(f"did you mean: {', '.join(suggestions)}?")
+    with pytest.raises(UnknownTableName) as error:
+        TableNameIndex(GRAPH).resolve("plugh")
+    assert str(error.value) == "unknown table: plugh"
+
+
+def test_table_without_foreign_keys() -> None:
+    sql = """
+        CREATE TABLE parent (id INT);
+        CREATE TABLE child (parent_id INT, FOREIGN KEY(parent_id) REFERENCES parent(id));
+        CREATE TABLE lonely (id INT);
+    """
+    engine = db_from_sql(sql)
+    assert sorted(reflect_table_names(engine)) == ["child", "lonely", "parent"]
+    graph = ForeignKeyGraph.build(reflect_foreign_keys(engine))
+    with pytest.raises(UnknownTableName):
+        TableNameIndex(graph).resolve("lonely")
+    table_names = TableNameIndex(graph, list_tables=partial(reflect_table_names, engine))
+    assert table_names.resolve("LONELY") == "lonely"
+    with pytest.raises(UnknownTableName) as error:
+        table_names.resolve("lonly")
+    assert error.value.suggestions == ["lonely"]
+    assert not find_paths(engine, "lonely", "parent")
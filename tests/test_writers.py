@@ -0,0 +1,89 @@
+import io
+import json
+import xml.etree.ElementTree
+from typing import Iterator
+from sqlfkpath import (
+    ForeignKeyGraph, Path, DotPathWriter, GraphmlPathWriter, JsonLinesPathWriter, JsonPathWriter,
+    TextPathWriter, foreign_key_to_dict, path_to_dict, write_graph, write_paths,
+)
+from tests.test_gather_paths import fk
+
+
+PATHS = [Path([fk("a", "b"), fk("b", "c")]), Path([fk("a", 'quoted "d"')])]
+
+
+def test_json() -> None:
+    stream = io.StringIO()
+    assert write_paths(PATHS, JsonPathWriter(stream)) == 2
+    assert json.loads(stream.getvalue()) == [path_to_dict(path) for path in PATHS]
+    empty_stream = io.StringIO()
+    assert write_paths([], JsonPathWriter(empty_stream)) == 0
+    assert json.loads(empty_stream.getvalue()) == []
+
+
+def test_json_joins_against_foreign_keys() -> None:
+    # users <- orders <- items, walked from users
+    path = Path([fk("orders", "users"), fk("items", "orders")])
+    stream = io.StringIO()
+    write_paths([path], JsonLinesPathWriter(stream))
+    assert json.loads(stream.getvalue())["joins"] == "\n".join([
+        "FROM users",
+        "JOIN orders ON users.id = orders.users_id",
+        "JOIN items ON orders.id = items.orders_id",
+    ])
+
+
+def test_json_lines() -> None:
+    stream = io.StringIO()
+    write_paths(PATHS, JsonLinesPathWriter(stream))
+    assert list(map(json.loads, stream.getvalue().splitlines())) == list(map(path_to_dict, PATHS))
+
+
+def test_dot() -> None:
+    stream = io.StringIO()
+    write_paths(PATHS, DotPathWriter(stream))
+    assert stream.getvalue() == "\n".join([
+        "digraph foreign_keys {",
+        '\t"a" -> "b" [label="b_id -> id", path=1];',
+        '\t"b" -> "c" [label="c_id -> id", path=1];',
+        '\t"a" -> "quoted \\"d\\"" [label="quoted \\"d\\"_id -> id", path=2];',
+        "}",
+        "",
+    ])
+
+
+def test_graphml() -> None:
+    stream = io.StringIO()
+    write_paths(PATHS, GraphmlPathWriter(stream))
+    namespace = "{http://graphml.graphdrawing.org/xmlns}"
+    root = xml.etree.ElementTree.fromstring(stream.getvalue())
+    graph = root.find(f"{namespace}graph")
+    assert graph is not None
+    nodes = [node.get("id") for node in graph.iter(f"{namespace}node")]
+    assert nodes == ["a", "b", "c", 'quoted "d"']
+    edges = [
+        (edge.get("source"), edge.get("target"), [data.text for data in edge])
+        for edge in graph.iter(f"{namespace}edge")
+    ]
+    assert edges[2] == ("a", 'quoted "d"', ['quoted "d"_id -> id', "2"])
+
+
+def test_streaming() -> None:
+    stream = io.StringIO()
+
+    def generate_paths() -> Iterator[Path]:
+        for path in PATHS:
+            yield path
+            # the path is written before the next one is generated
+            assert stream.getvalue().count("path ") == PATHS.index(path) + 1
+
+    write_paths(generate_paths(), TextPathWriter(stream))
+
+
+def test_graph() -> None:
+    foreign_keys = [fk("a", "b"), fk("b", "c"), fk("c", "c")]
+    stream = io.StringIO()
+    assert write_graph(ForeignKeyGraph.build(foreign_keys), JsonLinesPathWriter(stream)) == 3
+    assert list(map(json.loads, stream.getvalue().splitlines())) == list(
+        map(foreign_key_to_dict, foreign_keys)
+    )